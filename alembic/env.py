@@ -11,8 +11,10 @@ import sys
 # Dodaj główny katalog projektu do sys.path
 sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Importuj modele (MUSI być po dodaniu do sys.path)
+# Importuj modele (MUSI być po dodaniu do sys.path) - wszystkie moduły
+# z modelami, żeby autogenerate widział pełny schemat
 from common.models import Base
+import music_app.models  # noqa: F401
 
 # this is the Alembic Config object
 config = context.config
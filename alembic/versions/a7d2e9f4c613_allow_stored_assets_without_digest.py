@@ -0,0 +1,29 @@
+"""Allow stored_assets without digest
+
+Revision ID: a7d2e9f4c613
+Revises: f6a3c8d2b915
+Create Date: 2026-10-18 19:05:12.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d2e9f4c613'
+down_revision: Union[str, None] = 'f6a3c8d2b915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Obiekty z bezpośredniego uploadu (presigned) są liczone w stored_assets
+    # bez skrótu treści - API nie widzi ich bajtów.
+    op.alter_column('stored_assets', 'sha256', existing_type=sa.String(length=64), nullable=True)
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM stored_assets WHERE sha256 IS NULL")
+    op.alter_column('stored_assets', 'sha256', existing_type=sa.String(length=64), nullable=False)
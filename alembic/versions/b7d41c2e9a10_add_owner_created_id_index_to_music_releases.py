@@ -0,0 +1,33 @@
+"""Add (owner_id, created_at, id) index to music_releases
+
+Revision ID: b7d41c2e9a10
+Revises: 86307c7f1deb
+Create Date: 2026-10-18 10:12:40.114205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41c2e9a10'
+down_revision: Union[str, None] = '86307c7f1deb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Wcześniejsze migracje nie tworzą kolumny created_at (bazy zakładane
+    # przez create_all ją mają) - dodajemy ją, jeśli jej brakuje.
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('music_releases')}
+    if 'created_at' not in columns:
+        op.add_column('music_releases', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+
+    # Indeks pod stronicowanie keyset GET /music/releases/
+    op.create_index('ix_music_releases_owner_created_id', 'music_releases', ['owner_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_music_releases_owner_created_id', table_name='music_releases')
@@ -0,0 +1,26 @@
+"""Add cover_renditions to music_releases
+
+Revision ID: c3e8f1a5d720
+Revises: b7d41c2e9a10
+Create Date: 2026-10-18 12:31:07.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8f1a5d720'
+down_revision: Union[str, None] = 'b7d41c2e9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('music_releases', sa.Column('cover_renditions', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('music_releases', 'cover_renditions')
@@ -0,0 +1,26 @@
+"""Add audio_analysis to music_releases
+
+Revision ID: d91a4b7e2c58
+Revises: c3e8f1a5d720
+Create Date: 2026-10-18 13:05:52.906114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd91a4b7e2c58'
+down_revision: Union[str, None] = 'c3e8f1a5d720'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('music_releases', sa.Column('audio_analysis', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('music_releases', 'audio_analysis')
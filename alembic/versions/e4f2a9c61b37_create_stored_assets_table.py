@@ -0,0 +1,41 @@
+"""Create stored_assets table
+
+Revision ID: e4f2a9c61b37
+Revises: d91a4b7e2c58
+Create Date: 2026-10-18 13:48:21.337640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4f2a9c61b37'
+down_revision: Union[str, None] = 'd91a4b7e2c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('stored_assets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('s3_key', sa.String(), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('content_type', sa.String(), nullable=True),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_referenced_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('s3_key')
+    )
+    op.create_index(op.f('ix_stored_assets_id'), 'stored_assets', ['id'], unique=False)
+    op.create_index(op.f('ix_stored_assets_sha256'), 'stored_assets', ['sha256'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_stored_assets_sha256'), table_name='stored_assets')
+    op.drop_index(op.f('ix_stored_assets_id'), table_name='stored_assets')
+    op.drop_table('stored_assets')
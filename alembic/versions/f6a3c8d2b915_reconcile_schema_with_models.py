@@ -0,0 +1,165 @@
+"""Reconcile schema with models
+
+Revision ID: f6a3c8d2b915
+Revises: e4f2a9c61b37
+Create Date: 2026-10-18 16:20:44.518302
+
+"""
+import logging
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a3c8d2b915'
+down_revision: Union[str, None] = 'e4f2a9c61b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+logger = logging.getLogger('alembic.runtime.migration')
+
+# Rola nadawana kontom bez roli - ta sama co domyślna w modelu User.
+DEFAULT_ROLE = 'MUSIC_CREATOR'
+
+
+def _legacy_split(entry) -> Optional[tuple]:
+    """(email, udział) z wpisu dawnej kolumny JSON royalty_splits albo None."""
+    if not isinstance(entry, dict):
+        return None
+    email = entry.get('email')
+    share = entry.get('share_percentage', entry.get('share'))
+    try:
+        share = Decimal(str(share))
+    except (InvalidOperation, ValueError):
+        return None
+    if not isinstance(email, str) or not email or not 0 < share <= 100:
+        return None
+    return email, share
+
+
+def _migrate_legacy_splits(bind) -> bool:
+    """
+    Przenosi podziały z kolumny JSON music_releases.royalty_splits do tabeli
+    music_release_royalty_splits (pomija wydawnictwa, które już mają tam
+    wiersze). Zwraca False, gdy któregoś wpisu nie dało się przenieść -
+    wtedy kolumna zostaje, żeby nie stracić danych.
+    """
+    releases = sa.table('music_releases', sa.column('id', sa.Integer), sa.column('royalty_splits', sa.JSON))
+    splits = sa.table(
+        'music_release_royalty_splits',
+        sa.column('release_id', sa.Integer), sa.column('email', sa.String), sa.column('share_percentage', sa.Numeric(5, 2)),
+    )
+    migrated = set(bind.execute(sa.select(splits.c.release_id).distinct()).scalars())
+    complete = True
+    rows = []
+    for release_id, legacy in bind.execute(sa.select(releases.c.id, releases.c.royalty_splits)):
+        if not legacy or release_id in migrated:
+            continue
+        entries = legacy if isinstance(legacy, list) else [legacy]
+        parsed = [_legacy_split(entry) for entry in entries]
+        if None in parsed:
+            logger.warning(f"music_releases.royalty_splits of release {release_id} cannot be migrated: {legacy!r}")
+            complete = False
+            continue
+        rows += [{'release_id': release_id, 'email': email, 'share_percentage': share} for email, share in parsed]
+    if rows:
+        op.bulk_insert(splits, rows)
+    return complete
+
+
+def _has_values(bind, column: str) -> bool:
+    releases = sa.table('music_releases', sa.column(column, sa.JSON))
+    values = bind.execute(sa.select(releases.c[column]).where(releases.c[column].isnot(None))).scalars()
+    # JSON 'null' / puste struktury nie niosą danych
+    return any(value not in (None, {}, []) for value in values)
+
+
+def upgrade() -> None:
+    # Schemat był dotąd uzupełniany przez create_all przy starcie aplikacji,
+    # a Alembic jest teraz jego jedynym źródłem. Bazy zakładane przez
+    # create_all mają już część tych obiektów - tworzymy tylko brakujące.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    release_columns = {column['name'] for column in inspector.get_columns('music_releases')}
+    user_columns = {column['name'] for column in inspector.get_columns('users')}
+    release_indexes = {index['name'] for index in inspector.get_indexes('music_releases')}
+
+    # Wydawnictwa bez właściciela: nie ma bezpiecznego wyboru właściciela
+    # ani powodu, by je kasować - migracja przerywa się przed zmianami
+    # i wymaga decyzji (przypisania albo usunięcia tych wierszy).
+    orphans = bind.execute(sa.text("SELECT count(*) FROM music_releases WHERE owner_id IS NULL")).scalar()
+    if orphans:
+        raise RuntimeError(
+            f"{orphans} music_releases rows have no owner_id. Assign an owner "
+            "(UPDATE music_releases SET owner_id = ...) or delete them, then re-run the upgrade."
+        )
+
+    if 'music_release_royalty_splits' not in tables:
+        op.create_table('music_release_royalty_splits',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('share_percentage', sa.Numeric(precision=5, scale=2), nullable=False),
+        sa.Column('release_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['release_id'], ['music_releases.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_music_release_royalty_splits_email'), 'music_release_royalty_splits', ['email'], unique=False)
+        op.create_index(op.f('ix_music_release_royalty_splits_id'), 'music_release_royalty_splits', ['id'], unique=False)
+
+    # Istniejące wiersze dostają pusty URL - domyślna wartość jest usuwana
+    # zaraz po dodaniu kolumny, jak w modelu.
+    for column in ('cover_image_url', 'audio_file_url'):
+        if column not in release_columns:
+            op.add_column('music_releases', sa.Column(column, sa.String(), server_default='', nullable=False))
+            op.alter_column('music_releases', column, server_default=None)
+
+    op.execute("UPDATE music_releases SET status = 'pending' WHERE status IS NULL")
+    op.alter_column('music_releases', 'status', existing_type=sa.String(), nullable=False)
+    op.alter_column('music_releases', 'owner_id', existing_type=sa.Integer(), nullable=False)
+
+    # Pozostałości wcześniejszego modelu, nieużywane przez aplikację.
+    # Podziały tantiem z kolumny JSON są najpierw przenoszone do
+    # music_release_royalty_splits; kolumny z danymi, których nie da się
+    # przenieść (release_meta nie ma odpowiednika), zostają w bazie.
+    for index in ('ix_music_releases_artist', 'ix_music_releases_title'):
+        if index in release_indexes:
+            op.drop_index(index, table_name='music_releases')
+    if 'royalty_splits' in release_columns and _migrate_legacy_splits(bind):
+        op.drop_column('music_releases', 'royalty_splits')
+    if 'release_meta' in release_columns:
+        if _has_values(bind, 'release_meta'):
+            logger.warning("Keeping music_releases.release_meta: it still holds data")
+        else:
+            op.drop_column('music_releases', 'release_meta')
+
+    if 'created_at' not in user_columns:
+        op.add_column('users', sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    # Migracja 86307c7f1deb dopuściła NULL w roli - takie konta dostają rolę domyślną.
+    op.execute(sa.text("UPDATE users SET role = :role WHERE role IS NULL").bindparams(role=DEFAULT_ROLE))
+    op.alter_column('users', 'role', existing_type=sa.String(), nullable=False)
+
+
+def downgrade() -> None:
+    # Przywraca ograniczenia i obiekty poprzedniego schematu. Obiekty, które
+    # upgrade tworzy tylko warunkowo (tabela music_release_royalty_splits,
+    # kolumny URL wydawnictw, users.created_at), mogły istnieć wcześniej
+    # (create_all) i zawierają dane - zostają. Podziały nie wracają do
+    # kolumny JSON, a backfill ról i statusów nie jest cofany.
+    inspector = sa.inspect(op.get_bind())
+    release_columns = {column['name'] for column in inspector.get_columns('music_releases')}
+    release_indexes = {index['name'] for index in inspector.get_indexes('music_releases')}
+
+    op.alter_column('users', 'role', existing_type=sa.String(), nullable=True)
+    for column in ('release_meta', 'royalty_splits'):
+        if column not in release_columns:
+            op.add_column('music_releases', sa.Column(column, sa.JSON(), nullable=True))
+    for index, column in (('ix_music_releases_title', 'title'), ('ix_music_releases_artist', 'artist')):
+        if index not in release_indexes:
+            op.create_index(index, 'music_releases', [column], unique=False)
+    op.alter_column('music_releases', 'owner_id', existing_type=sa.Integer(), nullable=True)
+    op.alter_column('music_releases', 'status', existing_type=sa.String(), nullable=True)
@@ -0,0 +1,27 @@
+# auth_app/async_crud.py
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import models
+from . import schemas
+from .hashing import password_hasher
+
+# Asynchroniczne odpowiedniki funkcji z auth_app/crud.py operujące na
+# AsyncSession. create_access_token nie dotyka bazy - używamy wersji z crud.
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: str | None = None):
+    # bcrypt zawsze poza pętlą zdarzeń - na dedykowanym executorze.
+    if hashed_password is None:
+        hashed_password = await password_hasher.hash(user.password)
+    db_user = models.User(email=user.email, hashed_password=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
@@ -8,10 +8,9 @@ from fastapi.security import OAuth2PasswordBearer
 from common import models
 from common.database import settings, SessionLocal
 from . import schemas
-from passlib.context import CryptContext
+from .hashing import pwd_context
 
 # --- ISTNIEJĄCY KOD (bez zmian) ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -29,8 +28,11 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = pwd_context.hash(user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str | None = None):
+    # Endpointy async przekazują hash policzony na dedykowanym executorze
+    # (auth_app.hashing); bez niego hashujemy synchronicznie jak dotąd.
+    if hashed_password is None:
+        hashed_password = pwd_context.hash(user.password)
     db_user = models.User(email=user.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
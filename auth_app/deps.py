@@ -2,12 +2,15 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from common import models
-from common.database import get_db
+from common.cache import TTLCache
+from common.database import get_async_db
 from auth_app import schemas
 import os
+import time
 
 # Schemat OAuth2, który wskazuje, skąd pobrać token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
@@ -15,16 +18,58 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> models.User:
-    """
-    Dekoduje token JWT, weryfikuje go i zwraca obiekt użytkownika z bazy danych.
-    To jest główna funkcja zabezpieczająca endpointy.
-    """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
+# --- CACHE UWIERZYTELNIANIA ---
+# Zweryfikowane tokeny (token -> email) są pamiętane do czasu ich 'exp',
+# a rozwiązani użytkownicy (email -> kopia User) przez AUTH_USER_CACHE_TTL
+# sekund. Dla "gorących" użytkowników uwierzytelnienie to dwa odczyty
+# ze słownika, bez dekodowania JWT i bez zapytania do bazy.
+#
+# Zmiany użytkownika przez ORM w tym procesie unieważniają wpis od razu
+# (zdarzenia mappera poniżej). Zmiany z innych workerów/instancji, zbiorcze
+# UPDATE/DELETE i ręczne zmiany w bazie nie wywołują tych zdarzeń - dla nich
+# AUTH_USER_CACHE_TTL jest górną granicą nieaktualności (np. odebranej roli),
+# dlatego powinien pozostać krótki.
+token_cache = TTLCache(
+    ttl=float(os.getenv("AUTH_TOKEN_CACHE_TTL", 1800)),
+    max_entries=int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", 10000)),
+)
+user_cache = TTLCache(
+    ttl=float(os.getenv("AUTH_USER_CACHE_TTL", 30)),
+    max_entries=int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", 10000)),
+)
+
+def _cached_copy(user: models.User) -> models.User:
+    # Przechowujemy niezależną od sesji kopię - obiekt z zamkniętej sesji
+    # nie może być bezpiecznie współdzielony między żądaniami.
+    return models.User(
+        id=user.id,
+        email=user.email,
+        hashed_password=user.hashed_password,
+        role=user.role,
+        created_at=user.created_at,
     )
+
+def invalidate_user(email: str):
+    """Usuwa użytkownika z cache (wywoływane po każdej zmianie użytkownika przez ORM)."""
+    user_cache.delete(email)
+
+@event.listens_for(models.User, "after_insert")
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_user(target.email)
+    # Przy zmianie adresu e-mail unieważniamy również stary klucz.
+    for old_email in inspect(target).attrs.email.history.deleted or ():
+        invalidate_user(old_email)
+
+def auth_cache_stats() -> dict:
+    """Zwraca liczniki trafień cache tokenów i użytkowników."""
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
+
+def _decode_token_subject(token: str, credentials_exception: HTTPException) -> str:
+    email = token_cache.get(token)
+    if email is not None:
+        return email
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -33,13 +78,39 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
         token_data = schemas.TokenData(email=email)
     except (JWTError, ValidationError):
         raise credentials_exception
-    
-    user = db.query(models.User).filter(models.User.email == token_data.email).first()
+
+    exp = payload.get("exp")
+    if exp is not None:
+        # 'exp' to czas uniksowy - przeliczamy go na zegar monotoniczny cache.
+        token_cache.set(token, token_data.email, expires_at=time.monotonic() + (exp - time.time()))
+    return token_data.email
+
+async def get_current_user(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> models.User:
+    """
+    Dekoduje token JWT, weryfikuje go i zwraca obiekt użytkownika z bazy danych.
+    To jest główna funkcja zabezpieczająca endpointy.
+    Wynik weryfikacji tokena i sam użytkownik są cache'owane w pamięci procesu.
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    email = _decode_token_subject(token, credentials_exception)
+
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+
+    result = await db.execute(select(models.User).filter(models.User.email == email))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
+    user = _cached_copy(user)
+    user_cache.set(email, user)
     return user
 
-def get_current_user_id(current_user: models.User = Depends(get_current_user)) -> int:
+async def get_current_user_id(current_user: models.User = Depends(get_current_user)) -> int:
     """
     Zależność, która pobiera pełny obiekt użytkownika, ale zwraca tylko jego ID.
     Jest to wygodne w endpointach, gdzie potrzebujemy tylko ID właściciela.
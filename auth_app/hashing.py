@@ -0,0 +1,103 @@
+# auth_app/hashing.py
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from common.profiling import record_timing
+
+# Kontekst jest tworzony przy imporcie modułu - również w każdym procesie
+# potomnym ProcessPoolExecutor.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Wykonuje bcrypt na osobnym, ograniczonym executorze (wątki lub procesy),
+    aby logowania i rejestracje nie zajmowały domyślnej puli wątków FastAPI,
+    z której korzystają wszystkie synchroniczne endpointy.
+
+    Liczba zadań oczekujących w kolejce jest ograniczona - gdy executor jest
+    nasycony, żądanie jest natychmiast odrzucane z 503 zamiast czekać.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int | None = None, max_queue: int | None = None):
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * 4 if max_queue is None else max_queue
+        self._executor: Executor | None = None
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _submit(self, fn, *args):
+        # Licznik jest modyfikowany wyłącznie w pętli zdarzeń - bez blokad.
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+            # Czas łącznie z oczekiwaniem w kolejce executora (Server-Timing: hash)
+            record_timing("hash", time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+# Współdzielona instancja; konfiguracja przez zmienne środowiskowe:
+# AUTH_HASH_EXECUTOR (thread | process), AUTH_HASH_WORKERS, AUTH_HASH_MAX_QUEUE.
+password_hasher = PasswordHasher(
+    kind=os.getenv("AUTH_HASH_EXECUTOR", "thread").strip().lower(),
+    workers=int(os.getenv("AUTH_HASH_WORKERS", 0)) or None,
+    max_queue=int(os.environ["AUTH_HASH_MAX_QUEUE"]) if os.getenv("AUTH_HASH_MAX_QUEUE") else None,
+)
@@ -2,30 +2,35 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from common import models
-from common.database import get_db 
-from . import crud, schemas
+from common.database import get_async_db
+from . import async_crud, crud, schemas
 # Importujemy zależność z nowego pliku deps.py
-from .deps import get_current_user
+from .deps import get_current_user, auth_cache_stats
+from .hashing import password_hasher
 
 router = APIRouter()
 
+# Rejestracja i logowanie są async: bcrypt działa na dedykowanym executorze
+# (password_hasher), a zapytania do bazy idą przez AsyncSession.
+# Dzięki temu seria logowań nie wyczerpuje wątków dla pozostałych endpointów.
+
 @router.post("/register", response_model=schemas.UserOut, tags=["Authentication"])
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    created_user = crud.create_user(db=db, user=user)
+    created_user = await async_crud.create_user(db=db, user=user)
     return created_user
 
 @router.post("/login", response_model=schemas.Token, tags=["Authentication"])
-def login_for_access_token(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+async def login_for_access_token(
+    form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)
 ):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not crud.verify_password(form_data.password, user.hashed_password):
+    user = await async_crud.get_user_by_email(db, email=form_data.username)
+    if not user or not await async_crud.verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -41,9 +46,18 @@ def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/users/me", response_model=schemas.UserOut, tags=["Users"])
-def read_users_me(current_user: models.User = Depends(get_current_user)):
+async def read_users_me(current_user: models.User = Depends(get_current_user)):
     """
     Pobiera dane o aktualnie zalogowanym użytkowniku.
     Wymaga ważnego tokena JWT.
     """
-    return current_user
\ No newline at end of file
+    return current_user
+
+@router.get("/auth/cache-stats", tags=["Monitoring"])
+async def read_auth_cache_stats(current_user: models.User = Depends(get_current_user)):
+    """
+    Zwraca współczynniki trafień cache uwierzytelniania
+    (zweryfikowane tokeny i rozwiązani użytkownicy) oraz obciążenie
+    executora bcrypt.
+    """
+    return {**auth_cache_stats(), "password_hasher": password_hasher.stats()}
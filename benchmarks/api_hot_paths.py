@@ -0,0 +1,642 @@
+# benchmarks/api_hot_paths.py
+#
+# Powtarzalny benchmark najgorętszych ścieżek API. Skrypt sam stawia całe
+# środowisko: bazę (SQLite w katalogu tymczasowym albo lokalny Postgres),
+# atrapę S3 (moto), atrapę Groq API z konfigurowalnym opóźnieniem, wypełnia
+# bazę realistyczną liczbą danych, uruchamia API (main:app) i serwis AI
+# (prometheus_app.main:app) przez uvicorn, a następnie mierzy przepustowość
+# i opóźnienia p50/p95/p99 każdego scenariusza przy zadanej współbieżności:
+#
+#   pip install "moto[server]"
+#   python benchmarks/api_hot_paths.py --duration 20 --concurrency 32 \
+#       --output benchmarks/results/main.json
+#
+# Porównanie z wcześniejszym wynikiem (kod wyjścia 1 przy regresji większej
+# niż --tolerance procent przepustowości lub p95):
+#
+#   python benchmarks/api_hot_paths.py --baseline benchmarks/results/main.json
+#
+# UWAGA: baza wskazana przez --database-url jest czyszczona (drop_all) przed
+# wypełnieniem - używaj osobnej bazy, np. postgresql://localhost/hardban_bench.
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+import zlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from benchmarks.login_throughput import latency_summary
+
+BENCH_PASSWORD = "benchmark-password"
+BUCKET = "hardban-bench"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --- ATRAPA GROQ API ---
+# Endpoint /chat/completions zgodny z OpenAI; treść odpowiedzi zależy od
+# promptu, tak aby parsery w prometheus_app przechodziły swoją zwykłą ścieżkę.
+
+def _fake_completion(messages: list) -> str:
+    prompt = messages[-1]["content"] if messages else ""
+    if "short_description" in prompt:
+        return json.dumps({
+            "short_description": "Energetyczny singiel na letnie wieczory.",
+            "marketing_copy": "Pulsujący bit, ciepłe syntezatory i refren, który zostaje w głowie. " * 4,
+            "social_media_caption": "🎵 Nowy singiel już jest! 🔥",
+            "hashtags": ["#newmusic", "#electronic", "#summer", "#release", "#indie"],
+        }, ensure_ascii=False)
+    if "TEKST DO ANALIZY" in prompt:
+        return '```json\n{"analysis": "pozytywny", "confidence": 0.91, "suggestions": ["Rozwiń drugą zwrotkę"]}\n```'
+    verse = "Miasto śpi, a my tańczymy do rana\nŚwiatła neonów, ta noc jest nam dana\n"
+    return ("[Zwrotka]\n" + verse * 4 + "[Refren]\n" + verse * 2) * 3
+
+
+def fake_groq_app(latency: float, stream_chunks: int):
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        payload = json.loads(body or b"{}")
+        content = _fake_completion(payload.get("messages", []))
+
+        if not payload.get("stream"):
+            await asyncio.sleep(latency)
+            response = {"choices": [{"message": {"role": "assistant", "content": content}}]}
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": json.dumps(response).encode()})
+            return
+
+        # Strumień: to samo opóźnienie łącznie, rozłożone na fragmenty
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        step = max(1, len(content) // stream_chunks)
+        for offset in range(0, len(content), step):
+            await asyncio.sleep(latency / stream_chunks)
+            chunk = {"choices": [{"delta": {"content": content[offset:offset + step]}}]}
+            await send({"type": "http.response.body", "body": f"data: {json.dumps(chunk)}\n\n".encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+    return app
+
+
+def run_fake_groq(args):
+    import uvicorn
+    uvicorn.run(fake_groq_app(args.latency, args.stream_chunks), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# --- DANE TESTOWE ---
+
+def png_parts(size: int, seed: int = 3) -> tuple:
+    """
+    Okładka PNG (szum RGB, size x size) jako (początek, koniec, funkcja chunk) -
+    między nimi wstawiamy unikalny chunk tEXt, żeby deduplikacja nie pomijała uploadów.
+    """
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rng = random.Random(seed)
+    row = size * 3
+    raw = b"".join(b"\x00" + rng.randbytes(row) for _ in range(size))
+    head = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+    head += chunk(b"IDAT", zlib.compress(raw, 1))
+    return head, chunk(b"IEND", b""), chunk
+
+
+def wav_bytes(seconds: float, seed: int = 5) -> bytes:
+    """Nagranie WAV 44.1 kHz / 16 bit / stereo (szum) - analizowane w tle przez API."""
+    import io
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(2)
+        writer.setsampwidth(2)
+        writer.setframerate(44100)
+        writer.writeframes(rng.randbytes(int(seconds * 44100) * 4))
+    return buffer.getvalue()
+
+
+class ReleaseFiles:
+    """Pliki do POST /music/releases/ - każde wywołanie daje nowe bajty (chyba że reuse)."""
+
+    def __init__(self, cover_px: int, audio_seconds: float, reuse: bool):
+        self.head, self.tail, self._chunk = png_parts(cover_px)
+        self.audio = wav_bytes(audio_seconds)
+        self.reuse = reuse
+        self.counter = 0
+
+    @property
+    def size_mb(self) -> float:
+        return round((len(self.head) + len(self.tail) + len(self.audio)) / (1024 * 1024), 1)
+
+    def next(self) -> tuple:
+        self.counter += 1
+        if self.reuse:
+            return self.head + self.tail, self.audio
+        nonce = f"{os.getpid()}-{self.counter}-{time.time_ns()}".encode()
+        cover = self.head + self._chunk(b"tEXt", b"bench\x00" + nonce) + self.tail
+        # Ostatnie bajty danych audio (pojedyncze próbki) - inny SHA-256, ten sam format
+        audio = self.audio[:-len(nonce)] + nonce
+        return cover, audio
+
+
+def seed_database(database_url: str, users: int, releases: int, max_splits: int, seed: int = 42) -> dict:
+    """Czyści bazę i wypełnia ją użytkownikami, wydawnictwami i podziałami tantiem."""
+    from sqlalchemy import create_engine, text
+    from auth_app.hashing import pwd_context
+    from common.database import Base
+    from common import models
+    from music_app import models as music_models
+
+    rng = random.Random(seed)
+    engine = create_engine(database_url)
+    start = time.perf_counter()
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    # Jeden hash dla wszystkich kont - koszt bcrypt liczy się przy logowaniu, nie przy seedzie
+    hashed = pwd_context.hash(BENCH_PASSWORD)
+    base_url = f"https://{BUCKET}.s3.amazonaws.com"
+    split_count = 0
+
+    def batches(rows, size=5000):
+        for index in range(0, len(rows), size):
+            yield rows[index:index + size]
+
+    with engine.begin() as connection:
+        user_rows = [
+            {"id": i, "email": f"bench{i}@example.com", "hashed_password": hashed, "role": "artist"}
+            for i in range(1, users + 1)
+        ]
+        for batch in batches(user_rows):
+            connection.execute(models.User.__table__.insert(), batch)
+
+        release_rows, split_rows = [], []
+        for release_id in range(1, releases + 1):
+            # Rozkład skośny: użytkownicy o niskich ID (ci z tokenami) mają najwięcej wydawnictw
+            owner_id = int(users * rng.random() ** 2) + 1
+            release_rows.append({
+                "id": release_id,
+                "title": f"Release {release_id}",
+                "artist": f"Artist {owner_id}",
+                "cover_image_url": f"{base_url}/covers/{release_id:08x}.png",
+                "audio_file_url": f"{base_url}/audio/{release_id:08x}.wav",
+                "status": rng.choice(["pending", "pending", "published"]),
+                "owner_id": owner_id,
+            })
+            # Suma udziałów <= 60% - zostaje miejsce na podziały dodawane w benchmarku
+            for index in range(rng.randint(0, max_splits)):
+                split_count += 1
+                split_rows.append({
+                    "id": split_count,
+                    "email": f"payee{rng.randint(1, users)}@example.com",
+                    "share_percentage": round(rng.uniform(1, 60 / max(1, max_splits)), 2),
+                    "release_id": release_id,
+                })
+        for batch in batches(release_rows):
+            connection.execute(music_models.MusicRelease.__table__.insert(), batch)
+        for batch in batches(split_rows):
+            connection.execute(music_models.MusicReleaseRoyaltySplit.__table__.insert(), batch)
+
+        if engine.dialect.name == "postgresql":
+            # Jawne ID nie przesuwają sekwencji - kolejne INSERT-y API by się z nimi zderzyły
+            for table in ("users", "music_releases", "music_release_royalty_splits"):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))"
+                ))
+
+    owners = {}
+    for row in release_rows:
+        owners.setdefault(row["owner_id"], []).append(row["id"])
+    engine.dispose()
+    return {
+        "users": users,
+        "releases": releases,
+        "royalty_splits": split_count,
+        "seed_s": round(time.perf_counter() - start, 2),
+        "releases_by_owner": owners,
+    }
+
+
+# --- PROCESY POMOCNICZE ---
+
+class Services:
+    """Uruchamia moto, atrapę Groq, API i serwis AI jako podprocesy."""
+
+    def __init__(self, args):
+        self.args = args
+        self.processes = []
+        self.moto_port, self.groq_port = free_port(), free_port()
+        self.api_port, self.ai_port = free_port(), free_port()
+        self.env = {
+            **os.environ,
+            "DATABASE_URL": args.database_url,
+            "SECRET_KEY": os.getenv("SECRET_KEY", "benchmark-secret"),
+            "ACCESS_TOKEN_EXPIRE_MINUTES": "120",
+            "STORAGE_BACKEND": "s3",
+            "AWS_ACCESS_KEY_ID": "bench",
+            "AWS_SECRET_ACCESS_KEY": "bench",
+            "AWS_REGION": "us-east-1",
+            "AWS_S3_BUCKET_NAME": BUCKET,
+            "AWS_S3_ENDPOINT_URL": f"http://127.0.0.1:{self.moto_port}",
+            "GROQ_API_KEY": "bench",
+            "GROQ_BASE_URL": f"http://127.0.0.1:{self.groq_port}",
+            # Limity AI odrzucałyby większość żądań benchmarku (chyba że ustawione jawnie)
+            "PROMETHEUS_RATE_LIMIT_BACKEND": os.getenv("PROMETHEUS_RATE_LIMIT_BACKEND", "none"),
+            "PYTHONPATH": ROOT,
+        }
+        os.environ.update({key: value for key, value in self.env.items() if key != "PYTHONPATH"})
+
+    def spawn(self, *command):
+        self.processes.append(subprocess.Popen(
+            [sys.executable, *command], cwd=ROOT, env=self.env,
+            stdout=None if self.args.verbose else subprocess.DEVNULL,
+            stderr=None if self.args.verbose else subprocess.DEVNULL,
+        ))
+
+    def start_backing(self):
+        self.spawn("-m", "moto.server", "-H", "127.0.0.1", "-p", str(self.moto_port))
+        self.spawn(__file__, "fake-groq", "--port", str(self.groq_port),
+                   "--latency", str(self.args.groq_latency), "--stream-chunks", str(self.args.groq_stream_chunks))
+        wait_for_port(self.moto_port)
+        wait_for_port(self.groq_port)
+
+        import boto3
+        boto3.client("s3", endpoint_url=self.env["AWS_S3_ENDPOINT_URL"], region_name="us-east-1",
+                     aws_access_key_id="bench", aws_secret_access_key="bench").create_bucket(Bucket=BUCKET)
+
+    def start_apps(self):
+        workers = ["--workers", str(self.args.workers)] if self.args.workers > 1 else []
+        self.spawn("-m", "uvicorn", self.args.app, "--port", str(self.api_port), "--log-level", "warning", *workers)
+        self.spawn("-m", "uvicorn", "prometheus_app.main:app", "--port", str(self.ai_port), "--log-level", "warning", *workers)
+        wait_for_http(f"http://127.0.0.1:{self.api_port}/")
+        wait_for_http(f"http://127.0.0.1:{self.ai_port}/")
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=0.5):
+            return
+        time.sleep(0.1)
+    raise RuntimeError(f"Service on port {port} did not start within {timeout}s")
+
+
+def wait_for_http(url: str, timeout: float = 60.0):
+    import httpx
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(httpx.HTTPError):
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not respond within {timeout}s")
+
+
+# --- SCENARIUSZE ---
+
+@dataclass
+class Scenario:
+    name: str
+    service: str  # "api" | "ai"
+    # (numer żądania) -> (metoda, ścieżka, argumenty dla httpx)
+    build: Callable[[int], tuple]
+    ok: tuple = (200,)
+    stream: bool = False
+    concurrency: Optional[int] = None
+
+
+@dataclass
+class ScenarioResult:
+    latencies: list = field(default_factory=list)
+    first_byte: list = field(default_factory=list)
+    statuses: Counter = field(default_factory=Counter)
+    errors: Counter = field(default_factory=Counter)
+
+
+def build_scenarios(args, tokens: dict, releases_by_owner: dict, files: ReleaseFiles) -> tuple:
+    """Zwraca (scenariusze, lista ID zleconych zadań AI - wypełniana w trakcie)."""
+    rng = random.Random(1)
+    users = list(tokens)
+    owners = [user_id for user_id in users if releases_by_owner.get(user_id)]
+    auth = lambda user_id: {"Authorization": f"Bearer {tokens[user_id]}"}
+    cache = {"cache": "true" if args.ai_cache else "false"}
+    lyrics = {"genre": "techno", "theme": "nocne miasto", "language": "polish"}
+    description = {"title": "Neon", "artist": "Bench Artist", "genre": "house", "mood": "energetic"}
+    analysis = {"text": "Miasto śpi, a my tańczymy do rana", "analysis_type": "sentiment"}
+    jobs = []
+
+    def login(i):
+        user_id = rng.randint(1, args.users)
+        return "POST", "/login", {"data": {"username": f"bench{user_id}@example.com", "password": BENCH_PASSWORD}}
+
+    def users_me(i):
+        return "GET", "/users/me", {"headers": auth(rng.choice(users))}
+
+    def releases_list(i):
+        return "GET", "/music/releases/", {"headers": auth(rng.choice(users)), "params": {"limit": 50}}
+
+    def releases_create(i):
+        cover, audio = files.next()
+        return "POST", "/music/releases/", {
+            "headers": auth(rng.choice(users)),
+            "data": {"title": f"Bench {i}", "artist": "Bench Artist"},
+            "files": {"cover_image": ("cover.png", cover, "image/png"), "audio_file": ("track.wav", audio, "audio/wav")},
+        }
+
+    def royalty_split(i):
+        # Udział 0.01% i unikalny e-mail - tysiące dodań na wydawnictwo przed limitem 100%
+        user_id = rng.choice(owners)
+        release_id = rng.choice(releases_by_owner[user_id])
+        return "POST", f"/music/releases/{release_id}/royalty-splits", {
+            "headers": auth(user_id), "json": {"email": f"split{i}-{os.getpid()}@example.com", "share_percentage": 0.01},
+        }
+
+    def ai_post(path, body):
+        def build(i):
+            return "POST", path, {"json": body, "params": cache}
+        return build
+
+    def job_status(i):
+        return "GET", f"/jobs/{rng.choice(jobs) if jobs else 'missing'}", {}
+
+    scenarios = [
+        Scenario("login", "api", login),
+        Scenario("users_me", "api", users_me),
+        Scenario("releases_list", "api", releases_list),
+        Scenario("releases_create", "api", releases_create, ok=(201,), concurrency=args.upload_concurrency),
+        Scenario("royalty_split_create", "api", royalty_split, ok=(201,)),
+        Scenario("ai_generate_lyrics", "ai", ai_post("/generate/lyrics", lyrics)),
+        Scenario("ai_generate_description", "ai", ai_post("/generate/description", description)),
+        Scenario("ai_generate_description_batch", "ai",
+                 ai_post("/generate/description/batch", {"items": [description] * args.batch_items})),
+        Scenario("ai_lyrics_stream", "ai", ai_post("/generate/lyrics/stream", lyrics), stream=True),
+        Scenario("ai_description_stream", "ai", ai_post("/generate/description/stream", description), stream=True),
+        Scenario("ai_analyze_text", "ai", ai_post("/analyze/text", analysis)),
+        Scenario("ai_jobs_lyrics", "ai", ai_post("/jobs/lyrics", lyrics), ok=(202,)),
+        Scenario("ai_jobs_description", "ai", ai_post("/jobs/description", description), ok=(202,)),
+        Scenario("ai_jobs_description_batch", "ai",
+                 ai_post("/jobs/description/batch", {"items": [description] * args.batch_items}), ok=(202,)),
+        Scenario("ai_jobs_analyze", "ai", ai_post("/jobs/analyze", analysis), ok=(202,)),
+        Scenario("ai_job_status", "ai", job_status),
+        Scenario("ai_status", "ai", lambda i: ("GET", "/ai/status", {})),
+        Scenario("ai_pool", "ai", lambda i: ("GET", "/ai/pool", {})),
+        Scenario("ai_cache", "ai", lambda i: ("GET", "/ai/cache", {})),
+        Scenario("ai_coalescing", "ai", lambda i: ("GET", "/ai/coalescing", {})),
+        Scenario("ai_metrics", "ai", lambda i: ("GET", "/metrics", {})),
+        Scenario("ai_root", "ai", lambda i: ("GET", "/", {})),
+    ]
+    if args.only:
+        wanted = set(args.only.split(","))
+        scenarios = [scenario for scenario in scenarios if scenario.name in wanted]
+    return scenarios, jobs
+
+
+async def run_scenario(client, scenario: Scenario, concurrency: int, duration: float, warmup: float, on_response=None) -> dict:
+    result = ScenarioResult()
+    counter = 0
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+
+    async def worker():
+        nonlocal counter
+        while time.perf_counter() < deadline:
+            counter += 1
+            method, path, kwargs = scenario.build(counter)
+            start = time.perf_counter()
+            first_byte = None
+            try:
+                if scenario.stream:
+                    async with client.stream(method, path, **kwargs) as response:
+                        async for _ in response.aiter_raw():
+                            if first_byte is None:
+                                first_byte = time.perf_counter() - start
+                else:
+                    response = await client.request(method, path, **kwargs)
+            except Exception as e:
+                if start >= measure_from:
+                    result.errors[type(e).__name__] += 1
+                continue
+            elapsed = time.perf_counter() - start
+            if on_response is not None and response.status_code in scenario.ok:
+                on_response(response)
+            if start < measure_from:
+                continue
+            result.statuses[response.status_code] += 1
+            if response.status_code in scenario.ok:
+                result.latencies.append(elapsed)
+                if first_byte is not None:
+                    result.first_byte.append(first_byte)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    summary = {
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "requests": sum(result.statuses.values()) + sum(result.errors.values()),
+        "ok_per_s": round(len(result.latencies) / duration, 2),
+        "statuses": {str(code): count for code, count in sorted(result.statuses.items())},
+        "errors": dict(result.errors),
+        "latency": latency_summary(result.latencies),
+    }
+    if scenario.stream:
+        summary["first_byte"] = latency_summary(result.first_byte)
+    return summary
+
+
+async def collect_tokens(client, count: int, concurrency: int = 4) -> dict:
+    # Logowania po kilka naraz - executor bcrypt odrzuca nadmiar (503),
+    # a wtedy ponawiamy po Retry-After.
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login(user_id):
+        async with semaphore:
+            while True:
+                response = await client.post("/login", data={"username": f"bench{user_id}@example.com", "password": BENCH_PASSWORD})
+                if response.status_code != 503:
+                    break
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+        response.raise_for_status()
+        return user_id, response.json()["access_token"]
+    return dict(await asyncio.gather(*[login(user_id) for user_id in range(1, count + 1)]))
+
+
+async def run_benchmark(args, services: Services, seed: dict) -> dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    api = httpx.AsyncClient(base_url=f"http://127.0.0.1:{services.api_port}", timeout=120.0, limits=limits)
+    ai = httpx.AsyncClient(base_url=f"http://127.0.0.1:{services.ai_port}", timeout=120.0, limits=limits)
+    async with api, ai:
+        tokens = await collect_tokens(api, min(args.token_users, args.users))
+        files = ReleaseFiles(args.cover_px, args.audio_seconds, reuse=args.reuse_files)
+        scenarios, jobs = build_scenarios(args, tokens, seed["releases_by_owner"], files)
+
+        def remember_job(response):
+            jobs.append(response.json()["job_id"])
+
+        results = {}
+        for scenario in scenarios:
+            client = api if scenario.service == "api" else ai
+            concurrency = scenario.concurrency or args.concurrency
+            print(f"  {scenario.name} (concurrency {concurrency}) ...", file=sys.stderr)
+            results[scenario.name] = await run_scenario(
+                client, scenario, concurrency, args.duration, args.warmup,
+                on_response=remember_job if scenario.name.startswith("ai_jobs_") else None,
+            )
+        if "releases_create" in results:
+            results["releases_create"]["upload_mb_per_request"] = files.size_mb
+        return results
+
+
+# --- PORÓWNANIE Z BASELINE ---
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Zwraca listę regresji: spadek ok/s albo wzrost p95 o więcej niż tolerance %."""
+    regressions = []
+    print(f"\n{'scenario':34} {'ok/s':>10} {'Δ':>8} {'p95 ms':>10} {'Δ':>8}", file=sys.stderr)
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            print(f"{name:34} {now['ok_per_s']:>10} {'new':>8} {now['latency']['p95_ms']:>10}", file=sys.stderr)
+            continue
+        rate_delta = 100 * (now["ok_per_s"] - before["ok_per_s"]) / before["ok_per_s"] if before["ok_per_s"] else 0.0
+        p95_before = before["latency"]["p95_ms"]
+        p95_delta = 100 * (now["latency"]["p95_ms"] - p95_before) / p95_before if p95_before else 0.0
+        flag = ""
+        if rate_delta < -tolerance or p95_delta > tolerance:
+            regressions.append({"scenario": name, "ok_per_s_change_pct": round(rate_delta, 1), "p95_change_pct": round(p95_delta, 1)})
+            flag = "  REGRESSION"
+        print(f"{name:34} {now['ok_per_s']:>10} {rate_delta:>+7.1f}% {now['latency']['p95_ms']:>10} {p95_delta:>+7.1f}%{flag}", file=sys.stderr)
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    with contextlib.suppress(Exception):
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API hot path benchmark")
+    sub = parser.add_subparsers(dest="command")
+
+    groq = sub.add_parser("fake-groq", help="run only the fake Groq API (used internally)")
+    groq.add_argument("--port", type=int, required=True)
+    groq.add_argument("--latency", type=float, default=0.3)
+    groq.add_argument("--stream-chunks", type=int, default=20)
+
+    parser.add_argument("--database-url", default=None, help="default: a fresh SQLite file in the temp directory")
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers per service")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--releases", type=int, default=50000)
+    parser.add_argument("--max-splits", type=int, default=4, help="royalty splits per seeded release (0..N)")
+    parser.add_argument("--token-users", type=int, default=50, help="users logged in up front for authenticated scenarios")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--upload-concurrency", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--cover-px", type=int, default=1500, help="cover edge in pixels (noise PNG, ~6.4 MB at 1500)")
+    parser.add_argument("--audio-seconds", type=float, default=60.0, help="WAV length (~10 MB per minute)")
+    parser.add_argument("--reuse-files", action="store_true", help="upload identical files (measures the dedup hit path)")
+    parser.add_argument("--batch-items", type=int, default=10)
+    parser.add_argument("--groq-latency", type=float, default=0.3, help="fake Groq response time in seconds")
+    parser.add_argument("--groq-stream-chunks", type=int, default=20)
+    parser.add_argument("--ai-cache", action="store_true", help="allow the prometheus_app response cache")
+    parser.add_argument("--only", default=None, help="comma-separated scenario names")
+    parser.add_argument("--output", default=None, help="default: benchmarks/results/<timestamp>.json")
+    parser.add_argument("--baseline", default=None, help="earlier result to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="allowed regression in percent")
+    parser.add_argument("--verbose", action="store_true", help="show service logs")
+    args = parser.parse_args()
+
+    if args.command == "fake-groq":
+        run_fake_groq(args)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="hardban-bench-")
+    args.database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    services = Services(args)
+    try:
+        print("Starting moto S3 and fake Groq ...", file=sys.stderr)
+        services.start_backing()
+        print(f"Seeding {args.users} users / {args.releases} releases ...", file=sys.stderr)
+        seed = seed_database(args.database_url, args.users, args.releases, args.max_splits)
+        print("Starting API and AI service ...", file=sys.stderr)
+        services.start_apps()
+        scenarios = asyncio.run(run_benchmark(args, services, seed))
+    finally:
+        services.stop()
+
+    from sqlalchemy.engine import make_url
+    result = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "database": make_url(args.database_url).get_backend_name(),
+            "workers": args.workers,
+            "groq_latency_s": args.groq_latency,
+            "ai_cache": args.ai_cache,
+        },
+        "seed": {key: value for key, value in seed.items() if key != "releases_by_owner"},
+        "scenarios": scenarios,
+    }
+
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fp:
+        json.dump(result, fp, indent=2)
+    print(json.dumps(result, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            regressions = compare(result, json.load(fp), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} scenario(s) regressed by more than {args.tolerance}%", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+# benchmarks/cold_start.py
+#
+# Benchmark zimnego startu API. Tryb "import" mierzy czas samego importu
+# modułu aplikacji w świeżym interpreterze i wypisuje pakiety, których
+# import kosztuje najwięcej (python -X importtime):
+#
+#   python benchmarks/cold_start.py import --runs 5 --top 15
+#
+# Tryb "startup" uruchamia uvicorn i mierzy czas od startu procesu do
+# pierwszej poprawnej odpowiedzi (time-to-first-response):
+#
+#   python benchmarks/cold_start.py startup --runs 5 --path /health
+#
+# Oba tryby używają zmiennych środowiskowych bieżącej powłoki (DATABASE_URL
+# itd.); start aplikacji nie łączy się z bazą, więc wystarczy dowolny URL.
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def summary(values: list) -> dict:
+    return {
+        "runs": len(values),
+        "median_ms": round(1000 * statistics.median(values), 1),
+        "min_ms": round(1000 * min(values), 1),
+        "max_ms": round(1000 * max(values), 1),
+    }
+
+
+def parse_importtime(stderr: str, top: int) -> list:
+    """
+    Pakiety najwyższego poziomu z -X importtime, posortowane po sumie
+    czasów własnych (self) ich modułów. Czas łączny (cumulative) przypisałby
+    wszystko modułowi aplikacji, który importuje resztę.
+    """
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": package, "self_ms": round(us / 1000, 1)} for package, us in ranked]
+
+
+def bench_import(args) -> dict:
+    module = args.app.split(":")[0]
+    timings = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    profile = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return {
+        "mode": "import",
+        "module": module,
+        "import": summary(timings),
+        "heaviest_packages": parse_importtime(profile.stderr, args.top),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_response(args) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{args.path}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", args.app, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + args.timeout
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(url, timeout=1.0) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError(f"{url} did not respond within {args.timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def bench_startup(args) -> dict:
+    timings = [time_to_first_response(args) for _ in range(args.runs)]
+    return {
+        "mode": "startup",
+        "app": args.app,
+        "path": args.path,
+        "time_to_first_response": summary(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API cold start benchmark")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    imports = sub.add_parser("import", help="time importing the application module")
+    imports.add_argument("--app", default="main:app")
+    imports.add_argument("--runs", type=int, default=5)
+    imports.add_argument("--top", type=int, default=15)
+
+    startup = sub.add_parser("startup", help="time from process start to the first 200 response")
+    startup.add_argument("--app", default="main:app")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--path", default="/health")
+    startup.add_argument("--timeout", type=float, default=60.0)
+
+    for mode in (imports, startup):
+        mode.add_argument("--output", default=None, help="write results as JSON")
+
+    args = parser.parse_args()
+    result = bench_import(args) if args.mode == "import" else bench_startup(args)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(result, fp, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+# benchmarks/login_throughput.py
+#
+# Benchmark przepustowości logowania.
+#
+# Tryb "hasher" mierzy sam executor bcrypt (auth_app.hashing) - ile weryfikacji
+# na sekundę obsługuje przy danej liczbie workerów i ile żądań odrzuca z 503:
+#
+#   python benchmarks/login_throughput.py hasher --workers 4 --requests 200 --concurrency 64
+#
+# Tryb "http" obciąża działające API (POST /login) i mierzy przepustowość
+# oraz opóźnienia p50/p95/p99; opcjonalnie równolegle odpytuje endpoint
+# odczytu, aby pokazać, czy logowania go zagładzają:
+#
+#   python benchmarks/login_throughput.py http --url http://localhost:8000 \
+#       --email bench@example.com --password secret --concurrency 32 --duration 20 \
+#       --probe /music/releases/ --register
+#
+# --register zakłada konto benchmarku przed pomiarem (istniejące konto
+# jest używane bez zmian), więc wystarczy świeża baza po alembic upgrade head.
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies: list) -> dict:
+    return {
+        "count": len(latencies),
+        "mean_ms": round(1000 * statistics.fmean(latencies), 2) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 50), 2),
+        "p95_ms": round(1000 * percentile(latencies, 95), 2),
+        "p99_ms": round(1000 * percentile(latencies, 99), 2),
+    }
+
+
+async def bench_hasher(args) -> dict:
+    from fastapi import HTTPException
+    from auth_app.hashing import PasswordHasher, pwd_context
+
+    hasher = PasswordHasher(kind=args.executor, workers=args.workers, max_queue=args.max_queue)
+    hashed = pwd_context.hash("benchmark-password")
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, rejected = [], 0
+
+    async def one():
+        nonlocal rejected
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await hasher.verify("benchmark-password", hashed)
+                latencies.append(time.perf_counter() - start)
+            except HTTPException:
+                rejected += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(args.requests)])
+    elapsed = time.perf_counter() - start
+    hasher.shutdown()
+    return {
+        "mode": "hasher",
+        "executor": args.executor,
+        "workers": hasher.workers,
+        "max_queue": hasher.max_queue,
+        "elapsed_s": round(elapsed, 3),
+        "verifications_per_s": round(len(latencies) / elapsed, 2),
+        "rejected_503": rejected,
+        "latency": latency_summary(latencies),
+    }
+
+
+async def bench_http(args) -> dict:
+    import httpx
+
+    deadline = time.perf_counter() + args.duration
+    login_latencies, probe_latencies = [], []
+    statuses = Counter()
+    token = None
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=30.0) as client:
+        form = {"username": args.email, "password": args.password}
+        if args.register:
+            response = await client.post("/register", json={"email": args.email, "password": args.password})
+            if response.status_code not in (200, 400):  # 400 - konto już istnieje
+                response.raise_for_status()
+
+        async def login_worker():
+            nonlocal token
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.post("/login", data=form)
+                login_latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] += 1
+                if response.status_code == 200 and token is None:
+                    token = response.json()["access_token"]
+
+        async def probe_worker():
+            # Odczyt w tle - jego opóźnienie pokazuje, czy logowania blokują resztę API.
+            while time.perf_counter() < deadline:
+                headers = {"Authorization": f"Bearer {token}"} if token else {}
+                start = time.perf_counter()
+                await client.get(args.probe, headers=headers)
+                probe_latencies.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        workers = [login_worker() for _ in range(args.concurrency)]
+        if args.probe:
+            workers.append(probe_worker())
+        start = time.perf_counter()
+        await asyncio.gather(*workers)
+        elapsed = time.perf_counter() - start
+
+    result = {
+        "mode": "http",
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(statuses[200] / elapsed, 2),
+        "statuses": dict(statuses),
+        "login_latency": latency_summary(login_latencies),
+    }
+    if args.probe:
+        result["probe_latency"] = latency_summary(probe_latencies)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    hasher = sub.add_parser("hasher", help="benchmark the bcrypt executor in-process")
+    hasher.add_argument("--executor", choices=["thread", "process"], default="thread")
+    hasher.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    hasher.add_argument("--max-queue", type=int, default=None)
+    hasher.add_argument("--requests", type=int, default=200)
+    hasher.add_argument("--concurrency", type=int, default=64)
+
+    http = sub.add_parser("http", help="benchmark POST /login on a running API")
+    http.add_argument("--url", default="http://localhost:8000")
+    http.add_argument("--email", required=True)
+    http.add_argument("--password", required=True)
+    http.add_argument("--concurrency", type=int, default=32)
+    http.add_argument("--duration", type=float, default=20.0)
+    http.add_argument("--probe", default=None, help="read endpoint polled during the run, e.g. /music/releases/")
+    http.add_argument("--register", action="store_true", help="create the benchmark account first if it does not exist")
+
+    args = parser.parse_args()
+    runner = bench_hasher if args.mode == "hasher" else bench_http
+    result = asyncio.run(runner(args))
+
+    import json
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
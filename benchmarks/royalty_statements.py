@@ -0,0 +1,123 @@
+# benchmarks/royalty_statements.py
+#
+# Benchmark silnika rozliczeń tantiem (music_app.royalties) na syntetycznym
+# raporcie dystrybutora. Generuje plik CSV o zadanej liczbie wierszy (porcjami,
+# bez trzymania całości w pamięci), losowe podziały dla katalogu wydawnictw,
+# a następnie mierzy czas, przepustowość i szczytowe zużycie pamięci (RSS):
+#
+#   python benchmarks/royalty_statements.py --rows 5000000 --releases 20000
+#
+# Uruchomienie z różnymi --rows pokazuje, że pamięć zależy od --chunksize
+# i liczby wydawnictw, a nie od rozmiaru raportu.
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.realpath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+
+STORES = np.array(["spotify", "apple_music", "youtube_music", "deezer", "tidal", "amazon_music"])
+COUNTRIES = np.array(["PL", "DE", "US", "GB", "FR", "SE", "NL", "CZ", "UA", "ES"])
+
+
+def generate_report(path: str, rows: int, releases: int, chunk: int = 1_000_000, seed: int = 7):
+    """Zapisuje syntetyczny raport: jeden wiersz na (utwór, sklep, kraj)."""
+    rng = np.random.default_rng(seed)
+    written = 0
+    with open(path, "w", newline="") as fp:
+        fp.write("release_id,store,country,quantity,net_revenue\n")
+        while written < rows:
+            n = min(chunk, rows - written)
+            quantity = rng.integers(1, 500, n)
+            frame = pd.DataFrame({
+                "release_id": rng.integers(1, releases + 1, n),
+                "store": STORES[rng.integers(0, len(STORES), n)],
+                "country": COUNTRIES[rng.integers(0, len(COUNTRIES), n)],
+                "quantity": quantity,
+                "net_revenue": np.round(quantity * rng.uniform(0.0005, 0.006, n), 6),
+            })
+            frame.to_csv(fp, header=False, index=False)
+            written += n
+
+
+def generate_splits(releases: int, seed: int = 11) -> pd.DataFrame:
+    """1-6 odbiorców na wydawnictwo, udziały sumujące się do <= 100%."""
+    rng = np.random.default_rng(seed)
+    payees = [f"payee{i}@example.com" for i in range(max(10, releases // 4))]
+    rows = []
+    for release_id in range(1, releases + 1):
+        count = int(rng.integers(1, 7))
+        shares = np.floor(rng.dirichlet(np.ones(count)) * 10000) / 100
+        for email_index, share in zip(rng.choice(len(payees), count, replace=False), shares):
+            rows.append((release_id, payees[email_index], Decimal(f"{share:.2f}"), f"Release {release_id}"))
+    return pd.DataFrame(rows, columns=["release_id", "email", "share_percentage", "release_title"])
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss: kilobajty na Linuksie, bajty na macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Royalty statement engine benchmark")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--releases", type=int, default=20_000)
+    parser.add_argument("--chunksize", type=int, default=500_000)
+    parser.add_argument("--report", default=None, help="reuse an existing synthetic report")
+    parser.add_argument("--output", default=None, help="write results as JSON")
+    args = parser.parse_args()
+
+    from music_app.royalties import ReportFormat, run_statements
+
+    report = args.report
+    generate_seconds = None
+    if report is None:
+        report = os.path.join(tempfile.gettempdir(), f"royalty_report_{args.rows}_{args.releases}.csv")
+        start = time.perf_counter()
+        generate_report(report, args.rows, args.releases)
+        generate_seconds = round(time.perf_counter() - start, 2)
+
+    splits = generate_splits(args.releases)
+    rss_before = peak_rss_mb()
+
+    start = time.perf_counter()
+    run = run_statements(report, splits=splits, report_format=ReportFormat(chunksize=args.chunksize))
+    elapsed = time.perf_counter() - start
+
+    payable = sum((s.payable for s in run.statements.values()), Decimal("0"))
+    allocated = sum((s.total for s in run.statements.values()), Decimal("0"))
+    result = {
+        "rows": run.rows_processed,
+        "releases": args.releases,
+        "split_rows": len(splits),
+        "chunksize": args.chunksize,
+        "report_mb": round(os.path.getsize(report) / (1024 * 1024), 1),
+        "generate_s": generate_seconds,
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(run.rows_processed / elapsed),
+        "peak_rss_mb_before": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "payees": len(run.statements),
+        "gross_total": str(run.gross_total),
+        "payable_total": str(payable),
+        "unallocated_total": str(run.unallocated_total),
+        "rounding_residual": str(run.rounding_residual),
+        # Kontrola spójności: podział + nierozdysponowane == przychód brutto
+        "balanced": allocated + run.unallocated_total == run.gross_total,
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(result, fp, indent=2)
+
+
+if __name__ == "__main__":
+    main()
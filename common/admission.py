@@ -0,0 +1,143 @@
+# common/admission.py
+
+import json
+import os
+from typing import Dict, Optional
+
+from prometheus_client import Counter, Gauge
+
+# Kontrola przyjęć (load shedding): każda klasa tras ma własny limit
+# równoległych żądań. Po jego osiągnięciu kolejne żądanie dostaje od razu
+# 503 z Retry-After, zamiast czekać w kolejce na pulę połączeń bazy aż do
+# timeoutu - opóźnienie obsłużonych żądań pozostaje ograniczone.
+
+REQUESTS_SHED = Counter("http_requests_shed_total", "Requests rejected by admission control", ["route_class"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently admitted", ["route_class"])
+
+# Ścieżki zawsze przyjmowane - sondy i scrape nie mogą być odrzucane
+# właśnie wtedy, gdy serwis jest przeciążony.
+EXEMPT_PATHS = frozenset({"/health", "/ready", "/metrics"})
+
+AUTH_PATHS = frozenset({"/login", "/register"})
+UPLOAD_PATHS = frozenset({"/music/releases/", "/music/releases/uploads", "/music/releases/finalize"})
+
+
+def is_stream_path(path: str) -> bool:
+    """GET /music/releases/{id}/audio - odtwarzanie zajmuje miejsce przez cały transfer."""
+    return path.startswith("/music/releases/") and path.endswith("/audio")
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Klasa trasy dla limitu albo None (bez limitu)."""
+    if path in EXEMPT_PATHS:
+        return None
+    if method == "POST" and path in AUTH_PATHS:
+        return "auth"
+    if method == "POST" and path in UPLOAD_PATHS:
+        return "uploads"
+    if method in ("GET", "HEAD") and is_stream_path(path):
+        # Długie strumienie audio mają osobny limit - nie mogą zająć
+        # wszystkich miejsc tanich odczytów JSON.
+        return "streams"
+    if method in ("GET", "HEAD"):
+        return "reads"
+    return "writes"
+
+
+def build_limits() -> Dict[str, int]:
+    """
+    Limity ze zmiennych środowiskowych ADMISSION_<KLASA>_LIMIT
+    (0 = bez limitu). Domyślne wartości zakładają jeden worker
+    i domyślną pulę bazy (DB_POOL_SIZE + DB_MAX_OVERFLOW = 15).
+    """
+    defaults = {"auth": 32, "uploads": 8, "reads": 64, "writes": 32, "streams": 32}
+    return {name: int(os.getenv(f"ADMISSION_{name.upper()}_LIMIT", default)) for name, default in defaults.items()}
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware ASGI ograniczające liczbę żądań w toku per klasa tras
+    (auth, uploads, reads, writes, streams). Żądanie zajmuje miejsce do
+    wysłania całej odpowiedzi, również strumieniowej - ale nie na czas
+    zadań w tle (BackgroundTasks), które Starlette wykonuje już po niej.
+    """
+
+    def __init__(self, app, limits: Optional[Dict[str, int]] = None, retry_after: Optional[int] = None):
+        self.app = app
+        self.limits = limits if limits is not None else build_limits()
+        self.retry_after = retry_after if retry_after is not None else int(os.getenv("ADMISSION_RETRY_AFTER", 1))
+        # Liczniki są modyfikowane wyłącznie w pętli zdarzeń - bez blokad.
+        self.in_flight = {name: 0 for name in self.limits}
+        self.peak_in_flight = {name: 0 for name in self.limits}
+        self.admitted = {name: 0 for name in self.limits}
+        self.rejected = {name: 0 for name in self.limits}
+        for name in self.limits:
+            IN_FLIGHT.labels(name).set_function(lambda name=name: self.in_flight[name])
+        admission_controllers.append(self)
+
+    async def _reject(self, name: str, send):
+        self.rejected[name] += 1
+        REQUESTS_SHED.labels(name).inc()
+        body = json.dumps({"detail": "Service is overloaded, please retry"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        name = route_class(scope["method"], scope["path"])
+        limit = self.limits.get(name, 0)
+        if not limit:
+            await self.app(scope, receive, send)
+            return
+        if self.in_flight[name] >= limit:
+            await self._reject(name, send)
+            return
+
+        self.in_flight[name] += 1
+        self.admitted[name] += 1
+        self.peak_in_flight[name] = max(self.peak_in_flight[name], self.in_flight[name])
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.in_flight[name] -= 1
+
+        async def send_wrapper(message):
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                release()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            release()
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "limit": self.limits[name],
+                "in_flight": self.in_flight[name],
+                "peak_in_flight": self.peak_in_flight[name],
+                "admitted": self.admitted[name],
+                "rejected": self.rejected[name],
+            }
+            for name in self.limits
+        }
+
+
+# Instancje middleware tworzy Starlette przy budowie stosu - rejestr
+# pozwala odczytać ich statystyki (np. w /ready).
+admission_controllers: list = []
@@ -1,6 +1,8 @@
 # common/database.py
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -17,13 +19,69 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise ValueError("Nie zdefiniowano zmiennej środowiskowej DATABASE_URL")
 
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+class Settings:
+    """
+    Ustawienia tokenów dostępowych JWT ze zmiennych środowiskowych:
+    SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES (render.yaml).
+    """
+
+    def __init__(self):
+        self.secret_key = os.getenv("SECRET_KEY")
+        self.algorithm = os.getenv("ALGORITHM", "HS256")
+        self.access_token_expire_minutes = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+
+settings = Settings()
+
+def _pool_kwargs(url: str) -> dict:
+    """
+    Ustawienia puli połączeń ze zmiennych środowiskowych:
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING.
+    SQLite (testy lokalne) korzysta z domyślnej puli dialektu.
+    """
+    kwargs = {"pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True)}
+    if make_url(url).get_backend_name() != "sqlite":
+        kwargs.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+            pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        )
+    return kwargs
+
+def to_async_url(url: str) -> str:
+    """
+    Zamienia URL bazy na wariant z asynchronicznym sterownikiem:
+    postgresql -> postgresql+asyncpg, sqlite -> sqlite+aiosqlite.
+    Można go też podać wprost w ASYNC_DATABASE_URL.
+    """
+    parsed = make_url(url.replace("postgres://", "postgresql://", 1))
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
 # Tworzymy silnik SQLAlchemy - główny punkt połączenia z bazą danych.
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_pool_kwargs(SQLALCHEMY_DATABASE_URL))
 
 # Tworzymy klasę SessionLocal, która będzie fabryką sesji bazodanowych.
 # Każda instancja SessionLocal będzie osobną sesją.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Silnik asynchroniczny (asyncpg / aiosqlite) dla endpointów 'async def'.
+# Zapytania nie blokują pętli zdarzeń ani nie zajmują puli wątków, więc
+# liczba równoległych żądań na worker nie zależy od jej rozmiaru.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_kwargs(ASYNC_DATABASE_URL))
+
+# expire_on_commit=False - obiekty zwracane z endpointów są serializowane
+# po commicie, a w trybie async nie można ich leniwie przeładować.
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Tworzymy bazową klasę dla naszych modeli deklaratywnych.
 # Wszystkie nasze modele w bazie danych będą dziedziczyć z tej klasy.
 Base = declarative_base()
@@ -36,4 +94,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Asynchroniczny odpowiednik get_db - udostępnia AsyncSession na czas żądania.
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
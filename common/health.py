@@ -0,0 +1,86 @@
+# common/health.py
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+def pool_saturation(engine) -> Optional[dict]:
+    """Zajętość puli połączeń silnika; None dla pul bez limitu (SQLite)."""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+        return None
+    # QueuePool nie udostępnia publicznie max_overflow; -1 oznacza brak limitu.
+    capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+    checked_out = pool.checkedout()
+    return {
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
+
+
+class ReadinessProbe:
+    """
+    Stan gotowości dla /ready: wynik pingu bazy (SELECT 1) jest pamiętany
+    przez READY_CACHE_TTL sekund, a równoległe sondy czekają na jeden
+    wspólny ping - częste odpytywanie nie obciąża puli połączeń.
+    """
+
+    def __init__(self, async_engine, engines: Dict[str, object], ttl: Optional[float] = None,
+                 timeout: Optional[float] = None, max_saturation: Optional[float] = None):
+        self.async_engine = async_engine
+        self.engines = engines
+        self.ttl = ttl if ttl is not None else float(os.getenv("READY_CACHE_TTL", 5))
+        self.timeout = timeout if timeout is not None else float(os.getenv("READY_DB_TIMEOUT", 2))
+        self.max_saturation = max_saturation if max_saturation is not None else float(os.getenv("READY_MAX_POOL_SATURATION", 1.0))
+        self._lock = asyncio.Lock()
+        self._checked_at = 0.0
+        self._ping: dict = {"ok": False, "error": "not checked yet"}
+
+    async def _run_ping(self) -> dict:
+        start = time.perf_counter()
+        try:
+            async with self.async_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+            return {"ok": True, "latency_ms": round(1000 * (time.perf_counter() - start), 2)}
+        except Exception as e:
+            logger.warning(f"Readiness DB ping failed: {e!r}")
+            return {"ok": False, "error": type(e).__name__}
+
+    async def database(self) -> dict:
+        if time.monotonic() - self._checked_at < self.ttl:
+            return self._ping
+        async with self._lock:
+            # Inna sonda mogła odświeżyć wynik w czasie oczekiwania na blokadę
+            if time.monotonic() - self._checked_at >= self.ttl:
+                try:
+                    # Limit obejmuje też oczekiwanie na wolne połączenie z puli
+                    self._ping = await asyncio.wait_for(self._run_ping(), self.timeout)
+                except asyncio.TimeoutError:
+                    self._ping = {"ok": False, "error": "timeout"}
+                self._ping["checked_at"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                self._checked_at = time.monotonic()
+        return self._ping
+
+    async def check(self) -> tuple:
+        """Zwraca (gotowy, szczegóły)."""
+        database = await self.database()
+        pools = {name: pool_saturation(engine) for name, engine in self.engines.items()}
+        saturated = [
+            name for name, pool in pools.items()
+            if pool is not None and pool["saturation"] >= self.max_saturation
+        ]
+        ready = database["ok"] and not saturated
+        return ready, {
+            "status": "ready" if ready else "not ready",
+            "database": database,
+            "pools": pools,
+            "saturated_pools": saturated,
+        }
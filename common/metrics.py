@@ -0,0 +1,108 @@
+# common/metrics.py
+
+import time
+from typing import Dict
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.responses import Response
+
+# Metryki w formacie Prometheus, wspólne dla API i prometheus_app.
+# Koszt na żądanie to jeden pomiar perf_counter i jedna obserwacja
+# histogramu; wartości stanu (pule połączeń) są odczytywane dopiero
+# w chwili scrape'a, bez żadnej pracy na ścieżce żądania.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Żądania niepasujące do żadnej trasy (404 na dowolnych ścieżkach)
+# dzielą jedną etykietę - inaczej liczba serii rosłaby bez ograniczeń.
+UNMATCHED_ROUTE = "__unmatched__"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI mierzące czas obsługi żądania per szablon trasy
+    (np. /music/releases/{release_id}/audio, a nie konkretne ID).
+    Dla odpowiedzi strumieniowych mierzony jest czas do wysłania całości.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._children: Dict[tuple, object] = {}
+
+    def _observe(self, method: str, route: str, status_code: int, elapsed: float):
+        key = (method, route, status_code)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = REQUEST_LATENCY.labels(method, route, str(status_code))
+        child.observe(elapsed)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Router uzupełnia scope o dopasowaną trasę (scope["route"]).
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            self._observe(scope["method"], route, status_code, time.perf_counter() - start)
+
+
+class DatabasePoolCollector:
+    """Stan pul połączeń SQLAlchemy odczytywany przy każdym scrape'ie."""
+
+    def __init__(self, engines: dict):
+        # Przechowujemy silniki, nie pule - engine.dispose() podmienia pulę.
+        self.engines = engines
+
+    def collect(self):
+        metrics = {
+            "size": GaugeMetricFamily("db_pool_size", "Configured pool size", labels=["engine"]),
+            "checkedout": GaugeMetricFamily("db_pool_checked_out", "Connections currently checked out", labels=["engine"]),
+            "checkedin": GaugeMetricFamily("db_pool_checked_in", "Idle connections in the pool", labels=["engine"]),
+            "overflow": GaugeMetricFamily("db_pool_overflow", "Connections open beyond pool_size", labels=["engine"]),
+        }
+        for name, engine in self.engines.items():
+            pool = engine.pool
+            for attribute, family in metrics.items():
+                # Pule bez limitu (NullPool, StaticPool dla SQLite) nie mają tych liczników.
+                if hasattr(pool, attribute):
+                    family.add_metric([name], getattr(pool, attribute)())
+        yield from metrics.values()
+
+
+_pool_collector: DatabasePoolCollector | None = None
+
+
+def register_pool_metrics(engines: dict):
+    # Kolejne wywołania (np. kilka instancji z create_app) podmieniają silniki
+    # zamiast rejestrować zduplikowane serie.
+    global _pool_collector
+    if _pool_collector is None:
+        _pool_collector = DatabasePoolCollector(engines)
+        REGISTRY.register(_pool_collector)
+    else:
+        _pool_collector.engines = engines
+
+
+def metrics_response() -> Response:
+    """Odpowiedź endpointu /metrics (format tekstowy Prometheus)."""
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
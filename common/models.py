@@ -1,6 +1,6 @@
 # common/models.py
 
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import BigInteger, Column, Integer, String, DateTime, func
 # POPRAWIONY IMPORT: Importujemy 'Base' z naszego nowego pliku database.py
 from .database import Base
 
@@ -10,8 +10,31 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    role = Column(String, nullable=False)
+    # Rejestracja nie przyjmuje roli - nowe konta to twórcy muzyki.
+    role = Column(String, nullable=False, default="MUSIC_CREATOR")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     def __repr__(self):
-        return f"<User(id={self.id}, email='{self.email}', role='{self.role}')>"
\ No newline at end of file
+        return f"<User(id={self.id}, email='{self.email}', role='{self.role}')>"
+
+class StoredAsset(Base):
+    """
+    Plik w magazynie adresowany treścią: SHA-256 -> klucz obiektu.
+    ref_count to liczba wydawnictw korzystających z obiektu; obiekty
+    z ref_count = 0 usuwa file_storage.assets.purge_unreferenced.
+    Pliki z bezpośredniego uploadu (presigned) nie przechodzą przez API,
+    więc nie mają skrótu (sha256 = NULL) i nie są deduplikowane.
+    """
+    __tablename__ = 'stored_assets'
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, index=True, nullable=True)
+    s3_key = Column(String, unique=True, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_referenced_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<StoredAsset(sha256='{(self.sha256 or '')[:12]}', key='{self.s3_key}', refs={self.ref_count})>"
@@ -0,0 +1,179 @@
+# common/profiling.py
+
+import cProfile
+import logging
+import os
+import random
+import re
+import secrets
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Rozliczanie czasu żądania: liczba zapytań SQL i ich łączny czas oraz
+# czasy wybranych operacji (bcrypt, magazyn plików) trafiają do nagłówka
+# Server-Timing każdej odpowiedzi (widocznego w DevTools przeglądarki).
+# Profilowanie cProfile jest opcjonalne: nagłówek X-Profile z tokenem
+# PROFILING_TOKEN albo losowanie z prawdopodobieństwem PROFILING_SAMPLE_RATE.
+
+PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", 0.0))
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+SQL_QUERY_WARN_THRESHOLD = int(os.getenv("SQL_QUERY_WARN_THRESHOLD", 20))
+
+
+@dataclass
+class RequestTimings:
+    queries: int = 0
+    sql_seconds: float = 0.0
+    # Czasy innych operacji: nazwa -> (sekundy, liczba wywołań)
+    spans: Dict[str, list] = field(default_factory=dict)
+    # Jedno żądanie może dopisywać czasy z kilku wątków naraz (gather +
+    # run_in_threadpool, równoległe części uploadu) - "+=" nie jest atomowe.
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            span = self.spans.setdefault(name, [0.0, 0])
+            span[0] += seconds
+            span[1] += 1
+
+    def add_query(self, seconds: float):
+        with self._lock:
+            self.queries += 1
+            self.sql_seconds += seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        with self._lock:
+            spans = [(name, seconds, count) for name, (seconds, count) in self.spans.items()]
+        entries = [f'db;dur={self.sql_seconds * 1000:.2f};desc="{self.queries} queries"']
+        entries += [
+            f'{name};dur={seconds * 1000:.2f};desc="{count} calls"'
+            for name, seconds, count in spans
+        ]
+        entries.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(entries)
+
+
+# Obiekt jest współdzielony przez kontekst żądania - również w wątkach puli
+# (run_in_threadpool kopiuje kontekst) i w kodzie SQLAlchemy async.
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_timing(name: str, seconds: float):
+    """Dolicza czas operacji do bieżącego żądania (poza żądaniem - nic nie robi)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+# --- ZAPYTANIA SQL ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    timings = _current.get()
+    if timings is not None:
+        timings.add_query(time.perf_counter() - start)
+
+
+def install_query_hooks(*engines):
+    """Podpina liczenie zapytań pod silniki (dla async: async_engine.sync_engine)."""
+    for engine in engines:
+        if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+            continue
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- MIDDLEWARE ---
+
+def _profile_filename(profile_id: str, scope, elapsed: float) -> str:
+    route = getattr(scope.get("route"), "path", None) or scope["path"]
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+    return f"{profile_id}-{scope['method']}-{slug}-{elapsed * 1000:.0f}ms.prof"
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI: dla każdego żądania liczy zapytania SQL i czasy
+    operacji (nagłówek Server-Timing, ostrzeżenie powyżej
+    SQL_QUERY_WARN_THRESHOLD zapytań), a dla wybranych żądań zapisuje
+    profil cProfile do PROFILING_DIR (pstats / snakeviz).
+
+    cProfile obejmuje wątek pętli zdarzeń, więc w danej chwili profilowane
+    jest najwyżej jedno żądanie; czas spędzony w puli wątków (bcrypt, boto3)
+    widać w profilu jako oczekiwanie, a jego rozbicie - w Server-Timing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._profiling = threading.Lock()
+        if PROFILING_SAMPLE_RATE > 0 or PROFILING_TOKEN:
+            os.makedirs(PROFILING_DIR, exist_ok=True)
+
+    def _should_profile(self, scope) -> bool:
+        if PROFILING_TOKEN:
+            for name, value in scope["headers"]:
+                if name == b"x-profile":
+                    return secrets.compare_digest(value.decode(), PROFILING_TOKEN)
+        return PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+
+        profiler = None
+        if self._should_profile(scope) and self._profiling.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            # Identyfikator zwracany w X-Profile-Id to początek nazwy pliku profilu
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing(time.perf_counter() - start).encode()))
+                if profiler is not None:
+                    headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            if profiler is None:
+                await self.app(scope, receive, send_with_timing)
+            else:
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, send_with_timing)
+                finally:
+                    profiler.disable()
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            if profiler is not None:
+                try:
+                    profile_name = _profile_filename(profile_id, scope, elapsed)
+                    profiler.dump_stats(os.path.join(PROFILING_DIR, profile_name))
+                    logger.info(f"Profile of {scope['method']} {scope['path']} written to {profile_name}")
+                finally:
+                    self._profiling.release()
+            if timings.queries > SQL_QUERY_WARN_THRESHOLD:
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                logger.warning(
+                    f"{scope['method']} {route} issued {timings.queries} SQL queries "
+                    f"({timings.sql_seconds * 1000:.1f} ms) - possible N+1"
+                )
@@ -0,0 +1,255 @@
+# file_storage/assets.py
+#
+# Deduplikacja plików po treści. Skrót SHA-256 jest liczony w tym samym
+# przebiegu, w którym plik jest wysyłany do magazynu (bez osobnego czytania
+# całego pliku); jeśli identyczna treść już istnieje (tabela stored_assets),
+# świeżo zapisana kopia jest usuwana, a wydawnictwo dostaje URL istniejącego
+# obiektu. Licznik referencji pozwala później bezpiecznie usunąć nieużywane
+# obiekty:
+#
+#   python -m file_storage.assets purge --grace-hours 24
+import argparse
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Iterable, NamedTuple, Optional
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from common.database import SessionLocal
+from common.models import StoredAsset
+from .base import StorageBackend
+from .storage import storage
+
+logger = logging.getLogger(__name__)
+
+
+class HashingReader:
+    """
+    Strumień tylko do odczytu, który liczy SHA-256 i rozmiar czytanych
+    danych. Nie obsługuje seek - backend czyta go raz, po kolei (boto3
+    buforuje części multipart w pamięci, więc ponowienia nie czytają
+    strumienia drugi raz i skrót odpowiada dokładnie wysłanej treści).
+    """
+
+    def __init__(self, file_obj: BinaryIO):
+        self._file = file_obj
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._file.read(size)
+        self._digest.update(chunk)
+        self.size += len(chunk)
+        return chunk
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self.size
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def _acquire(db, digest: str) -> Optional[str]:
+    """Atomowo zwiększa licznik referencji i zwraca klucz obiektu (None, jeśli treść jest nowa)."""
+    s3_key = db.execute(
+        update(StoredAsset)
+        .where(StoredAsset.sha256 == digest)
+        .values(ref_count=StoredAsset.ref_count + 1)
+        .returning(StoredAsset.s3_key)
+    ).scalar()
+    db.commit()
+    return s3_key
+
+
+def release_keys(connection, s3_keys: Iterable[str]):
+    """
+    Zmniejsza liczniki referencji obiektów - o jeden za każde wystąpienie
+    klucza (ta sama treść jako okładka i audio to dwie referencje do jednego
+    obiektu). Przyjmuje sesję lub połączenie; zatwierdzenie należy do
+    wywołującego.
+    """
+    keys_by_count = defaultdict(list)
+    for key, count in Counter(key for key in s3_keys if key).items():
+        keys_by_count[count].append(key)
+    for count, keys in keys_by_count.items():
+        connection.execute(
+            update(StoredAsset)
+            .where(StoredAsset.s3_key.in_(keys), StoredAsset.ref_count > 0)
+            .values(ref_count=case((StoredAsset.ref_count > count, StoredAsset.ref_count - count), else_=0))
+        )
+
+
+class StoredUpload(NamedTuple):
+    url: Optional[str]
+    # True, gdy identyczna treść była już w magazynie (nowa kopia została
+    # usunięta) - jej pliki pochodne (wersje okładki, szczyty audio) też już istnieją.
+    existing: bool = False
+
+
+class AssetStore:
+    """Upload z deduplikacją po SHA-256 na wierzchu backendu magazynu."""
+
+    def __init__(self, handler: StorageBackend):
+        self.handler = handler
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def upload(self, file_obj: BinaryIO, folder: str, original_filename: str) -> StoredUpload:
+        """
+        Przesyła plik, licząc jego skrót w trakcie wysyłania. Jeśli
+        identyczna treść była już w magazynie, nowa kopia jest usuwana,
+        a zwracany jest URL istniejącego obiektu (existing=True). Każde
+        wywołanie zakończone URL-em to jedna referencja (zwalniana przez
+        release_urls).
+        """
+        file_obj.seek(0)
+        reader = HashingReader(file_obj)
+        s3_key = self.handler.new_key(folder, original_filename)
+        file_url = self.handler.upload_file(reader, folder, original_filename, s3_key=s3_key)
+        if file_url is None:
+            return StoredUpload(None)
+        digest, size = reader.hexdigest(), reader.size
+
+        db = SessionLocal()
+        try:
+            existing_key = _acquire(db, digest)
+            if existing_key is None:
+                db.add(StoredAsset(
+                    sha256=digest,
+                    s3_key=s3_key,
+                    size=size,
+                    content_type=mimetypes.guess_type(original_filename)[0],
+                    ref_count=1,
+                ))
+                try:
+                    db.commit()
+                    with self._stats_lock:
+                        self.misses += 1
+                    return StoredUpload(file_url)
+                except IntegrityError:
+                    # Równoległy upload tej samej treści zapisał się pierwszy.
+                    db.rollback()
+                    existing_key = _acquire(db, digest)
+                    if existing_key is None:
+                        raise
+        finally:
+            db.close()
+
+        # Duplikat - magazyn przechowuje jedną kopię treści.
+        self.handler.delete_prefix(s3_key)
+        with self._stats_lock:
+            self.hits += 1
+            self.bytes_saved += size
+        logger.info(f"Dropped upload of {original_filename} ({size} B): identical to {existing_key}")
+        return StoredUpload(self.handler.public_url(existing_key), existing=True)
+
+    def upload_file(self, upload_file, folder: str) -> StoredUpload:
+        """Wariant dla FastAPI UploadFile (blokujący - w endpointach async przez pulę wątków)."""
+        return self.upload(upload_file.file, folder, upload_file.filename or "file")
+
+    def register(self, s3_key: str, size: int, content_type: Optional[str]):
+        """
+        Dolicza referencję do obiektu przesłanego z pominięciem API
+        (presigned) - bez skrótu treści, więc bez deduplikacji. Dzięki temu
+        usunięcie wydawnictwa i purge_unreferenced obejmują też takie pliki.
+        """
+        db = SessionLocal()
+        try:
+            db.add(StoredAsset(sha256=None, s3_key=s3_key, size=size, content_type=content_type, ref_count=1))
+            try:
+                db.commit()
+            except IntegrityError:
+                # Ten sam obiekt sfinalizowany ponownie - kolejna referencja.
+                db.rollback()
+                db.execute(
+                    update(StoredAsset)
+                    .where(StoredAsset.s3_key == s3_key)
+                    .values(ref_count=StoredAsset.ref_count + 1)
+                )
+                db.commit()
+        finally:
+            db.close()
+
+    def release_urls(self, file_urls: Iterable[Optional[str]]):
+        """Zwalnia referencje (np. gdy wydawnictwo ostatecznie nie powstało)."""
+        keys = [self.handler.key_from_url(url) for url in file_urls if url]
+        db = SessionLocal()
+        try:
+            release_keys(db, keys)
+            db.commit()
+        finally:
+            db.close()
+
+    def purge_unreferenced(self, grace: timedelta = timedelta(hours=24)) -> int:
+        """
+        Usuwa obiekty bez referencji, nieużywane dłużej niż 'grace', razem
+        z plikami pochodnymi (wersje okładek, szczyty audio) - mają ten sam
+        prefiks klucza. Zwraca liczbę usuniętych obiektów.
+        """
+        cutoff = datetime.now(timezone.utc) - grace
+        db = SessionLocal()
+        purged = 0
+        try:
+            candidates = db.execute(
+                select(StoredAsset.id, StoredAsset.s3_key)
+                .where(StoredAsset.ref_count == 0, StoredAsset.last_referenced_at < cutoff)
+            ).all()
+            for asset_id, s3_key in candidates:
+                # Warunek ref_count = 0 ponownie w DELETE - obiekt mógł właśnie
+                # zostać użyty ponownie przez równoległy upload.
+                deleted = db.execute(
+                    delete(StoredAsset)
+                    .where(StoredAsset.id == asset_id, StoredAsset.ref_count == 0)
+                    .returning(StoredAsset.id)
+                ).scalar()
+                db.commit()
+                if deleted is not None:
+                    self.handler.delete_prefix(s3_key.rsplit(".", 1)[0])
+                    purged += 1
+        finally:
+            db.close()
+        return purged
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "bytes_saved": self.bytes_saved,
+            }
+
+
+# Współdzielona instancja dla całej aplikacji.
+asset_store = AssetStore(storage)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed asset maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    purge = subcommands.add_parser("purge", help="delete unreferenced objects")
+    purge.add_argument("--grace-hours", type=float, default=float(os.getenv("ASSET_PURGE_GRACE_HOURS", 24)))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "purge":
+        print(f"Purged {asset_store.purge_unreferenced(timedelta(hours=args.grace_hours))} unreferenced objects")
+
+
+if __name__ == "__main__":
+    main()
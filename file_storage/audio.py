@@ -0,0 +1,227 @@
+import math
+import os
+import struct
+import wave
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+# Analiza plików audio (WAV/FLAC) czytanych porcjami o stałej liczbie
+# ramek. Wszystkie akumulatory mają stały rozmiar (sumy, histogram
+# głośności, tablica szczytów o zadanej rozdzielczości), więc pamięć nie
+# zależy od długości utworu. Funkcje są czysto obliczeniowe i działają
+# w procesach ProcessPoolExecutor (music_app/audio_analysis.py).
+
+BLOCK_FRAMES = int(os.getenv("AUDIO_ANALYSIS_BLOCK_FRAMES", 65536))
+WAVEFORM_POINTS = int(os.getenv("AUDIO_WAVEFORM_POINTS", 1000))
+
+# Głośność zintegrowana wg ITU-R BS.1770: bloki 400 ms z krokiem 100 ms,
+# bramka bezwzględna -70 LUFS i względna -10 LU. Zamiast listy wszystkich
+# bloków trzymamy histogram (0.1 LU) - jak tryb histogramowy libebur128.
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+HISTOGRAM_STEP = 0.1
+HISTOGRAM_BINS = int((10.0 - ABSOLUTE_GATE) / HISTOGRAM_STEP)
+
+# Nagłówek formatu .dat (audiowaveform v1, czytany m.in. przez peaks.js):
+# wersja, flagi (bit 0 = próbki 8-bitowe), sample rate, ramek na punkt, liczba punktów.
+WAVEFORM_HEADER = struct.Struct("<iIiiI")
+WAVEFORM_CONTENT_TYPE = "application/octet-stream"
+
+
+class AudioAnalysisError(ValueError):
+    """Plik nie jest obsługiwanym nagraniem WAV/FLAC."""
+
+
+# --- CZYTANIE PORCJAMI ---
+
+def _wave_blocks(reader: wave.Wave_read, blocksize: int) -> Iterator[np.ndarray]:
+    channels = reader.getnchannels()
+    width = reader.getsampwidth()
+    try:
+        while True:
+            raw = reader.readframes(blocksize)
+            if not raw:
+                return
+            if width == 1:
+                samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+            elif width == 2:
+                samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+            elif width == 3:
+                # 24 bit: dopisujemy najmłodszy bajt zerowy i czytamy jako int32
+                triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+                padded = np.zeros((len(triplets), 4), dtype=np.uint8)
+                padded[:, 1:] = triplets
+                samples = padded.view("<i4").ravel().astype(np.float32) / 2147483648.0
+            else:
+                samples = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+            yield samples.reshape(-1, channels)
+    finally:
+        reader.close()
+
+
+def open_audio(path: str, blocksize: int = BLOCK_FRAMES) -> Tuple[int, int, int, Iterator[np.ndarray]]:
+    """
+    Zwraca (sample_rate, kanały, liczba ramek, iterator porcji float32
+    o kształcie (ramki, kanały)). FLAC i WAV float wymagają pakietu
+    soundfile; bez niego obsługiwane są WAV PCM (moduł wave).
+    """
+    try:
+        import soundfile
+    except ImportError:
+        soundfile = None
+
+    if soundfile is not None:
+        try:
+            info = soundfile.info(path)
+        except RuntimeError as e:
+            raise AudioAnalysisError(str(e))
+        blocks = soundfile.blocks(path, blocksize=blocksize, dtype="float32", always_2d=True)
+        return info.samplerate, info.channels, info.frames, blocks
+
+    try:
+        reader = wave.open(path, "rb")
+    except (wave.Error, EOFError) as e:
+        raise AudioAnalysisError(f"Unsupported audio file (FLAC requires soundfile): {e}")
+    return reader.getframerate(), reader.getnchannels(), reader.getnframes(), _wave_blocks(reader, blocksize)
+
+
+# --- FILTR K (BS.1770) ---
+
+def _k_weighting(rate: int) -> list:
+    """
+    Współczynniki dwóch biquadów filtra K dla danej częstotliwości
+    próbkowania (wyprowadzenie jak w libebur128 - dla 48 kHz daje
+    współczynniki z tabel BS.1770).
+    """
+    # Etap 1: półka wysokotonowa ~+4 dB
+    gain, fc, q = 3.999843853973347, 1681.974450955533, 0.7071752369554196
+    k = math.tan(math.pi * fc / rate)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = (
+        [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0],
+    )
+    # Etap 2: filtr górnoprzepustowy (RLB)
+    fc, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * fc / rate)
+    a0 = 1 + k / q + k * k
+    highpass = (
+        [1.0, -2.0, 1.0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0],
+    )
+    return [shelf, highpass]
+
+
+class _KFilter:
+    """Filtr K ze stanem przenoszonym między porcjami."""
+
+    def __init__(self, rate: int, channels: int):
+        from scipy.signal import lfilter
+        self.lfilter = lfilter
+        self.stages = [(np.asarray(b), np.asarray(a), np.zeros((2, channels))) for b, a in _k_weighting(rate)]
+
+    def __call__(self, block: np.ndarray) -> np.ndarray:
+        filtered = block.astype(np.float64)
+        for index, (b, a, zi) in enumerate(self.stages):
+            filtered, zi = self.lfilter(b, a, filtered, axis=0, zi=zi)
+            self.stages[index] = (b, a, zi)
+        return filtered
+
+
+# --- ANALIZA ---
+
+def _db(value: float, factor: float = 20.0) -> Optional[float]:
+    return round(factor * math.log10(value), 2) if value > 0 else None
+
+
+def analyze_audio(path: str, points: int = WAVEFORM_POINTS, blocksize: int = BLOCK_FRAMES) -> Tuple[dict, bytes]:
+    """
+    Analizuje plik porcjami i zwraca (podsumowanie, szczyty w formacie .dat).
+    Podsumowanie: czas trwania, szczyt (dBFS), RMS (dBFS) i głośność
+    zintegrowana (LUFS). Szczyty: pary (min, max) 8-bit dla miksu mono,
+    najwyżej 'points' punktów niezależnie od długości nagrania.
+    """
+    rate, channels, frames, blocks = open_audio(path, blocksize)
+    if rate <= 0 or channels <= 0:
+        raise AudioAnalysisError("Invalid audio header")
+
+    frames_per_point = max(1, -(-frames // points)) if frames > 0 else 1
+    point_count = max(1, -(-frames // frames_per_point))
+    mins = np.full(point_count, np.inf, dtype=np.float32)
+    maxs = np.full(point_count, -np.inf, dtype=np.float32)
+
+    k_filter = _KFilter(rate, channels)
+    step = max(1, rate // 10)                   # 100 ms
+    leftover = np.zeros(0, dtype=np.float64)    # energia niepełnego kroku
+    recent = np.zeros(0, dtype=np.float64)      # ostatnie 3 kroki (okno 400 ms)
+    hist_count = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+    hist_energy = np.zeros(HISTOGRAM_BINS, dtype=np.float64)
+
+    peak = 0.0
+    sum_squares = 0.0
+    position = 0
+    for block in blocks:
+        n = len(block)
+        if n == 0:
+            continue
+        peak = max(peak, float(np.abs(block).max()))
+        sum_squares += float(np.square(block, dtype=np.float64).sum())
+
+        # Szczyty: segmenty porcji należące do kolejnych punktów
+        mono = block.mean(axis=1)
+        starts = np.arange((-position) % frames_per_point, n, frames_per_point)
+        if len(starts) == 0 or starts[0] != 0:
+            starts = np.concatenate(([0], starts))
+        ids = np.minimum((position + starts) // frames_per_point, point_count - 1)
+        np.minimum.at(mins, ids, np.minimum.reduceat(mono, starts))
+        np.maximum.at(maxs, ids, np.maximum.reduceat(mono, starts))
+        position += n
+
+        # Głośność: energia filtrowana K, sumowana po kanałach, w krokach 100 ms
+        energy = np.concatenate((leftover, np.square(k_filter(block)).sum(axis=1)))
+        full = len(energy) // step
+        leftover = energy[full * step:]
+        if full == 0:
+            continue
+        steps = np.concatenate((recent, energy[:full * step].reshape(full, step).sum(axis=1)))
+        if len(steps) >= 4:
+            windows = np.lib.stride_tricks.sliding_window_view(steps, 4).sum(axis=1) / (4 * step)
+            with np.errstate(divide="ignore"):
+                loudness = -0.691 + 10 * np.log10(windows)
+            gated = loudness > ABSOLUTE_GATE
+            bins = np.minimum(((loudness[gated] - ABSOLUTE_GATE) / HISTOGRAM_STEP).astype(np.int64), HISTOGRAM_BINS - 1)
+            hist_count += np.bincount(bins, minlength=HISTOGRAM_BINS)
+            hist_energy += np.bincount(bins, weights=windows[gated], minlength=HISTOGRAM_BINS)
+        recent = steps[-3:]
+
+    integrated = None
+    if hist_count.sum():
+        relative = -0.691 + 10 * math.log10(hist_energy.sum() / hist_count.sum()) + RELATIVE_GATE
+        first_bin = max(0, int((relative - ABSOLUTE_GATE) / HISTOGRAM_STEP))
+        count = hist_count[first_bin:].sum()
+        if count:
+            integrated = round(-0.691 + 10 * math.log10(hist_energy[first_bin:].sum() / count), 2)
+
+    total_frames = position
+    summary = {
+        "duration": round(total_frames / rate, 3),
+        "sample_rate": rate,
+        "channels": channels,
+        "frames": total_frames,
+        "peak_dbfs": _db(peak),
+        "rms_dbfs": _db(sum_squares / (total_frames * channels), 10.0) if total_frames else None,
+        "loudness_lufs": integrated,
+        "loudness_weighting": "k",
+        "waveform_points": point_count,
+        "waveform_frames_per_point": frames_per_point,
+    }
+
+    # Punkty, do których nie dotarły żadne próbki (nagłówek zawyżał długość) -> cisza
+    mins[np.isinf(mins)] = 0.0
+    maxs[np.isinf(maxs)] = 0.0
+    pairs = np.clip(np.round(np.stack((mins, maxs), axis=1) * 127), -128, 127).astype(np.int8)
+    waveform = WAVEFORM_HEADER.pack(1, 1, rate, frames_per_point, point_count) + pairs.tobytes()
+    return summary, waveform
@@ -0,0 +1,141 @@
+import logging
+import secrets
+import threading
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator, Optional
+
+from prometheus_client import Counter, Histogram
+
+from common.profiling import record_timing
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+UPLOAD_SECONDS = Histogram(
+    "storage_upload_duration_seconds",
+    "Time to store one object",
+    ["backend"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+UPLOAD_BYTES = Histogram(
+    "storage_upload_bytes",
+    "Size of stored objects",
+    ["backend"],
+    buckets=(64 * 1024, 256 * 1024, MB, 4 * MB, 16 * MB, 64 * MB, 256 * MB, 1024 * MB, 4096 * MB),
+)
+UPLOAD_FAILURES = Counter("storage_upload_failures_total", "Failed object uploads", ["backend"])
+
+
+class StorageBackend(ABC):
+    """
+    Wspólny interfejs magazynu plików (S3, lokalny system plików).
+    Klucze mają postać '<folder>/<losowa nazwa>.<rozszerzenie>'.
+    Operacje są blokujące - w kodzie async wywołujemy je w puli wątków.
+    """
+
+    # Etykieta 'backend' w metrykach uploadów
+    name = "storage"
+
+    def __init__(self):
+        # Statystyki uploadów (czas, bajty) - aktualizowane z wielu wątków.
+        self._stats_lock = threading.Lock()
+        self.uploads = 0
+        self.failed_uploads = 0
+        self.bytes_uploaded = 0
+        self.upload_seconds = 0.0
+
+    @staticmethod
+    def new_key(folder: str, original_filename: str) -> str:
+        """Tworzy unikalny klucz obiektu w danym folderze, zachowując rozszerzenie pliku."""
+        file_extension = original_filename.split('.')[-1]
+        random_key = secrets.token_hex(16)
+        return f"{folder}/{random_key}.{file_extension}"
+
+    @abstractmethod
+    def public_url(self, key: str) -> str:
+        ...
+
+    def key_from_url(self, file_url: str) -> Optional[str]:
+        """Odwrotność public_url - zwraca klucz obiektu lub None dla obcego URL-a."""
+        prefix = self.public_url("")
+        return file_url[len(prefix):] if file_url.startswith(prefix) else None
+
+    @abstractmethod
+    def upload_file(self, file_obj: BinaryIO, folder: str, original_filename: str, s3_key: Optional[str] = None) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def upload_bytes(self, data: bytes, s3_key: str, content_type: str, cache_control: Optional[str] = None) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def download_bytes(self, s3_key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def download_to_file(self, s3_key: str, file_obj: BinaryIO) -> bool:
+        ...
+
+    @abstractmethod
+    def head_object(self, s3_key: str) -> Optional[dict]:
+        """Zwraca {'size', 'content_type', 'metadata'} lub None, jeśli obiekt nie istnieje."""
+
+    @abstractmethod
+    def iter_range(self, s3_key: str, start: int, end: int, chunk_size: int = 256 * 1024) -> Optional[Iterator[bytes]]:
+        """Zwraca bajty start..end (włącznie) porcjami lub None, gdy magazyn jest niedostępny."""
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> int:
+        ...
+
+    def warmup(self):
+        """Przygotowuje kosztowne zasoby (np. klienta SDK) przed pierwszym użyciem."""
+
+    # --- BEZPOŚREDNI UPLOAD (PRESIGNED) ---
+    # Domyślnie niedostępny; backend S3 nadpisuje te metody.
+
+    @property
+    def multipart_threshold(self) -> int:
+        return 0
+
+    def presigned_post(self, s3_key: str, owner_id: int, content_type: str, content_type_prefix: str, max_size: int, expires_in: int) -> Optional[dict]:
+        logger.error(f"{type(self).__name__} does not support presigned uploads")
+        return None
+
+    def create_presigned_multipart(self, s3_key: str, owner_id: int, content_type: str, size: int, expires_in: int) -> Optional[dict]:
+        logger.error(f"{type(self).__name__} does not support presigned uploads")
+        return None
+
+    def complete_multipart(self, s3_key: str, upload_id: str, parts: list) -> bool:
+        return False
+
+    def abort_multipart(self, s3_key: str, upload_id: str):
+        pass
+
+    # --- STATYSTYKI ---
+
+    def _record_upload(self, size: int, elapsed: float):
+        with self._stats_lock:
+            self.uploads += 1
+            self.bytes_uploaded += size
+            self.upload_seconds += elapsed
+        UPLOAD_SECONDS.labels(self.name).observe(elapsed)
+        UPLOAD_BYTES.labels(self.name).observe(size)
+        record_timing("storage", elapsed)
+
+    def _record_failed_upload(self):
+        with self._stats_lock:
+            self.failed_uploads += 1
+        UPLOAD_FAILURES.labels(self.name).inc()
+
+    def upload_stats(self) -> dict:
+        """Zwraca zagregowane czasy i wolumen uploadów."""
+        with self._stats_lock:
+            return {
+                "uploads": self.uploads,
+                "failed_uploads": self.failed_uploads,
+                "bytes_uploaded": self.bytes_uploaded,
+                "upload_seconds": round(self.upload_seconds, 3),
+                "avg_mb_per_s": round(self.bytes_uploaded / MB / self.upload_seconds, 2) if self.upload_seconds else 0.0,
+            }
@@ -0,0 +1,89 @@
+import io
+import os
+from typing import Dict, Iterable, Tuple
+
+from PIL import Image, ImageOps
+
+# Funkcje w tym module są czysto obliczeniowe (bytes -> bytes) i nie
+# korzystają z żadnego stanu aplikacji, dzięki czemu mogą działać
+# w procesach ProcessPoolExecutor poza ścieżką obsługi żądania.
+
+ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+MIN_COVER_SIZE = int(os.getenv("COVER_MIN_SIZE", 500))
+MAX_COVER_SIZE = int(os.getenv("COVER_MAX_SIZE", 6000))
+RENDITION_SIZES = tuple(int(size) for size in os.getenv("COVER_RENDITION_SIZES", "1200,600,300,100").split(","))
+RENDITION_FORMATS = ("webp", "jpeg")
+
+# Ochrona przed "bombami dekompresyjnymi" - obrazami o gigantycznej
+# liczbie pikseli przy małym rozmiarze pliku.
+Image.MAX_IMAGE_PIXELS = MAX_COVER_SIZE * MAX_COVER_SIZE
+
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+
+class CoverValidationError(ValueError):
+    """Okładka ma niedozwolony typ lub wymiary."""
+
+
+def sniff_image_type(data: bytes) -> str:
+    """
+    Rozpoznaje rzeczywisty typ pliku po jego zawartości (python-magic),
+    niezależnie od rozszerzenia i nagłówka Content-Type podanego przez klienta.
+    """
+    try:
+        import magic
+    except ImportError:
+        # Brak libmagic w systemie - rozpoznanie formatu przez Pillow.
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                return Image.MIME.get(image.format, "application/octet-stream")
+        except OSError:
+            return "application/octet-stream"
+    return magic.from_buffer(data[:4096], mime=True)
+
+
+def _encode(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, format="WEBP", quality=82, method=4)
+    else:
+        image.save(buffer, format="JPEG", quality=85, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def build_renditions(
+    data: bytes,
+    sizes: Iterable[int] = RENDITION_SIZES,
+    formats: Iterable[str] = RENDITION_FORMATS,
+) -> Dict[Tuple[str, int], bytes]:
+    """
+    Waliduje okładkę i tworzy jej pomniejszone wersje.
+    Zwraca słownik {(format, rozmiar): bajty}. Rozmiar to dłuższy bok
+    w pikselach.
+    """
+    content_type = sniff_image_type(data)
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        raise CoverValidationError(f"Unsupported cover type: {content_type}")
+
+    with Image.open(io.BytesIO(data)) as image:
+        width, height = image.size
+        if min(width, height) < MIN_COVER_SIZE or max(width, height) > MAX_COVER_SIZE:
+            raise CoverValidationError(
+                f"Cover dimensions {width}x{height} outside allowed range {MIN_COVER_SIZE}-{MAX_COVER_SIZE}px"
+            )
+        # Nie powiększamy obrazów - rozmiary większe niż oryginał są pomijane.
+        sizes = sorted({size for size in sizes if size <= max(width, height)} or {max(width, height)}, reverse=True)
+        # Dla JPEG dekoder może od razu zmniejszyć obraz (DCT scaling),
+        # co wielokrotnie przyspiesza pracę na dużych plikach.
+        image.draft("RGB", (sizes[0], sizes[0]))
+        base = ImageOps.exif_transpose(image).convert("RGB")
+
+    renditions = {}
+    for size in sizes:
+        # Rozmiary idą od największego, więc każda kolejna wersja powstaje
+        # z poprzedniej - taniej niż skalowanie zawsze z pełnej rozdzielczości.
+        base.thumbnail((size, size), Image.LANCZOS)
+        for fmt in formats:
+            renditions[(fmt, size)] = _encode(base, fmt)
+    return renditions
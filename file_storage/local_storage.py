@@ -0,0 +1,160 @@
+import glob
+import logging
+import mimetypes
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+from .base import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Magazyn w lokalnym katalogu (dev, testy, instalacje on-prem).
+    Klucz obiektu to ścieżka względna w katalogu 'root'; publiczne URL-e
+    mają postać '<base_url>/<klucz>' (katalog jest montowany w aplikacji).
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str = "/media"):
+        super().__init__()
+        self.root = Path(root).resolve()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.base_url = base_url.rstrip("/")
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def local_path(self, key: str) -> Path:
+        """Ścieżka pliku dla klucza; klucze wychodzące poza katalog są odrzucane."""
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def _write(self, key: str, write) -> int:
+        # Zapis do pliku tymczasowego i atomowa podmiana - czytelnicy nigdy
+        # nie widzą niepełnego pliku.
+        path = self.local_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                write(fp)
+                size = fp.tell()
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return size
+
+    def upload_file(self, file_obj: BinaryIO, folder: str, original_filename: str, s3_key: Optional[str] = None) -> Optional[str]:
+        s3_key = s3_key or self.new_key(folder, original_filename)
+        try:
+            if file_obj.seekable():
+                file_obj.seek(0)
+            start = time.perf_counter()
+            size = self._write(s3_key, lambda fp: shutil.copyfileobj(file_obj, fp, 1024 * 1024))
+            self._record_upload(size, time.perf_counter() - start)
+            return self.public_url(s3_key)
+        except (OSError, ValueError) as e:
+            self._record_failed_upload()
+            logger.error(f"Failed to store {s3_key}: {e}")
+            return None
+
+    def upload_bytes(self, data: bytes, s3_key: str, content_type: str, cache_control: Optional[str] = None) -> Optional[str]:
+        try:
+            start = time.perf_counter()
+            self._write(s3_key, lambda fp: fp.write(data))
+            self._record_upload(len(data), time.perf_counter() - start)
+            return self.public_url(s3_key)
+        except (OSError, ValueError) as e:
+            self._record_failed_upload()
+            logger.error(f"Failed to store {s3_key}: {e}")
+            return None
+
+    def download_bytes(self, s3_key: str) -> Optional[bytes]:
+        try:
+            return self.local_path(s3_key).read_bytes()
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read {s3_key}: {e}")
+            return None
+
+    def download_to_file(self, s3_key: str, file_obj: BinaryIO) -> bool:
+        try:
+            with open(self.local_path(s3_key), "rb") as source:
+                shutil.copyfileobj(source, file_obj, 1024 * 1024)
+            file_obj.flush()
+            return True
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read {s3_key}: {e}")
+            return False
+
+    def head_object(self, s3_key: str) -> Optional[dict]:
+        try:
+            path = self.local_path(s3_key)
+            size = path.stat().st_size
+        except (OSError, ValueError):
+            return None
+        return {
+            "size": size,
+            "content_type": mimetypes.guess_type(path.name)[0],
+            "metadata": {},
+        }
+
+    def iter_range(self, s3_key: str, start: int, end: int, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+        with open(self.local_path(s3_key), "rb") as fp:
+            fp.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = fp.read(min(chunk_size, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    def delete_prefix(self, prefix: str) -> int:
+        try:
+            directory = self.local_path(os.path.dirname(prefix) or ".")
+        except ValueError:
+            return 0
+        name_prefix = os.path.basename(prefix)
+        deleted = 0
+        for path in directory.glob(f"{glob.escape(name_prefix)}*"):
+            if path.is_file():
+                path.unlink(missing_ok=True)
+                deleted += 1
+        return deleted
+
+
+class MediaFiles(StaticFiles):
+    """
+    Publiczny mount katalogu LocalStorage (okładki, rendycje, przebiegi).
+    Oryginalne pliki audio nie są tu serwowane - dostęp do nich ma tylko
+    właściciel, przez GET /music/releases/{id}/audio. Wyjątkiem są
+    pochodne pliki przebiegu (*.waveform.dat), publiczne jak na S3.
+    """
+
+    private_prefixes = ("audio/",)
+    public_suffixes = (".waveform.dat",)
+
+    def is_public(self, path: str) -> bool:
+        # 'path' jest już znormalizowana przez StaticFiles.get_path (bez '..')
+        key = path.replace(os.sep, "/")
+        if key.startswith(self.private_prefixes):
+            return key.endswith(self.public_suffixes)
+        return True
+
+    async def get_response(self, path: str, scope):
+        if not self.is_public(path):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
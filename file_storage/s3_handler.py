@@ -1,39 +1,102 @@
-import boto3
+# boto3 (sesja, loadery modeli usług) jest importowane dopiero przy
+# tworzeniu klienta - import modułu nie wydłuża zimnego startu API.
 from botocore.exceptions import ClientError, NoCredentialsError
-from typing import Optional, BinaryIO
+from typing import Iterator, Optional, BinaryIO
 import logging
+import mimetypes
 import os
-import secrets
+import threading
+import time
+
+from .base import MB, StorageBackend
 
 logger = logging.getLogger(__name__)
 
-class S3Handler:
+class S3Handler(StorageBackend):
     """Handler for AWS S3 operations"""
+
+    name = "s3"
     
     def __init__(self):
+        super().__init__()
+        # Konfiguracja multipart uploadu: pliki powyżej progu są dzielone
+        # na części wysyłane równolegle. Każda część jest czytana z pliku
+        # osobno, więc ponowienie nieudanej części nie wymaga ponownego
+        # przesyłania całego pliku.
+        self.max_concurrency = int(os.getenv('S3_MAX_CONCURRENCY', 8))
+        self.multipart_chunksize = int(float(os.getenv('S3_MULTIPART_CHUNKSIZE_MB', 16)) * MB)
+        self._multipart_threshold = int(float(os.getenv('S3_MULTIPART_THRESHOLD_MB', 16)) * MB)
+
+        self.region = os.getenv('AWS_REGION', 'us-east-1')
+        self.bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
+        # Sprawdzenie, czy kluczowe zmienne są ustawione
+        if not all([os.getenv('AWS_ACCESS_KEY_ID'), os.getenv('AWS_SECRET_ACCESS_KEY'), self.bucket_name]):
+            logger.error("Failed to initialize S3 client: Brakujące zmienne środowiskowe dla AWS S3")
+            self.bucket_name = None
+
+        # Klient i konfiguracja transferu powstają przy pierwszym użyciu.
+        self._client_lock = threading.Lock()
+        self._s3_client = None
+        self._client_failed = False
+        self._transfer_config = None
+
+    @property
+    def s3_client(self):
+        if self._s3_client is None and not self._client_failed and self.bucket_name:
+            with self._client_lock:
+                if self._s3_client is None and not self._client_failed:
+                    self._s3_client = self._build_client()
+        return self._s3_client
+
+    def _build_client(self):
         try:
-            self.region = os.getenv('AWS_REGION', 'us-east-1')
-            self.bucket_name = os.getenv('AWS_S3_BUCKET_NAME')
-            
-            # Sprawdzenie, czy kluczowe zmienne są ustawione
-            if not all([os.getenv('AWS_ACCESS_KEY_ID'), os.getenv('AWS_SECRET_ACCESS_KEY'), self.bucket_name]):
-                raise ValueError("Brakujące zmienne środowiskowe dla AWS S3")
+            import boto3
+            from botocore.config import Config
 
-            self.s3_client = boto3.client(
+            client = boto3.client(
                 's3',
                 aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
                 aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-                region_name=self.region
+                region_name=self.region,
+                endpoint_url=os.getenv('AWS_S3_ENDPOINT_URL') or None,
+                config=Config(
+                    # Pula połączeń musi pomieścić wszystkie równoległe części
+                    # kilku jednoczesnych uploadów (okładka + audio).
+                    max_pool_connections=max(10, self.max_concurrency * 2),
+                    retries={'max_attempts': int(os.getenv('S3_MAX_ATTEMPTS', 5)), 'mode': 'standard'},
+                ),
             )
             logger.info("S3 client initialized successfully.")
+            return client
         except Exception as e:
             logger.error(f"Failed to initialize S3 client: {e}")
-            self.s3_client = None
-            self.bucket_name = None
-    
-    def upload_file(self, file_obj: BinaryIO, folder: str, original_filename: str) -> Optional[str]:
+            self._client_failed = True
+            return None
+
+    @property
+    def transfer_config(self):
+        if self._transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
+            self._transfer_config = TransferConfig(
+                multipart_threshold=self._multipart_threshold,
+                multipart_chunksize=self.multipart_chunksize,
+                max_concurrency=self.max_concurrency,
+                use_threads=True,
+            )
+        return self._transfer_config
+
+    def warmup(self):
+        # Wywoływane w tle po starcie aplikacji - pierwszy upload nie płaci za import boto3.
+        self.s3_client
+        self.transfer_config
+
+    def public_url(self, s3_key: str) -> str:
+        return f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{s3_key}"
+
+    def upload_file(self, file_obj: BinaryIO, folder: str, original_filename: str, s3_key: Optional[str] = None) -> Optional[str]:
         """
-        Przesyła plik do S3, nadaje mu unikalną nazwę i zwraca jego publiczny URL.
+        Przesyła plik do S3, nadaje mu unikalną nazwę (lub podany s3_key)
+        i zwraca jego publiczny URL.
         """
         if not self.s3_client or not self.bucket_name:
             logger.error("S3 client not properly configured")
@@ -41,17 +104,233 @@ class S3Handler:
         
         try:
             # Tworzenie unikalnej nazwy pliku, aby uniknąć konfliktów
-            file_extension = original_filename.split('.')[-1]
-            random_key = secrets.token_hex(16)
-            s3_key = f"{folder}/{random_key}.{file_extension}"
+            s3_key = s3_key or self.new_key(folder, original_filename)
             
-            # Przesyłanie pliku
-            self.s3_client.upload_fileobj(file_obj, self.bucket_name, s3_key)
+            # Rozmiar pliku (strumień jest przewijany - bez wczytywania do pamięci);
+            # strumień bez seek (np. HashingReader) jest czytany raz, a jego
+            # rozmiar znamy dopiero po wysłaniu.
+            seekable = file_obj.seekable()
+            if seekable:
+                file_obj.seek(0, os.SEEK_END)
+                size = file_obj.tell()
+                file_obj.seek(0)
+
+            extra_args = {}
+            content_type = mimetypes.guess_type(original_filename)[0]
+            if content_type:
+                extra_args['ContentType'] = content_type
+
+            # Przesyłanie pliku (multipart z równoległymi częściami dla dużych plików)
+            start = time.perf_counter()
+            self.s3_client.upload_fileobj(
+                file_obj,
+                self.bucket_name,
+                s3_key,
+                ExtraArgs=extra_args or None,
+                Config=self.transfer_config,
+            )
+            elapsed = time.perf_counter() - start
+            if not seekable:
+                size = file_obj.tell()
+            self._record_upload(size, elapsed)
             
             # Konstruowanie i zwracanie publicznego URL
-            file_url = f"https://{self.bucket_name}.s3.{self.region}.amazonaws.com/{s3_key}"
-            logger.info(f"Successfully uploaded {s3_key} to S3. URL: {file_url}")
+            file_url = self.public_url(s3_key)
+            throughput = size / MB / elapsed if elapsed > 0 else 0.0
+            logger.info(
+                f"Successfully uploaded {s3_key} to S3 ({size} B in {elapsed:.2f}s, {throughput:.1f} MB/s). URL: {file_url}"
+            )
             return file_url
         except (ClientError, NoCredentialsError) as e:
+            self._record_failed_upload()
             logger.error(f"Failed to upload file to S3: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    @property
+    def multipart_threshold(self) -> int:
+        return self._multipart_threshold
+
+    # --- BEZPOŚREDNI UPLOAD PRZEZ PRZEGLĄDARKĘ (PRESIGNED) ---
+    # Pliki trafiają bezpośrednio do S3, a API obsługuje tylko małe
+    # żądania JSON. Właściciel jest zapisywany w metadanych obiektu
+    # (x-amz-meta-owner-id), co pozwala zweryfikować go przy finalizacji.
+
+    def presigned_post(self, s3_key: str, owner_id: int, content_type: str, content_type_prefix: str, max_size: int, expires_in: int) -> Optional[dict]:
+        """Zwraca URL i pola formularza dla jednorazowego uploadu metodą POST."""
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client not properly configured")
+            return None
+        try:
+            return self.s3_client.generate_presigned_post(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Fields={"Content-Type": content_type, "x-amz-meta-owner-id": str(owner_id)},
+                Conditions=[
+                    ["starts-with", "$Content-Type", content_type_prefix],
+                    {"x-amz-meta-owner-id": str(owner_id)},
+                    ["content-length-range", 1, max_size],
+                ],
+                ExpiresIn=expires_in,
+            )
+        except (ClientError, NoCredentialsError) as e:
+            logger.error(f"Failed to presign POST for {s3_key}: {e}")
+            return None
+
+    def create_presigned_multipart(self, s3_key: str, owner_id: int, content_type: str, size: int, expires_in: int) -> Optional[dict]:
+        """
+        Rozpoczyna multipart upload i zwraca podpisane URL-e dla wszystkich
+        części. Klient wysyła części równolegle (PUT) i może ponawiać
+        pojedyncze części bez ponownego wysyłania całego pliku.
+        """
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client not properly configured")
+            return None
+        part_size = self.multipart_chunksize
+        part_count = max(1, -(-size // part_size))
+        try:
+            upload = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                ContentType=content_type,
+                Metadata={"owner-id": str(owner_id)},
+            )
+            upload_id = upload["UploadId"]
+            parts = [
+                {
+                    "part_number": part_number,
+                    "url": self.s3_client.generate_presigned_url(
+                        "upload_part",
+                        Params={"Bucket": self.bucket_name, "Key": s3_key, "UploadId": upload_id, "PartNumber": part_number},
+                        ExpiresIn=expires_in,
+                    ),
+                }
+                for part_number in range(1, part_count + 1)
+            ]
+            return {"upload_id": upload_id, "part_size": part_size, "parts": parts}
+        except (ClientError, NoCredentialsError) as e:
+            logger.error(f"Failed to start multipart upload for {s3_key}: {e}")
+            return None
+
+    def complete_multipart(self, s3_key: str, upload_id: str, parts: list) -> bool:
+        """Składa obiekt z przesłanych części (parts: [{'PartNumber': n, 'ETag': '...'}])."""
+        try:
+            self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
+            )
+            return True
+        except (ClientError, NoCredentialsError) as e:
+            logger.error(f"Failed to complete multipart upload for {s3_key}: {e}")
+            return False
+
+    def abort_multipart(self, s3_key: str, upload_id: str):
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id)
+        except (ClientError, NoCredentialsError) as e:
+            logger.warning(f"Failed to abort multipart upload for {s3_key}: {e}")
+
+    def head_object(self, s3_key: str) -> Optional[dict]:
+        """Zwraca metadane obiektu (rozmiar, typ, metadane użytkownika) lub None, jeśli nie istnieje."""
+        if not self.s3_client or not self.bucket_name:
+            return None
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+                logger.error(f"Failed to check object {s3_key}: {e}")
+            return None
+        return {
+            "size": response.get("ContentLength"),
+            "content_type": response.get("ContentType"),
+            "metadata": response.get("Metadata", {}),
+        }
+
+    def key_from_url(self, file_url: str) -> Optional[str]:
+        """Odwrotność public_url - zwraca klucz obiektu lub None dla obcego URL-a."""
+        prefix = self.public_url("")
+        return file_url[len(prefix):] if file_url.startswith(prefix) else None
+
+    def download_bytes(self, s3_key: str) -> Optional[bytes]:
+        """Pobiera cały obiekt do pamięci (przeznaczone dla małych plików, np. okładek)."""
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client not properly configured")
+            return None
+        try:
+            return self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)["Body"].read()
+        except (ClientError, NoCredentialsError) as e:
+            logger.error(f"Failed to download {s3_key} from S3: {e}")
+            return None
+
+    def download_to_file(self, s3_key: str, file_obj: BinaryIO) -> bool:
+        """Pobiera obiekt strumieniowo do pliku (równoległe zakresy, bez trzymania całości w pamięci)."""
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client not properly configured")
+            return False
+        try:
+            self.s3_client.download_fileobj(self.bucket_name, s3_key, file_obj, Config=self.transfer_config)
+            file_obj.flush()
+            return True
+        except (ClientError, NoCredentialsError) as e:
+            logger.error(f"Failed to download {s3_key} from S3: {e}")
+            return False
+
+    def upload_bytes(self, data: bytes, s3_key: str, content_type: str, cache_control: Optional[str] = None) -> Optional[str]:
+        """Zapisuje dane pod wskazanym kluczem (bez losowania nazwy) i zwraca publiczny URL."""
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client not properly configured")
+            return None
+        extra_args = {"ContentType": content_type}
+        if cache_control:
+            extra_args["CacheControl"] = cache_control
+        try:
+            start = time.perf_counter()
+            self.s3_client.put_object(Bucket=self.bucket_name, Key=s3_key, Body=data, **extra_args)
+            self._record_upload(len(data), time.perf_counter() - start)
+            return self.public_url(s3_key)
+        except (ClientError, NoCredentialsError) as e:
+            self._record_failed_upload()
+            logger.error(f"Failed to upload {s3_key} to S3: {e}")
+            return None
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Usuwa wszystkie obiekty o danym prefiksie klucza; zwraca ich liczbę."""
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client not properly configured")
+            return 0
+        deleted = 0
+        try:
+            paginator = self.s3_client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+                if objects:
+                    self.s3_client.delete_objects(Bucket=self.bucket_name, Delete={"Objects": objects, "Quiet": True})
+                    deleted += len(objects)
+        except (ClientError, NoCredentialsError) as e:
+            logger.error(f"Failed to delete objects with prefix {prefix}: {e}")
+        return deleted
+
+    def iter_range(self, s3_key: str, start: int, end: int, chunk_size: int = 256 * 1024) -> Optional[Iterator[bytes]]:
+        """
+        Proxy zakresu bajtów z S3 (GET z nagłówkiem Range) - do klienta
+        trafiają tylko żądane bajty, czytane porcjami z odpowiedzi S3.
+        GET jest wykonywany od razu (nie przy pierwszej porcji), więc błąd
+        S3 wychodzi przed wysłaniem nagłówków odpowiedzi - wtedy None.
+        """
+        if not self.s3_client or not self.bucket_name:
+            logger.error("S3 client not properly configured")
+            return None
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key, Range=f"bytes={start}-{end}")
+        except (ClientError, NoCredentialsError) as e:
+            logger.error(f"Failed to read range of {s3_key} from S3: {e}")
+            return None
+        return self._iter_body(response["Body"], chunk_size)
+
+    @staticmethod
+    def _iter_body(body, chunk_size: int) -> Iterator[bytes]:
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
@@ -0,0 +1,28 @@
+import logging
+import os
+
+from .base import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+
+def build_storage() -> StorageBackend:
+    """
+    Tworzy backend magazynu na podstawie zmiennych środowiskowych:
+    STORAGE_BACKEND (s3 | local), LOCAL_STORAGE_ROOT, LOCAL_STORAGE_BASE_URL.
+    """
+    backend = os.getenv("STORAGE_BACKEND", "s3").strip().lower()
+    if backend == "local":
+        from .local_storage import LocalStorage
+        root = os.getenv("LOCAL_STORAGE_ROOT", "media")
+        logger.info(f"Using local file storage in {root}")
+        return LocalStorage(root, base_url=os.getenv("LOCAL_STORAGE_BASE_URL", "/media"))
+    if backend != "s3":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    from .s3_handler import S3Handler
+    return S3Handler()
+
+
+# Współdzielona instancja dla całej aplikacji - klient boto3 i jego pula
+# połączeń są bezpieczne wątkowo.
+storage = build_storage()
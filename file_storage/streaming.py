@@ -0,0 +1,106 @@
+import mmap
+import os
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from starlette.responses import Response, StreamingResponse
+
+from .base import StorageBackend
+from .local_storage import LocalStorage
+
+# Odtwarzanie plików z obsługą nagłówka Range (RFC 9110): przewijanie
+# w odtwarzaczu pobiera tylko potrzebne bajty. Pliki lokalne są wysyłane
+# bez kopiowania przez Pythona (sendfile przez rozszerzenie ASGI
+# "http.response.zerocopysend", a gdy serwer go nie wspiera - z mmap),
+# zakresy z S3 są przekazywane strumieniowo (GET z Range).
+
+CHUNK_SIZE = 256 * 1024
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Zwraca (start, end) włącznie dla pojedynczego zakresu 'bytes=...' lub
+    None, gdy należy wysłać cały plik. Zakres niemożliwy do spełnienia -> 416.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        # Brak nagłówka, inne jednostki lub wiele zakresów - cały plik (RFC pozwala zignorować Range)
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":
+            # Sufiks: ostatnie N bajtów
+            length = int(last)
+            if length <= 0:
+                raise ValueError
+            start, end = max(0, size - length), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if start > end:
+                return None
+            end = min(end, size - 1)
+    except ValueError:
+        return None
+    if start >= size or size == 0:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Żądany zakres wykracza poza rozmiar pliku.",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+class LocalFileRangeResponse(Response):
+    """Wysyła fragment pliku lokalnego: sendfile (zerocopysend) lub mmap."""
+
+    def __init__(self, path: str, start: int, end: int, status_code: int, headers: dict, media_type: str):
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.end = end
+        self.raw_headers = [
+            (name, value) for name, value in self.raw_headers if name != b"content-length"
+        ] + [(b"content-length", str(end - start + 1).encode())]
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = self.end - self.start + 1
+        if count <= 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        with open(self.path, "rb") as fp:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({"type": "http.response.zerocopysend", "file": fp, "offset": self.start, "count": count})
+                return
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(self.start, self.end + 1, CHUNK_SIZE):
+                    chunk_end = min(offset + CHUNK_SIZE, self.end + 1)
+                    await send({"type": "http.response.body", "body": mapped[offset:chunk_end], "more_body": chunk_end <= self.end})
+
+
+def range_response(backend: StorageBackend, key: str, range_header: Optional[str], media_type: Optional[str] = None, cache_control: str = "private, max-age=3600") -> Response:
+    """
+    Odpowiedź 200/206 dla obiektu z magazynu. Funkcja jest blokująca
+    (HEAD w S3) - w endpointach async wywołujemy ją w puli wątków.
+    """
+    head = backend.head_object(key)
+    if head is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plik nie istnieje w magazynie.")
+    size = head["size"]
+    media_type = media_type or head["content_type"] or "application/octet-stream"
+
+    byte_range = parse_range(range_header, size)
+    start, end = byte_range if byte_range else (0, size - 1)
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": cache_control}
+    status_code = status.HTTP_200_OK
+    if byte_range:
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    if isinstance(backend, LocalStorage):
+        return LocalFileRangeResponse(os.fspath(backend.local_path(key)), start, end, status_code, headers, media_type)
+    body = backend.iter_range(key, start, end, CHUNK_SIZE) if size else iter(())
+    if body is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Magazyn plików jest chwilowo niedostępny.")
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(body, status_code=status_code, headers=headers, media_type=media_type)
@@ -1,65 +1,175 @@
 # main.py
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-# Importujemy modele i silnik bazy danych
-from common import models
-from database import engine
+# Importujemy silniki bazy danych i wspólne middleware
+from common.admission import AdmissionControlMiddleware, admission_controllers
+from common.database import async_engine, engine
+from common.health import ReadinessProbe
+from common.metrics import MetricsMiddleware, metrics_response, register_pool_metrics
+from common.profiling import ProfilingMiddleware, install_query_hooks
 
 # Importujemy routery z naszych modułów
-from auth_app import router as auth_router
-from music_app import router as music_router
-
-# Tworzymy tabele w bazie danych na podstawie naszych modeli SQLAlchemy.
-# Ta linia jest kluczowa - bez niej aplikacja nie będzie wiedziała,
-# jakie tabele ma utworzyć przy pierwszym uruchomieniu.
-models.Base.metadata.create_all(bind=engine)
-
-# Inicjalizacja głównej aplikacji FastAPI
-app = FastAPI(
-    title="HardbanRecords Lab API",
-    description="Kompleksowa platforma dla niezależnych twórców cyfrowych.",
-    version="1.0.0"
-)
-
-# Konfiguracja CORS (Cross-Origin Resource Sharing)
-# To jest absolutnie kluczowe dla architektury decoupled.
-# Pozwala przeglądarce (na której działa frontend) na wysyłanie
-# zapytań do naszego serwera backendowego, który działa na innym porcie.
-origins = [
-    "http://localhost:5173", # Adres serwera deweloperskiego Vite
-    "http://localhost:3000", # Popularny adres dla Create React App
-    "https://app.hardbanrecords-lab.eu" # Adres produkcyjny
-]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"], # Pozwalamy na wszystkie metody HTTP (GET, POST, etc.)
-    allow_headers=["*"], # Pozwalamy na wszystkie nagłówki
-)
-
-# Dołączamy routery z poszczególnych modułów do głównej aplikacji.
-# Dzięki temu endpointy z auth_app i music_app będą dostępne w API.
-app.include_router(auth_router.router)
-app.include_router(music_router.router)
-
-# Główny endpoint powitalny
-@app.get("/")
-def read_root():
+from auth_app.hashing import password_hasher
+from auth_app.main import router as auth_router
+from music_app.audio_analysis import audio_analyzer
+from music_app.covers import cover_processor
+from music_app.router import router as music_router
+from file_storage.local_storage import LocalStorage, MediaFiles
+from file_storage.storage import storage
+
+logger = logging.getLogger(__name__)
+
+readiness = ReadinessProbe(async_engine, {"sync": engine, "async": async_engine.sync_engine})
+
+# Schemat bazy danych jest zarządzany wyłącznie przez Alembic
+# (alembic upgrade head przy wdrożeniu). Import modułu i start aplikacji
+# nie wykonują żadnych zapytań - port jest otwierany bez czekania na bazę.
+
+async def _warm_up():
     """
-    Główny endpoint API, który zwraca podstawowe informacje
-    o statusie i dostępnych usługach.
+    Rozgrzewka po otwarciu portu: klient boto3 i pierwsze połączenie
+    z bazą (ping dla /ready) powstają w tle, zanim trafi je pierwsze
+    prawdziwe żądanie.
+    Błędy są tylko logowane - aplikacja działa dalej, a zasoby zostaną
+    utworzone przy pierwszym użyciu.
     """
-    return {
-        "message": "HardbanRecords Lab API",
-        "version": "1.0.0",
-        "status": "✅ Running",
-        "services": {
-            "auth": "/auth/docs",
-            "music": "/music/docs",
-            "docs": "/docs" # Główna dokumentacja Swagger UI
+    try:
+        await asyncio.gather(
+            asyncio.get_running_loop().run_in_executor(None, storage.warmup),
+            readiness.database(),
+        )
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup nie może blokować - uvicorn otwiera port dopiero po jego zakończeniu.
+    warm_up = asyncio.create_task(_warm_up())
+    yield
+    warm_up.cancel()
+    cover_processor.shutdown()
+    audio_analyzer.shutdown()
+    password_hasher.shutdown()
+    await async_engine.dispose()
+    engine.dispose()
+
+
+def create_app() -> FastAPI:
+    """Tworzy aplikację: middleware, routery i endpointy pomocnicze."""
+    app = FastAPI(
+        title="HardbanRecords Lab API",
+        description="Kompleksowa platforma dla niezależnych twórców cyfrowych.",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+
+    # Kolejność: każde add_middleware opakowuje dotychczasowy stos, więc
+    # middleware dodane później działa bliżej klienta.
+
+    # Liczba i czas zapytań SQL per żądanie (nagłówek Server-Timing) oraz
+    # opcjonalne profilowanie cProfile (PROFILING_TOKEN / PROFILING_SAMPLE_RATE).
+    app.add_middleware(ProfilingMiddleware)
+    install_query_hooks(engine, async_engine.sync_engine)
+
+    # Limity równoległych żądań per klasa tras (auth, uploads, reads, writes,
+    # streams): nadmiarowe żądania dostają od razu 503 z Retry-After
+    # (ADMISSION_*_LIMIT).
+    app.add_middleware(AdmissionControlMiddleware)
+
+    # Metryki Prometheus: opóźnienia per szablon trasy oraz stan pul połączeń
+    # (odczytywany dopiero przy scrape'ie /metrics). Metryki opakowują kontrolę
+    # przyjęć, więc odrzucone 503 też trafiają do histogramu - z trasą
+    # __unmatched__, bo router ich nie widział (klasę trasy podaje
+    # http_requests_shed_total).
+    app.add_middleware(MetricsMiddleware)
+    register_pool_metrics({"sync": engine, "async": async_engine.sync_engine})
+
+    # Konfiguracja CORS (Cross-Origin Resource Sharing)
+    # To jest absolutnie kluczowe dla architektury decoupled.
+    # Pozwala przeglądarce (na której działa frontend) na wysyłanie
+    # zapytań do naszego serwera backendowego, który działa na innym porcie.
+    origins = [
+        "http://localhost:5173", # Adres serwera deweloperskiego Vite
+        "http://localhost:3000", # Popularny adres dla Create React App
+        "https://app.hardbanrecords-lab.eu" # Adres produkcyjny
+    ]
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"], # Pozwalamy na wszystkie metody HTTP (GET, POST, etc.)
+        allow_headers=["*"], # Pozwalamy na wszystkie nagłówki
+        expose_headers=["X-Next-Cursor", "Link", "Content-Range", "Accept-Ranges", "Server-Timing", "X-Profile-Id"], # Nagłówki stronicowania, odtwarzania i diagnostyki czytelne dla frontendu
+    )
+
+    # Lokalny magazyn plików (STORAGE_BACKEND=local) - publiczne URL-e okładek
+    # i plików pochodnych są serwowane bezpośrednio przez aplikację; audio
+    # tylko przez endpoint odtwarzania (sprawdza właściciela).
+    if isinstance(storage, LocalStorage):
+        app.mount(storage.base_url, MediaFiles(directory=storage.root), name="media")
+
+    # Dołączamy routery z poszczególnych modułów do głównej aplikacji.
+    # Dzięki temu endpointy z auth_app i music_app będą dostępne w API.
+    app.include_router(auth_router)
+    app.include_router(music_router)
+
+    @app.get("/health", tags=["Monitoring"])
+    async def health():
+        """
+        Liveness: proces odpowiada. Bez zapytań do bazy i usług
+        zewnętrznych (healthCheckPath w render.yaml).
+        """
+        return {"status": "ok"}
+
+    @app.get("/ready", tags=["Monitoring"])
+    async def ready():
+        """
+        Readiness: wynik pingu bazy (cache READY_CACHE_TTL sekund), zajętość
+        pul połączeń i liczniki kontroli przyjęć. 503, gdy baza nie odpowiada
+        albo pula jest nasycona (READY_MAX_POOL_SATURATION).
+        """
+        is_ready, details = await readiness.check()
+        if admission_controllers:
+            details["admission"] = admission_controllers[-1].stats()
+        return JSONResponse(details, status_code=200 if is_ready else 503)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """
+        Metryki w formacie Prometheus: opóźnienia żądań per trasa, pule
+        połączeń SQLAlchemy, czasy i rozmiary uploadów do magazynu.
+        """
+        return metrics_response()
+
+    # Główny endpoint powitalny
+    @app.get("/")
+    def read_root():
+        """
+        Główny endpoint API, który zwraca podstawowe informacje
+        o statusie i dostępnych usługach.
+        """
+        return {
+            "message": "HardbanRecords Lab API",
+            "version": "1.0.0",
+            "status": "✅ Running",
+            "services": {
+                "auth": "/auth/docs",
+                "music": "/music/docs",
+                "docs": "/docs" # Główna dokumentacja Swagger UI
+            }
         }
-    }
\ No newline at end of file
+
+    return app
+
+
+# Instancja dla 'uvicorn main:app'
+app = create_app()
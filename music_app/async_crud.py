@@ -0,0 +1,150 @@
+# music_app/async_crud.py
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from . import models, schemas
+from .crud import keyset_releases_query, release_asset_keys, validate_royalty_split_set
+from fastapi import HTTPException, status
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Optional, Tuple
+
+# Asynchroniczne odpowiedniki funkcji z music_app/crud.py (te same nazwy
+# i sygnatury, ale z AsyncSession). Relacja royalty_splits jest ładowana
+# zawczasu (selectinload) - w trybie async nie wolno jej ładować leniwie.
+
+async def get_music_release(db: AsyncSession, release_id: int):
+    """Pobiera pojedyncze wydawnictwo po ID."""
+    result = await db.execute(
+        select(models.MusicRelease)
+        .options(selectinload(models.MusicRelease.royalty_splits))
+        .filter(models.MusicRelease.id == release_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+async def get_music_releases_by_owner(db: AsyncSession, owner_id: int, limit: int = 100, after: Optional[Tuple[datetime, int]] = None, release_status: Optional[str] = None):
+    """
+    Pobiera stronę wydawnictw danego właściciela, od najnowszych.
+    Stronicowanie keyset: 'after' to (created_at, id) ostatniego elementu
+    poprzedniej strony.
+    """
+    result = await db.execute(
+        keyset_releases_query(owner_id, limit, after, release_status)
+        .options(selectinload(models.MusicRelease.royalty_splits))
+    )
+    return result.scalars().all()
+
+async def create_music_release(db: AsyncSession, title: str, artist: str, cover_url: str, audio_url: str, owner_id: int):
+    """Tworzy nowy wpis wydawnictwa muzycznego w bazie danych."""
+    db_release = models.MusicRelease(
+        title=title,
+        artist=artist,
+        cover_image_url=cover_url,
+        audio_file_url=audio_url,
+        owner_id=owner_id
+    )
+    db.add(db_release)
+    await db.commit()
+    # Ponowny odczyt zamiast refresh() - ładuje wartości domyślne z bazy
+    # (created_at) razem z pustą listą royalty_splits.
+    return await get_music_release(db, db_release.id)
+
+async def delete_music_release(db: AsyncSession, release_id: int, owner_id: int):
+    """
+    Usuwa wydawnictwo właściciela (404, jeśli go nie ma). Odpowiednik
+    crud.delete_music_release - referencje do plików są zwalniane w tej
+    samej transakcji.
+    """
+    release = await get_music_release(db, release_id)
+    if release is None or release.owner_id != owner_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Wydawnictwo o ID {release_id} nie zostało znalezione lub nie masz uprawnień do jego modyfikacji."
+        )
+    try:
+        await db.delete(release)
+        await db.run_sync(release_asset_keys, release)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+async def create_royalty_split_for_release(db: AsyncSession, split_data: schemas.RoyaltySplitCreate, release_id: int, owner_id: int):
+    """
+    Tworzy nowy wpis podziału tantiem dla konkretnego wydawnictwa.
+    Logika walidacji jest identyczna jak w crud.create_royalty_split_for_release.
+    """
+    # Krok 1: Weryfikacja właściciela wydawnictwa.
+    # Blokada wiersza (FOR UPDATE) - jak w crud.create_royalty_split_for_release.
+    result = await db.execute(
+        select(models.MusicRelease.id).filter(
+            models.MusicRelease.id == release_id,
+            models.MusicRelease.owner_id == owner_id
+        ).with_for_update()
+    )
+    if result.scalar() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Wydawnictwo o ID {release_id} nie zostało znalezione lub nie masz uprawnień do jego modyfikacji."
+        )
+
+    # Krok 2: Suma istniejących udziałów.
+    result = await db.execute(
+        select(func.sum(models.MusicReleaseRoyaltySplit.share_percentage)).filter(
+            models.MusicReleaseRoyaltySplit.release_id == release_id
+        )
+    )
+    total_share = result.scalar() or Decimal('0.0')
+
+    # Krok 3: Walidacja limitu 100%.
+    if total_share + Decimal(str(split_data.share_percentage)) > Decimal('100.0'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Nie można dodać podziału. Suma udziałów przekroczyłaby 100%. Obecna suma: {total_share}%."
+        )
+
+    # Krok 4: Zapis.
+    db_split = models.MusicReleaseRoyaltySplit(
+        email=split_data.email,
+        share_percentage=Decimal(str(split_data.share_percentage)),
+        release_id=release_id
+    )
+    db.add(db_split)
+    await db.commit()
+    await db.refresh(db_split)
+    return db_split
+
+async def replace_royalty_splits_for_release(db: AsyncSession, splits: List[schemas.RoyaltySplitCreate], release_id: int, owner_id: int):
+    """
+    Atomowo zastępuje cały zestaw podziałów tantiem wydawnictwa.
+    Odpowiednik crud.replace_royalty_splits_for_release.
+    """
+    rows = validate_royalty_split_set(splits)
+
+    try:
+        result = await db.execute(
+            select(models.MusicRelease.id)
+            .filter(models.MusicRelease.id == release_id, models.MusicRelease.owner_id == owner_id)
+            .with_for_update()
+        )
+        if result.scalar() is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Wydawnictwo o ID {release_id} nie zostało znalezione lub nie masz uprawnień do jego modyfikacji."
+            )
+
+        await db.execute(delete(models.MusicReleaseRoyaltySplit).filter(models.MusicReleaseRoyaltySplit.release_id == release_id))
+        new_splits = []
+        if rows:
+            result = await db.scalars(
+                insert(models.MusicReleaseRoyaltySplit).returning(models.MusicReleaseRoyaltySplit),
+                [{**row, "release_id": release_id} for row in rows]
+            )
+            new_splits = result.all()
+        await db.commit()
+        return new_splits
+    except Exception:
+        await db.rollback()
+        raise
\ No newline at end of file
@@ -0,0 +1,144 @@
+# music_app/audio_analysis.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+
+from common.database import AsyncSessionLocal
+from file_storage.storage import storage
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# NumPy (file_storage.audio) jest importowany przy pierwszej analizie,
+# a nie przy starcie aplikacji.
+
+WAVEFORM_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class AudioAnalyzer:
+    """
+    Analiza nagrań w tle: master jest pobierany strumieniowo do pliku
+    tymczasowego na dysku, a następnie czytany porcjami w osobnym procesie
+    (file_storage.audio.analyze_audio). Podsumowanie trafia do kolumny
+    audio_analysis wydawnictwa, a szczyty (.dat) obok pliku audio w magazynie,
+    dzięki czemu frontend nie musi pobierać całego mastera.
+    """
+
+    def __init__(self, workers: int | None = None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self._executor: ProcessPoolExecutor | None = None
+        self.analyzed = 0
+        self.reused = 0
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Jak w CoverProcessor - procesy startowane przez "spawn", bez
+            # dziedziczenia stanu uvicorn (sygnały, otwarte deskryptory).
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    @staticmethod
+    def waveform_key(audio_key: str) -> str:
+        """audio/abc.wav -> audio/abc.waveform.dat"""
+        return f"{audio_key.rsplit('.', 1)[0]}.waveform.dat"
+
+    async def _analyze_key(self, audio_key: str) -> tuple:
+        from file_storage.audio import analyze_audio
+        suffix = os.path.splitext(audio_key)[1]
+        with tempfile.NamedTemporaryFile(suffix=suffix) as tmp:
+            if not await run_in_threadpool(storage.download_to_file, audio_key, tmp):
+                raise RuntimeError(f"Cannot download {audio_key}")
+            return await asyncio.get_running_loop().run_in_executor(self.executor, analyze_audio, tmp.name)
+
+    async def _reuse(self, release_id: int, audio_url: str) -> bool:
+        """
+        Kopiuje analizę z innego wydawnictwa z tym samym plikiem audio
+        (deduplikacja - file_storage.assets). False, jeśli żadne nie ma jej
+        jeszcze zapisanej.
+        """
+        async with AsyncSessionLocal() as db:
+            summary = (await db.execute(
+                select(models.MusicRelease.audio_analysis)
+                .where(
+                    models.MusicRelease.audio_file_url == audio_url,
+                    models.MusicRelease.id != release_id,
+                    models.MusicRelease.audio_analysis.is_not(None),
+                )
+                .limit(1)
+            )).scalar()
+            if not summary:
+                return False
+            await db.execute(
+                update(models.MusicRelease)
+                .where(models.MusicRelease.id == release_id)
+                .values(audio_analysis=summary)
+            )
+            await db.commit()
+        return True
+
+    async def process(self, release_id: int, audio_url: str, existing: bool = False):
+        """
+        Zadanie w tle (BackgroundTasks) - wyjątki są logowane, nie propagowane.
+        existing=True: nagranie było już w magazynie i zwykle ma już analizę
+        oraz szczyty - są kopiowane zamiast liczone od nowa.
+        """
+        from file_storage.audio import WAVEFORM_CONTENT_TYPE, AudioAnalysisError
+        audio_key = storage.key_from_url(audio_url)
+        if audio_key is None:
+            logger.warning(f"Release {release_id}: audio {audio_url} is not stored in our bucket, skipping")
+            return
+        try:
+            if existing and await self._reuse(release_id, audio_url):
+                self.reused += 1
+                logger.info(f"Release {release_id}: reused audio analysis of {audio_key}")
+                return
+            summary, waveform = await self._analyze_key(audio_key)
+            waveform_url = await run_in_threadpool(
+                storage.upload_bytes, waveform, self.waveform_key(audio_key), WAVEFORM_CONTENT_TYPE, WAVEFORM_CACHE_CONTROL
+            )
+            if waveform_url is None:
+                raise RuntimeError(f"Upload of waveform for {audio_key} failed")
+            summary["waveform_url"] = waveform_url
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(models.MusicRelease)
+                    .where(models.MusicRelease.id == release_id)
+                    .values(audio_analysis=summary)
+                )
+                await db.commit()
+            self.analyzed += 1
+            logger.info(f"Release {release_id}: audio analyzed ({summary['duration']}s, {summary['loudness_lufs']} LUFS)")
+        except AudioAnalysisError as e:
+            self.rejected += 1
+            logger.warning(f"Release {release_id}: audio analysis rejected: {e}")
+        except Exception:
+            self.failed += 1
+            logger.exception(f"Release {release_id}: audio analysis failed")
+
+    def shutdown(self):
+        # Jak CoverProcessor.shutdown - czekamy na zamknięcie procesów.
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "analyzed": self.analyzed,
+            "reused": self.reused,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+
+# Współdzielona instancja; liczba procesów: AUDIO_ANALYSIS_WORKERS.
+audio_analyzer = AudioAnalyzer(workers=int(os.getenv("AUDIO_ANALYSIS_WORKERS", 0)) or None)
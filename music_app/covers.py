@@ -0,0 +1,154 @@
+# music_app/covers.py
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+
+from common.database import AsyncSessionLocal
+from file_storage.storage import storage
+from . import models
+
+logger = logging.getLogger(__name__)
+
+# Pillow (file_storage.images) jest importowany przy pierwszej okładce,
+# a nie przy starcie aplikacji.
+
+# Wersje okładek są niezmienne (nowa okładka = nowy klucz), więc CDN
+# i przeglądarki mogą je trzymać bezterminowo.
+RENDITION_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class CoverProcessor:
+    """
+    Przetwarza okładki poza ścieżką żądania: pobiera oryginał z magazynu,
+    waliduje go i tworzy wersje WebP/JPEG w osobnych procesach (Pillow
+    trzyma GIL przy skalowaniu), zapisuje je obok oryginału i zapisuje
+    ich URL-e w wydawnictwie. Endpoint odpowiada od razu po zapisie
+    wydawnictwa; przetwarzanie startuje jako zadanie w tle.
+    """
+
+    def __init__(self, workers: int | None = None):
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self._executor: ProcessPoolExecutor | None = None
+        self.processed = 0
+        self.reused = 0
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # "spawn" zamiast fork: proces rozwidlony z uvicorn dziedziczy jego
+            # obsługę SIGTERM i deskryptory sąsiednich workerów, więc po
+            # zakończeniu API zostawałby osierocony w oczekiwaniu na zadania.
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    @staticmethod
+    def rendition_key(original_key: str, fmt: str, size: int) -> str:
+        """covers/abc.png -> covers/abc_300.webp"""
+        from file_storage.images import EXTENSIONS
+        stem = original_key.rsplit(".", 1)[0]
+        return f"{stem}_{size}.{EXTENSIONS[fmt]}"
+
+    async def _upload(self, original_key: str, renditions: dict) -> dict:
+        from file_storage.images import CONTENT_TYPES
+        keys = [(fmt, size, self.rendition_key(original_key, fmt, size)) for fmt, size in renditions]
+        urls = await asyncio.gather(*(
+            run_in_threadpool(storage.upload_bytes, renditions[(fmt, size)], key, CONTENT_TYPES[fmt], RENDITION_CACHE_CONTROL)
+            for fmt, size, key in keys
+        ))
+        result = {}
+        for (fmt, size, _), url in zip(keys, urls):
+            if url is None:
+                raise RuntimeError(f"Upload of cover rendition {fmt}/{size} failed")
+            result.setdefault(fmt, {})[str(size)] = url
+        return result
+
+    async def _reuse(self, release_id: int, cover_url: str) -> bool:
+        """
+        Kopiuje wersje okładki z innego wydawnictwa z tym samym plikiem
+        (deduplikacja - file_storage.assets). False, jeśli żadne nie ma ich
+        jeszcze zapisanych.
+        """
+        async with AsyncSessionLocal() as db:
+            renditions = (await db.execute(
+                select(models.MusicRelease.cover_renditions)
+                .where(
+                    models.MusicRelease.cover_image_url == cover_url,
+                    models.MusicRelease.id != release_id,
+                    models.MusicRelease.cover_renditions.is_not(None),
+                )
+                .limit(1)
+            )).scalar()
+            if not renditions:
+                return False
+            await db.execute(
+                update(models.MusicRelease)
+                .where(models.MusicRelease.id == release_id)
+                .values(cover_renditions=renditions)
+            )
+            await db.commit()
+        return True
+
+    async def process(self, release_id: int, cover_url: str, existing: bool = False):
+        """
+        Zadanie w tle (BackgroundTasks) - wyjątki są logowane, nie propagowane.
+        existing=True: plik był już w magazynie, więc jego wersje zwykle też -
+        są kopiowane zamiast generowane od nowa.
+        """
+        from file_storage.images import CoverValidationError, build_renditions
+        original_key = storage.key_from_url(cover_url)
+        if original_key is None:
+            logger.warning(f"Release {release_id}: cover {cover_url} is not stored in our bucket, skipping")
+            return
+        try:
+            if existing and await self._reuse(release_id, cover_url):
+                self.reused += 1
+                logger.info(f"Release {release_id}: reused cover renditions of {original_key}")
+                return
+            data = await run_in_threadpool(storage.download_bytes, original_key)
+            if data is None:
+                raise RuntimeError(f"Cannot download {original_key}")
+            renditions = await asyncio.get_running_loop().run_in_executor(self.executor, build_renditions, data)
+            urls = await self._upload(original_key, renditions)
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(models.MusicRelease)
+                    .where(models.MusicRelease.id == release_id)
+                    .values(cover_renditions=urls)
+                )
+                await db.commit()
+            self.processed += 1
+            logger.info(f"Release {release_id}: stored {len(renditions)} cover renditions")
+        except CoverValidationError as e:
+            self.rejected += 1
+            logger.warning(f"Release {release_id}: cover rejected: {e}")
+        except Exception:
+            self.failed += 1
+            logger.exception(f"Release {release_id}: cover processing failed")
+
+    def shutdown(self):
+        # Oczekujące zadania są anulowane, ale na zakończenie procesów
+        # czekamy - uvicorn kończy się sygnałem zaraz po lifespan, bez
+        # handlerów atexit, które w przeciwnym razie by je zamknęły.
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "reused": self.reused,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
+
+
+# Współdzielona instancja; liczba procesów: COVER_WORKERS.
+cover_processor = CoverProcessor(workers=int(os.getenv("COVER_WORKERS", 0)) or None)
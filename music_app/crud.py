@@ -1,22 +1,52 @@
 # music_app/crud.py
 
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import delete, func, insert, select, tuple_
 from . import models, schemas
+from file_storage.assets import release_keys
+from file_storage.storage import storage
 from fastapi import HTTPException, status
+from datetime import datetime
 from decimal import Decimal
+from typing import List, Optional, Tuple
 
 # Tutaj powinny znajdować się Twoje istniejące funkcje CRUD,
 # np. create_music_release, get_releases_by_owner_id, itp.
 # Poniżej dodajemy nową funkcję.
 
 def get_music_release(db: Session, release_id: int):
-    """Pobiera pojedyncze wydawnictwo po ID."""
-    return db.query(models.MusicRelease).filter(models.MusicRelease.id == release_id).first()
+    """Pobiera pojedyncze wydawnictwo po ID (razem z podziałami tantiem)."""
+    return (
+        db.query(models.MusicRelease)
+        .options(selectinload(models.MusicRelease.royalty_splits))
+        .filter(models.MusicRelease.id == release_id)
+        .first()
+    )
+
+def keyset_releases_query(owner_id: int, limit: int, after: Optional[Tuple[datetime, int]] = None, release_status: Optional[str] = None):
+    """
+    Buduje zapytanie o stronę wydawnictw właściciela w kolejności
+    (created_at, id) malejąco. Zamiast OFFSET filtrujemy po pozycji
+    ostatniego elementu poprzedniej strony, więc koszt strony nie rośnie
+    wraz z jej numerem (indeks ix_music_releases_owner_created_id).
+    """
+    query = select(models.MusicRelease).filter(models.MusicRelease.owner_id == owner_id)
+    if release_status is not None:
+        query = query.filter(models.MusicRelease.status == release_status)
+    if after is not None:
+        query = query.filter(tuple_(models.MusicRelease.created_at, models.MusicRelease.id) < tuple_(*after))
+    return query.order_by(models.MusicRelease.created_at.desc(), models.MusicRelease.id.desc()).limit(limit)
 
-def get_music_releases_by_owner(db: Session, owner_id: int, skip: int = 0, limit: int = 100):
-    """Pobiera listę wydawnictw dla danego właściciela."""
-    return db.query(models.MusicRelease).filter(models.MusicRelease.owner_id == owner_id).offset(skip).limit(limit).all()
+def get_music_releases_by_owner(db: Session, owner_id: int, limit: int = 100, after: Optional[Tuple[datetime, int]] = None, release_status: Optional[str] = None):
+    """
+    Pobiera stronę wydawnictw dla danego właściciela (stronicowanie keyset).
+    Podziały tantiem są ładowane jednym dodatkowym zapytaniem (selectin)
+    dla całej strony, zamiast osobnego zapytania na każde wydawnictwo.
+    """
+    query = keyset_releases_query(owner_id, limit, after, release_status).options(
+        selectinload(models.MusicRelease.royalty_splits)
+    )
+    return db.execute(query).scalars().all()
 
 def create_music_release(db: Session, title: str, artist: str, cover_url: str, audio_url: str, owner_id: int):
     """Tworzy nowy wpis wydawnictwa muzycznego w bazie danych."""
@@ -32,6 +62,32 @@ def create_music_release(db: Session, title: str, artist: str, cover_url: str, a
     db.refresh(db_release)
     return db_release
 
+def release_asset_keys(db: Session, release: models.MusicRelease):
+    """Zwalnia referencje do plików wydawnictwa (file_storage.assets); commit należy do wywołującego."""
+    release_keys(db, [
+        storage.key_from_url(release.cover_image_url),
+        storage.key_from_url(release.audio_file_url),
+    ])
+
+def delete_music_release(db: Session, release_id: int, owner_id: int):
+    """
+    Usuwa wydawnictwo właściciela razem z podziałami tantiem (404, jeśli
+    go nie ma) i w tej samej transakcji zwalnia referencje do jego plików.
+    """
+    release = get_music_release(db, release_id)
+    if release is None or release.owner_id != owner_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Wydawnictwo o ID {release_id} nie zostało znalezione lub nie masz uprawnień do jego modyfikacji."
+        )
+    try:
+        db.delete(release)
+        release_asset_keys(db, release)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
 # NOWA FUNKCJA DO OBSŁUGI ROYALTY SPLITS
 def create_royalty_split_for_release(db: Session, split_data: schemas.RoyaltySplitCreate, release_id: int, owner_id: int):
     """
@@ -42,10 +98,12 @@ def create_royalty_split_for_release(db: Session, split_data: schemas.RoyaltySpl
     """
     # Krok 1: Weryfikacja. Sprawdź, czy wydawnictwo istnieje i czy
     # zalogowany użytkownik jest jego właścicielem.
+    # Blokada wiersza (FOR UPDATE) serializuje równoległe dodawanie
+    # podziałów do tego samego wydawnictwa - sprawdzenie sumy nie jest wyścigiem.
     release = db.query(models.MusicRelease).filter(
         models.MusicRelease.id == release_id,
         models.MusicRelease.owner_id == owner_id
-    ).first()
+    ).with_for_update().first()
 
     if not release:
         raise HTTPException(
@@ -75,4 +133,64 @@ def create_royalty_split_for_release(db: Session, split_data: schemas.RoyaltySpl
     db.add(db_split)
     db.commit()
     db.refresh(db_split)
-    return db_split
\ No newline at end of file
+    return db_split
+
+def validate_royalty_split_set(splits: List[schemas.RoyaltySplitCreate]) -> List[dict]:
+    """
+    Waliduje kompletny zestaw podziałów w pamięci (suma <= 100%, unikalne
+    adresy e-mail) i zwraca wiersze gotowe do zbiorczego zapisu.
+    """
+    seen_emails = set()
+    total_share = Decimal('0.0')
+    rows = []
+    for split in splits:
+        email = split.email.lower()
+        if email in seen_emails:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Adres {split.email} występuje w podziale więcej niż raz."
+            )
+        seen_emails.add(email)
+        share = Decimal(str(split.share_percentage))
+        total_share += share
+        rows.append({"email": split.email, "share_percentage": share})
+
+    if total_share > Decimal('100.0'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Suma udziałów nie może przekraczać 100%. Podana suma: {total_share}%."
+        )
+    return rows
+
+def replace_royalty_splits_for_release(db: Session, splits: List[schemas.RoyaltySplitCreate], release_id: int, owner_id: int):
+    """
+    Atomowo zastępuje cały zestaw podziałów tantiem wydawnictwa: walidacja
+    w pamięci, blokada wiersza wydawnictwa, usunięcie starych podziałów
+    i jeden zbiorczy INSERT - wszystko w jednej transakcji.
+    """
+    rows = validate_royalty_split_set(splits)
+
+    try:
+        release_id_locked = db.execute(
+            select(models.MusicRelease.id)
+            .filter(models.MusicRelease.id == release_id, models.MusicRelease.owner_id == owner_id)
+            .with_for_update()
+        ).scalar()
+        if release_id_locked is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Wydawnictwo o ID {release_id} nie zostało znalezione lub nie masz uprawnień do jego modyfikacji."
+            )
+
+        db.execute(delete(models.MusicReleaseRoyaltySplit).filter(models.MusicReleaseRoyaltySplit.release_id == release_id))
+        new_splits = []
+        if rows:
+            new_splits = db.scalars(
+                insert(models.MusicReleaseRoyaltySplit).returning(models.MusicReleaseRoyaltySplit),
+                [{**row, "release_id": release_id} for row in rows]
+            ).all()
+        db.commit()
+        return new_splits
+    except Exception:
+        db.rollback()
+        raise
\ No newline at end of file
@@ -1,20 +1,39 @@
 # music_app/models.py
 
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Numeric
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Numeric, Index, JSON
 from sqlalchemy.orm import relationship
 # POPRAWIONY IMPORT: Importujemy 'Base' z centralnej lokalizacji
 from common.database import Base
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
 class MusicRelease(Base):
     __tablename__ = 'music_releases'
+    __table_args__ = (
+        # Indeks pod stronicowanie keyset listy wydawnictw właściciela.
+        Index('ix_music_releases_owner_created_id', 'owner_id', 'created_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     artist = Column(String, nullable=False)
     cover_image_url = Column(String, nullable=False)
+    # Pomniejszone wersje okładki: {"webp": {"300": url, ...}, "jpeg": {...}}.
+    # Wypełniane w tle po utworzeniu wydawnictwa (music_app/covers.py).
+    cover_renditions = Column(JSON, nullable=True)
     audio_file_url = Column(String, nullable=False)
+    # Wynik analizy nagrania (czas trwania, szczyt, głośność, URL szczytów
+    # .dat) - wypełniany w tle (music_app/audio_analysis.py).
+    audio_analysis = Column(JSON, nullable=True)
     status = Column(String, default='pending', nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Znacznik czasu z aplikacji (mikrosekundy), a nie CURRENT_TIMESTAMP bazy:
+    # SQLite zapisuje CURRENT_TIMESTAMP z dokładnością do sekundy, a kursor
+    # stronicowania jest porównywany jako tekst z ułamkiem sekundy - strony
+    # nie przesuwałyby się. server_default zostaje dla wstawień poza ORM.
+    created_at = Column(DateTime(timezone=True), default=_utcnow, server_default=func.now())
     owner_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     
     # Ta relacja nie wymaga zmiany, bo odwołuje się do klasy User,
@@ -35,4 +54,5 @@ class MusicReleaseRoyaltySplit(Base):
     release = relationship("MusicRelease", back_populates="royalty_splits")
 
     def __repr__(self):
-        return f"<MusicReleaseRoyaltySplit(id={self.id}, release_id={self.release_id}, email='{self.email}', share={self.share_percentage}%)>"
\ No newline at end of file
+        return f"<MusicReleaseRoyaltySplit(id={self.id}, release_id={self.release_id}, email='{self.email}', share={self.share_percentage}%)>"
+
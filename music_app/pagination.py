@@ -0,0 +1,27 @@
+# music_app/pagination.py
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+# Kursor stronicowania (keyset) to pozycja ostatniego elementu strony:
+# para (created_at, id), zakodowana jako nieprzezroczysty token base64url.
+# Kolejna strona zaczyna się od elementów "starszych" niż kursor, więc baza
+# korzysta z indeksu (owner_id, created_at, id) zamiast przewijać OFFSET.
+
+def encode_cursor(created_at: datetime, release_id: int) -> str:
+    raw = json.dumps({"c": created_at.isoformat(), "i": release_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nieprawidłowy kursor stronicowania.")
@@ -1,14 +1,29 @@
 # music_app/router.py
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from typing import List, Annotated
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, UploadFile, File, Form, Header, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Annotated, Optional
+from urllib.parse import urlencode
 
 # POPRAWIONY IMPORT
 from common import database
-from . import schemas, crud
-from auth_app.oauth2 import get_current_user_id 
-from file_storage.s3_handler import s3_upload
+from . import schemas
+from . import async_crud as crud
+from .audio_analysis import audio_analyzer
+from .covers import cover_processor
+from .pagination import decode_cursor, encode_cursor
+from auth_app.deps import get_current_user_id
+from file_storage.assets import asset_store
+from file_storage.storage import storage
+from file_storage.streaming import range_response
+import os
+
+MB = 1024 * 1024
+PRESIGNED_EXPIRES = int(os.getenv("S3_PRESIGNED_EXPIRES", 3600))
+COVER_MAX_SIZE = int(float(os.getenv("S3_COVER_MAX_MB", 20)) * MB)
+AUDIO_MAX_SIZE = int(float(os.getenv("S3_AUDIO_MAX_MB", 2048)) * MB)
 
 router = APIRouter(
     prefix="/music",
@@ -18,42 +33,286 @@ router = APIRouter(
 # ... (reszta kodu bez zmian, ponieważ importy były już poprawne)
 # Poniżej dla pewności wklejam cały plik
 @router.post("/releases/", response_model=schemas.MusicReleaseOut, status_code=201)
-def create_new_release(
+async def create_new_release(
     title: Annotated[str, Form()],
     artist: Annotated[str, Form()],
     cover_image: Annotated[UploadFile, File()],
     audio_file: Annotated[UploadFile, File()],
-    db: Session = Depends(database.get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(database.get_async_db),
     current_user_id: int = Depends(get_current_user_id)
 ):
-    cover_url = s3_upload(cover_image, "covers")
-    audio_url = s3_upload(audio_file, "audio")
-    return crud.create_music_release(
-        db=db,
-        title=title,
-        artist=artist,
-        cover_url=cover_url,
-        audio_url=audio_url,
-        owner_id=current_user_id
+    # Upload do S3 (boto3) jest blokujący - wykonujemy go poza pętlą zdarzeń.
+    # Okładka i plik audio są wysyłane równolegle, a duże pliki jako
+    # multipart z równoległymi częściami (S3Handler.transfer_config).
+    # Pliki już obecne w magazynie (ten sam SHA-256) nie są wysyłane ponownie.
+    cover, audio = await asyncio.gather(
+        run_in_threadpool(asset_store.upload_file, cover_image, "covers"),
+        run_in_threadpool(asset_store.upload_file, audio_file, "audio"),
     )
+    if not cover.url or not audio.url:
+        await run_in_threadpool(asset_store.release_urls, [cover.url, audio.url])
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Nie udało się przesłać plików do magazynu. Spróbuj ponownie."
+        )
+    try:
+        release = await crud.create_music_release(
+            db=db,
+            title=title,
+            artist=artist,
+            cover_url=cover.url,
+            audio_url=audio.url,
+            owner_id=current_user_id
+        )
+    except Exception:
+        # Wydawnictwo nie powstało - referencje do plików trzeba zwolnić,
+        # inaczej obiekty nigdy nie zostałyby usunięte.
+        await run_in_threadpool(asset_store.release_urls, [cover.url, audio.url])
+        raise
+    # Wersje okładki (WebP/JPEG) i analiza nagrania powstają w tle, po wysłaniu
+    # odpowiedzi. Dla plików już obecnych w magazynie są kopiowane z wydawnictwa,
+    # które ich używa, zamiast liczone od nowa.
+    background_tasks.add_task(cover_processor.process, release.id, release.cover_image_url, cover.existing)
+    background_tasks.add_task(audio_analyzer.process, release.id, release.audio_file_url, audio.existing)
+    return release
+
+@router.delete("/releases/{release_id}", status_code=204)
+async def delete_release(
+    release_id: int,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Usuwa wydawnictwo razem z podziałami tantiem i zwalnia referencje do
+    jego plików - nieużywane obiekty usuwa później
+    'python -m file_storage.assets purge'.
+    """
+    await crud.delete_music_release(db, release_id=release_id, owner_id=current_user_id)
+    return Response(status_code=204)
 
 @router.get("/releases/", response_model=List[schemas.MusicReleaseOut])
-def get_user_releases(
-    db: Session = Depends(database.get_db),
+async def get_user_releases(
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Kursor z nagłówka X-Next-Cursor poprzedniej strony."),
+    release_status: Optional[str] = Query(None, alias="status"),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user_id: int = Depends(get_current_user_id)
 ):
-    return crud.get_music_releases_by_owner(db, owner_id=current_user_id)
+    """
+    Zwraca stronę wydawnictw użytkownika, od najnowszych. Jeśli istnieje
+    kolejna strona, jej kursor jest w nagłówku X-Next-Cursor (oraz Link).
+    """
+    # Pobieramy jeden element więcej, aby wiedzieć, czy jest kolejna strona.
+    releases = await crud.get_music_releases_by_owner(
+        db,
+        owner_id=current_user_id,
+        limit=limit + 1,
+        after=decode_cursor(cursor),
+        release_status=release_status
+    )
+    headers = {}
+    if len(releases) > limit:
+        releases = releases[:limit]
+        last = releases[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+        next_params = {"limit": limit, "cursor": next_cursor}
+        if release_status is not None:
+            next_params["status"] = release_status
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{router.prefix}/releases/?{urlencode(next_params)}>; rel="next"'
+    # Szybka ścieżka serializacji listy (prekompilowany TypeAdapter).
+    return Response(content=schemas.dump_music_releases(releases), media_type="application/json", headers=headers)
 
 @router.post("/releases/{release_id}/royalty-splits", response_model=schemas.RoyaltySplitOut, status_code=201)
-def add_royalty_split_to_release(
+async def add_royalty_split_to_release(
     release_id: int,
     split_data: schemas.RoyaltySplitCreate,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user_id: int = Depends(get_current_user_id)
 ):
-    return crud.create_royalty_split_for_release(
+    return await crud.create_royalty_split_for_release(
         db=db,
         split_data=split_data,
         release_id=release_id,
         owner_id=current_user_id
-    )
\ No newline at end of file
+    )
+
+@router.put("/releases/{release_id}/royalty-splits", response_model=List[schemas.RoyaltySplitOut])
+async def replace_release_royalty_splits(
+    release_id: int,
+    splits: List[schemas.RoyaltySplitCreate],
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Zastępuje cały zestaw podziałów tantiem wydawnictwa w jednej transakcji.
+    Zestaw jest walidowany w całości (suma <= 100%, unikalne adresy e-mail)
+    przed zapisem; pusta lista usuwa wszystkie podziały.
+    """
+    return await crud.replace_royalty_splits_for_release(
+        db=db,
+        splits=splits,
+        release_id=release_id,
+        owner_id=current_user_id
+    )
+
+# --- BEZPOŚREDNI UPLOAD DO MAGAZYNU (PRESIGNED) ---
+# Krok 1: API wydaje podpisane URL-e, a przeglądarka wysyła pliki
+# bezpośrednio do S3. Krok 2: API weryfikuje obiekty i tworzy wydawnictwo.
+# Workery API obsługują tylko małe żądania JSON.
+
+def _validate_asset(asset: schemas.AssetUploadRequest, type_prefix: str, max_size: int):
+    if not asset.content_type.startswith(type_prefix):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Nieprawidłowy typ pliku '{asset.content_type}'. Oczekiwano {type_prefix}*."
+        )
+    if asset.size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Plik '{asset.filename}' przekracza limit {max_size // MB} MB."
+        )
+
+def _presign_asset(asset: schemas.AssetUploadRequest, folder: str, type_prefix: str, max_size: int, owner_id: int):
+    key = storage.new_key(folder, asset.filename)
+    if asset.size > storage.multipart_threshold:
+        multipart = storage.create_presigned_multipart(key, owner_id, asset.content_type, asset.size, PRESIGNED_EXPIRES)
+        if multipart is None:
+            return None
+        return schemas.PresignedAssetUpload(key=key, method="multipart", **multipart)
+    post = storage.presigned_post(key, owner_id, asset.content_type, type_prefix, max_size, PRESIGNED_EXPIRES)
+    if post is None:
+        return None
+    return schemas.PresignedAssetUpload(key=key, method="post", url=post["url"], fields=post["fields"])
+
+@router.post("/releases/uploads", response_model=schemas.ReleaseUploadResponse)
+async def create_release_uploads(
+    upload_request: schemas.ReleaseUploadRequest,
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Wydaje podpisane URL-e do bezpośredniego uploadu okładki (covers/)
+    i pliku audio (audio/). Duże pliki audio dostają multipart upload
+    z osobnym URL-em dla każdej części.
+    """
+    _validate_asset(upload_request.cover, "image/", COVER_MAX_SIZE)
+    _validate_asset(upload_request.audio, "audio/", AUDIO_MAX_SIZE)
+
+    cover, audio = await asyncio.gather(
+        run_in_threadpool(_presign_asset, upload_request.cover, "covers", "image/", COVER_MAX_SIZE, current_user_id),
+        run_in_threadpool(_presign_asset, upload_request.audio, "audio", "audio/", AUDIO_MAX_SIZE, current_user_id),
+    )
+    if cover is None or audio is None:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Nie udało się przygotować uploadu. Spróbuj ponownie."
+        )
+    return schemas.ReleaseUploadResponse(cover=cover, audio=audio, expires_in=PRESIGNED_EXPIRES)
+
+def _verify_asset(asset: schemas.FinalizedAsset, folder: str, type_prefix: str, max_size: int, owner_id: int) -> str:
+    """
+    Domyka ewentualny multipart, sprawdza istnienie, właściciela oraz
+    rozmiar i typ obiektu (te same limity co przy wydaniu URL-i), po czym
+    rejestruje go w stored_assets (jedna referencja) i zwraca jego URL.
+    Obiekt niezgodny z limitami jest usuwany z magazynu.
+    """
+    if not asset.key.startswith(f"{folder}/"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Nieprawidłowy klucz pliku: {asset.key}")
+
+    if asset.upload_id:
+        parts = [{"PartNumber": part.part_number, "ETag": part.etag} for part in asset.parts]
+        if not parts or not storage.complete_multipart(asset.key, asset.upload_id, parts):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Nie udało się złożyć pliku {asset.key} z przesłanych części."
+            )
+
+    head = storage.head_object(asset.key)
+    if head is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Plik {asset.key} nie został przesłany do magazynu."
+        )
+    if head["metadata"].get("owner-id") != str(owner_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Brak uprawnień do tego pliku.")
+
+    # Warunki podpisanego POST-a pilnuje S3, ale części multipart wysyła
+    # klient bez żadnych limitów - rozmiar złożonego obiektu sprawdzamy tutaj.
+    size = head["size"] or 0
+    if not 0 < size <= max_size:
+        storage.delete_prefix(asset.key)
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Plik {asset.key} ma nieprawidłowy rozmiar ({size} B, limit {max_size // MB} MB)."
+        )
+    if not (head["content_type"] or "").startswith(type_prefix):
+        storage.delete_prefix(asset.key)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Nieprawidłowy typ pliku '{head['content_type']}'. Oczekiwano {type_prefix}*."
+        )
+    asset_store.register(asset.key, size, head["content_type"])
+    return storage.public_url(asset.key)
+
+@router.post("/releases/finalize", response_model=schemas.MusicReleaseOut, status_code=201)
+async def finalize_release(
+    release_data: schemas.FinalizeReleaseRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Potwierdza bezpośredni upload: weryfikuje, że oba obiekty istnieją,
+    należą do użytkownika i mieszczą się w limitach rozmiaru i typu,
+    a następnie tworzy wydawnictwo.
+    """
+    verified = await asyncio.gather(
+        run_in_threadpool(_verify_asset, release_data.cover, "covers", "image/", COVER_MAX_SIZE, current_user_id),
+        run_in_threadpool(_verify_asset, release_data.audio, "audio", "audio/", AUDIO_MAX_SIZE, current_user_id),
+        return_exceptions=True,
+    )
+    # Każdy zweryfikowany plik to referencja w stored_assets - jeśli
+    # wydawnictwo nie powstanie, zwalniamy je (plik usunie purge).
+    errors = [result for result in verified if isinstance(result, BaseException)]
+    if errors:
+        await run_in_threadpool(asset_store.release_urls, [url for url in verified if isinstance(url, str)])
+        raise errors[0]
+    cover_url, audio_url = verified
+    try:
+        release = await crud.create_music_release(
+            db=db,
+            title=release_data.title,
+            artist=release_data.artist,
+            cover_url=cover_url,
+            audio_url=audio_url,
+            owner_id=current_user_id
+        )
+    except Exception:
+        await run_in_threadpool(asset_store.release_urls, [cover_url, audio_url])
+        raise
+    background_tasks.add_task(cover_processor.process, release.id, release.cover_image_url)
+    background_tasks.add_task(audio_analyzer.process, release.id, release.audio_file_url)
+    return release
+
+# --- ODTWARZANIE AUDIO ---
+
+@router.get("/releases/{release_id}/audio")
+async def stream_release_audio(
+    release_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user_id: int = Depends(get_current_user_id)
+):
+    """
+    Strumieniuje plik audio wydawnictwa z obsługą nagłówka Range (206
+    Partial Content), więc przewijanie w odtwarzaczu pobiera tylko
+    potrzebny fragment pliku.
+    """
+    release = await crud.get_music_release(db, release_id)
+    if release is None or release.owner_id != current_user_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Wydawnictwo o ID {release_id} nie zostało znalezione.")
+    audio_key = storage.key_from_url(release.audio_file_url)
+    if audio_key is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Plik audio nie jest przechowywany w magazynie aplikacji.")
+    return await run_in_threadpool(range_response, storage, audio_key, range_header)
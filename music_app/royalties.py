@@ -0,0 +1,246 @@
+# music_app/royalties.py
+#
+# Silnik rozliczeń tantiem na podstawie raportów dystrybutorów.
+#
+# Raport (CSV, miliony wierszy - jeden na utwór/sklep/kraj) jest czytany
+# strumieniowo w porcjach (chunksize). Każda porcja jest agregowana
+# wektorowo (NumPy/pandas) do sum per wydawnictwo w jednostkach
+# stałoprzecinkowych (mikro-jednostki waluty, int64), a potem łączona
+# z tabelą podziałów tantiem. Pamięć zależy od liczby wydawnictw, a nie
+# od rozmiaru pliku. Kwoty dla odbiorców liczone są dokładnie w Decimal
+# i zaokrąglane w dół do centów - nigdy nie wypłacamy więcej, niż wpłynęło.
+#
+# Użycie (CLI):
+#   python -m music_app.royalties raport.csv --out-dir statements/
+import argparse
+import csv
+import os
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, Iterable, List, Optional, TextIO
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+
+MICRO = 1_000_000
+CENT = Decimal('0.01')
+
+
+@dataclass
+class ReportFormat:
+    """Opis kolumn raportu dystrybutora."""
+    release_column: str = "release_id"
+    amount_column: str = "net_revenue"
+    delimiter: str = ","
+    chunksize: int = 500_000
+
+
+@dataclass
+class StatementLine:
+    release_id: int
+    release_title: str
+    gross: Decimal
+    share_percentage: Decimal
+    amount: Decimal
+
+
+@dataclass
+class PayeeStatement:
+    email: str
+    lines: List[StatementLine] = field(default_factory=list)
+    total: Decimal = Decimal('0')
+
+    @property
+    def payable(self) -> Decimal:
+        """Kwota do wypłaty - zaokrąglona w dół do centów."""
+        return self.total.quantize(CENT, rounding=ROUND_DOWN)
+
+
+@dataclass
+class StatementRun:
+    statements: Dict[str, PayeeStatement]
+    rows_processed: int
+    gross_total: Decimal
+    # Wszystko, co nie trafia do odbiorców (zostaje u wytwórni): udziały
+    # poniżej 100% oraz unmatched_total
+    unallocated_total: Decimal
+    # Wiersze bez ID wydawnictwa oraz wydawnictwa bez żadnych podziałów
+    unmatched_total: Decimal
+
+    @property
+    def rounding_residual(self) -> Decimal:
+        return sum((s.total - s.payable for s in self.statements.values()), Decimal('0'))
+
+
+# --- AGREGACJA RAPORTU ---
+
+def _micro_to_decimal(value: int) -> Decimal:
+    return Decimal(int(value)) / MICRO
+
+
+def aggregate_earnings(source, report_format: ReportFormat = ReportFormat()) -> tuple:
+    """
+    Czyta raport porcjami i zwraca (sumy per wydawnictwo jako pd.Series
+    int64 w mikro-jednostkach, liczba wierszy, suma wierszy bez ID).
+    """
+    reader = pd.read_csv(
+        source,
+        sep=report_format.delimiter,
+        usecols=[report_format.release_column, report_format.amount_column],
+        dtype={report_format.release_column: "Int64", report_format.amount_column: "float64"},
+        chunksize=report_format.chunksize,
+    )
+    totals = pd.Series(dtype="int64")
+    rows = 0
+    missing_id_micro = 0
+    for chunk in reader:
+        rows += len(chunk)
+        # Kwoty w raportach mają najwyżej kilka miejsc po przecinku - po
+        # przeskalowaniu do mikro-jednostek zaokrąglenie float jest dokładne.
+        amounts = np.rint(chunk[report_format.amount_column].fillna(0.0).to_numpy() * MICRO).astype(np.int64)
+        release_ids = chunk[report_format.release_column]
+        has_id = release_ids.notna().to_numpy()
+        missing_id_micro += int(amounts[~has_id].sum())
+
+        chunk_totals = pd.Series(amounts[has_id]).groupby(release_ids[has_id].to_numpy(dtype=np.int64)).sum()
+        # concat + groupby zamiast Series.add - wynik pozostaje int64 (bez float)
+        totals = pd.concat([totals, chunk_totals]).groupby(level=0).sum()
+    return totals, rows, missing_id_micro
+
+
+# --- PODZIAŁY ---
+
+def load_splits(db: Session, release_ids: Optional[Iterable[int]] = None, batch_size: int = 5000) -> pd.DataFrame:
+    """Ładuje podziały tantiem (z tytułami wydawnictw) jako DataFrame."""
+    query = (
+        select(
+            models.MusicReleaseRoyaltySplit.release_id,
+            models.MusicReleaseRoyaltySplit.email,
+            models.MusicReleaseRoyaltySplit.share_percentage,
+            models.MusicRelease.title.label("release_title"),
+        )
+        .join(models.MusicRelease, models.MusicRelease.id == models.MusicReleaseRoyaltySplit.release_id)
+    )
+    columns = ["release_id", "email", "share_percentage", "release_title"]
+    if release_ids is None:
+        return pd.DataFrame(db.execute(query).all(), columns=columns)
+
+    ids = [int(release_id) for release_id in release_ids]
+    frames = [
+        pd.DataFrame(
+            db.execute(query.filter(models.MusicReleaseRoyaltySplit.release_id.in_(ids[i:i + batch_size]))).all(),
+            columns=columns,
+        )
+        for i in range(0, len(ids), batch_size)
+    ]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+# --- ROZLICZENIE ---
+
+def compute_statements(release_totals: pd.Series, splits: pd.DataFrame, rows_processed: int = 0, missing_id_micro: int = 0) -> StatementRun:
+    """
+    Łączy sumy per wydawnictwo z podziałami i liczy wyciągi per e-mail.
+    Złączenie jest wektorowe; arytmetyka kwot - dokładna, w Decimal
+    (liczba linii zależy od katalogu, nie od rozmiaru raportu).
+    """
+    gross_micro = int(release_totals.sum()) + missing_id_micro
+    totals = release_totals.rename("gross_micro").rename_axis("release_id").reset_index()
+    merged = totals.merge(splits, on="release_id", how="left")
+
+    statements: Dict[str, PayeeStatement] = {}
+    allocated = Decimal('0')
+    unmatched = _micro_to_decimal(missing_id_micro)
+
+    for release_id, gross_micro_value, email, share, title in merged[
+        ["release_id", "gross_micro", "email", "share_percentage", "release_title"]
+    ].itertuples(index=False, name=None):
+        gross = _micro_to_decimal(gross_micro_value)
+        if pd.isna(email):
+            # Wydawnictwo z raportu bez podziałów (lub nieznane w bazie)
+            unmatched += gross
+            continue
+        share = Decimal(str(share))
+        amount = gross * share / 100
+        statement = statements.setdefault(email, PayeeStatement(email=email))
+        statement.lines.append(StatementLine(int(release_id), title, gross, share, amount))
+        statement.total += amount
+        allocated += amount
+
+    gross_total = _micro_to_decimal(gross_micro)
+    return StatementRun(
+        statements=statements,
+        rows_processed=rows_processed,
+        gross_total=gross_total,
+        unallocated_total=gross_total - allocated,
+        unmatched_total=unmatched,
+    )
+
+
+def run_statements(source, db: Optional[Session] = None, splits: Optional[pd.DataFrame] = None, report_format: ReportFormat = ReportFormat()) -> StatementRun:
+    """Pełny przebieg: agregacja raportu, pobranie podziałów i wyliczenie wyciągów."""
+    release_totals, rows, missing_id_micro = aggregate_earnings(source, report_format)
+    if splits is None:
+        if db is None:
+            raise ValueError("Podaj sesję bazy danych lub gotowy DataFrame z podziałami")
+        splits = load_splits(db, release_totals.index.tolist())
+    return compute_statements(release_totals, splits, rows_processed=rows, missing_id_micro=missing_id_micro)
+
+
+# --- EKSPORT CSV ---
+
+def write_statement_lines_csv(run: StatementRun, fp: TextIO):
+    """Szczegółowy wyciąg: jedna linia na (odbiorca, wydawnictwo)."""
+    writer = csv.writer(fp)
+    writer.writerow(["email", "release_id", "release_title", "gross", "share_percentage", "amount"])
+    for email in sorted(run.statements):
+        for line in run.statements[email].lines:
+            writer.writerow([email, line.release_id, line.release_title, line.gross, line.share_percentage, line.amount])
+
+
+def write_statement_summary_csv(run: StatementRun, fp: TextIO):
+    """Podsumowanie: jedna linia na odbiorcę z kwotą do wypłaty."""
+    writer = csv.writer(fp)
+    writer.writerow(["email", "releases", "total", "payable"])
+    for email in sorted(run.statements):
+        statement = run.statements[email]
+        writer.writerow([email, len(statement.lines), statement.total, statement.payable])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate royalty statements from a distributor earnings report")
+    parser.add_argument("report", help="distributor earnings CSV")
+    parser.add_argument("--out-dir", default="statements")
+    parser.add_argument("--release-column", default=ReportFormat.release_column)
+    parser.add_argument("--amount-column", default=ReportFormat.amount_column)
+    parser.add_argument("--delimiter", default=ReportFormat.delimiter)
+    parser.add_argument("--chunksize", type=int, default=ReportFormat.chunksize)
+    args = parser.parse_args()
+
+    from common.database import SessionLocal
+
+    report_format = ReportFormat(args.release_column, args.amount_column, args.delimiter, args.chunksize)
+    db = SessionLocal()
+    try:
+        run = run_statements(args.report, db=db, report_format=report_format)
+    finally:
+        db.close()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    with open(os.path.join(args.out_dir, "statement_lines.csv"), "w", newline="") as fp:
+        write_statement_lines_csv(run, fp)
+    with open(os.path.join(args.out_dir, "statement_summary.csv"), "w", newline="") as fp:
+        write_statement_summary_csv(run, fp)
+
+    print(f"Rows processed: {run.rows_processed}")
+    print(f"Gross total: {run.gross_total}")
+    print(f"Payees: {len(run.statements)}, payable: {sum(s.payable for s in run.statements.values())}")
+    print(f"Unallocated: {run.unallocated_total}, unmatched: {run.unmatched_total}, rounding residual: {run.rounding_residual}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 # music_app/schemas.py
 
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 # --- NOWE SCHEMATY DLA ROYALTY SPLITS ---
@@ -42,7 +42,13 @@ class MusicReleaseOut(MusicReleaseBase):
     """
     id: int
     cover_image_url: str
+    # Format -> rozmiar (dłuższy bok w px) -> URL; None, dopóki okładka
+    # nie zostanie przetworzona w tle.
+    cover_renditions: Optional[Dict[str, Dict[str, str]]] = None
     audio_file_url: str
+    # duration, peak_dbfs, rms_dbfs, loudness_lufs, waveform_url, ...;
+    # None, dopóki nagranie nie zostanie przeanalizowane w tle.
+    audio_analysis: Optional[Dict[str, Any]] = None
     status: str
     created_at: datetime
     owner_id: int
@@ -51,4 +57,66 @@ class MusicReleaseOut(MusicReleaseBase):
     royalty_splits: List[RoyaltySplitOut] = [] 
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Prekompilowany adapter dla list wydawnictw - walidacja z obiektów ORM
+# i serializacja do JSON w pydantic-core (Rust) jednym przebiegiem, bez
+# pośredniego słownika i ponownej walidacji response_model w FastAPI.
+music_release_list_adapter = TypeAdapter(List[MusicReleaseOut])
+
+def dump_music_releases(releases) -> bytes:
+    """Serializuje listę obiektów MusicRelease bezpośrednio do bajtów JSON."""
+    return music_release_list_adapter.dump_json(
+        music_release_list_adapter.validate_python(releases, from_attributes=True)
+    )
+
+# --- SCHEMATY DLA BEZPOŚREDNIEGO UPLOADU DO MAGAZYNU (PRESIGNED) ---
+
+class AssetUploadRequest(BaseModel):
+    """Opis pliku, który klient zamierza przesłać bezpośrednio do magazynu."""
+    filename: str
+    content_type: str
+    size: int = Field(..., gt=0, description="Rozmiar pliku w bajtach.")
+
+class ReleaseUploadRequest(BaseModel):
+    """Krok 1: prośba o podpisane URL-e dla okładki i pliku audio."""
+    cover: AssetUploadRequest
+    audio: AssetUploadRequest
+
+class PresignedUploadPart(BaseModel):
+    part_number: int
+    url: str
+
+class PresignedAssetUpload(BaseModel):
+    """
+    Instrukcja uploadu jednego pliku. Dla method="post" klient wysyła
+    formularz (fields + plik) na url; dla method="multipart" wysyła kolejne
+    części po part_size bajtów metodą PUT na URL-e z listy parts.
+    """
+    key: str
+    method: str
+    url: Optional[str] = None
+    fields: Optional[Dict[str, str]] = None
+    upload_id: Optional[str] = None
+    part_size: Optional[int] = None
+    parts: List[PresignedUploadPart] = []
+
+class ReleaseUploadResponse(BaseModel):
+    cover: PresignedAssetUpload
+    audio: PresignedAssetUpload
+    expires_in: int
+
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
+
+class FinalizedAsset(BaseModel):
+    """Przesłany plik; dla multipart zawiera upload_id i ETagi części."""
+    key: str
+    upload_id: Optional[str] = None
+    parts: List[UploadedPart] = []
+
+class FinalizeReleaseRequest(MusicReleaseBase):
+    """Krok 2: potwierdzenie uploadu i utworzenie wydawnictwa."""
+    cover: FinalizedAsset
+    audio: FinalizedAsset
@@ -0,0 +1,180 @@
+# prometheus_app/cache.py
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(messages: list, temperature: float, max_tokens: int, model: str) -> str:
+    """
+    Buduje klucz cache z (messages, temperature, max_tokens, model).
+
+    Treść wiadomości jest normalizowana (białe znaki na krańcach linii,
+    puste końcówki), a JSON serializowany z posortowanymi kluczami, więc ten
+    sam prompt zawsze daje ten sam hash niezależnie od formatowania.
+    """
+    normalized_messages = [
+        {
+            "role": str(message.get("role", "")).strip().lower(),
+            "content": "\n".join(line.strip() for line in str(message.get("content", "")).strip().splitlines()),
+        }
+        for message in messages
+    ]
+    payload = {
+        "messages": normalized_messages,
+        "temperature": round(float(temperature), 3),
+        "max_tokens": int(max_tokens),
+        "model": model,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return "prometheus:completion:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """Cache w pamięci procesu z TTL i wyrzucaniem najdawniej używanych wpisów (LRU)."""
+
+    backend = "memory"
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def clear(self):
+        self._entries.clear()
+
+    async def close(self):
+        pass
+
+    async def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RedisCache:
+    """
+    Współdzielony cache w Redis (dla wielu workerów). TTL jest ustawiany na
+    kluczu (SETEX), a wyrzucanie LRU realizuje Redis (maxmemory-policy
+    allkeys-lru). Błędy Redis są traktowane jak chybienie - cache nigdy nie
+    blokuje generowania.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str, ttl: float = 3600.0):
+        import redis.asyncio as redis_asyncio
+
+        self.url = url
+        self.ttl = ttl
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self._redis.get(key)
+        except Exception as e:
+            self.errors += 1
+            self.misses += 1
+            logger.warning(f"Redis cache get failed: {e}")
+            return None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str):
+        try:
+            await self._redis.set(key, value, ex=int(self.ttl))
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis cache set failed: {e}")
+
+    async def clear(self):
+        async for key in self._redis.scan_iter(match="prometheus:completion:*"):
+            await self._redis.delete(key)
+
+    async def close(self):
+        await self._redis.aclose()
+
+    async def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        # Wyrzucenia (LRU) wykonuje sam Redis - licznik pochodzi z INFO stats.
+        try:
+            info = await self._redis.info("stats")
+            evictions = info.get("evicted_keys")
+        except Exception:
+            evictions = None
+        return {
+            "backend": self.backend,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": evictions,
+            "errors": self.errors,
+        }
+
+
+def build_cache():
+    """
+    Tworzy backend cache na podstawie zmiennych środowiskowych:
+    PROMETHEUS_CACHE_BACKEND (memory | redis | none), PROMETHEUS_CACHE_TTL,
+    PROMETHEUS_CACHE_MAX_ENTRIES oraz REDIS_URL dla backendu redis.
+    """
+    backend = os.getenv("PROMETHEUS_CACHE_BACKEND", "memory").strip().lower()
+    ttl = float(os.getenv("PROMETHEUS_CACHE_TTL", 3600))
+    max_entries = int(os.getenv("PROMETHEUS_CACHE_MAX_ENTRIES", 1024))
+
+    if backend == "none":
+        return None
+    if backend == "redis":
+        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        try:
+            return RedisCache(redis_url, ttl=ttl)
+        except ImportError:
+            logger.warning("Package 'redis' not installed, falling back to in-memory cache.")
+    return MemoryCache(ttl=ttl, max_entries=max_entries)
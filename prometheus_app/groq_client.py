@@ -0,0 +1,353 @@
+# prometheus_app/groq_client.py
+import asyncio
+import json
+import os
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+from fastapi import HTTPException
+from prometheus_client import Counter, Histogram
+
+from .cache import make_cache_key
+from .singleflight import SingleFlight
+
+
+# Metryki Prometheus (udostępniane przez /metrics w prometheus_app.main)
+GROQ_LATENCY = Histogram(
+    "groq_request_duration_seconds",
+    "Groq API call latency, excluding time spent waiting for a concurrency slot",
+    ["mode", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0),
+)
+GROQ_QUEUE_WAIT = Histogram(
+    "groq_queue_wait_seconds",
+    "Time spent waiting for a Groq concurrency slot",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0),
+)
+GROQ_ERRORS = Counter("groq_errors_total", "Failed Groq API calls", ["mode", "reason"])
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+def _http2_available() -> bool:
+    # HTTP/2 w httpx wymaga opcjonalnego pakietu 'h2' (httpx[http2]).
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class GroqClient:
+    """
+    Klient Groq API oparty o jeden, długo żyjący httpx.AsyncClient.
+
+    Klient jest tworzony raz w hooku lifespan aplikacji (startup/shutdown),
+    dzięki czemu połączenia TCP/TLS są utrzymywane (keep-alive) i używane
+    ponownie między żądaniami. Semafor ogranicza liczbę równoległych wywołań
+    do Groq, a liczniki pozwalają dobrać rozmiar puli. Opcjonalny cache
+    (MemoryCache / RedisCache) zwraca gotowe odpowiedzi dla identycznych promptów.
+    """
+
+    def __init__(self, cache=None):
+        self.api_key = os.getenv("GROQ_API_KEY")
+        self.base_url = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+        self.model = os.getenv("GROQ_MODEL", "llama3-8b-8192")
+
+        # Konfiguracja puli połączeń (zmienne środowiskowe, jak w reszcie projektu)
+        self.timeout = _env_float("GROQ_TIMEOUT", 60.0)
+        self.connect_timeout = _env_float("GROQ_CONNECT_TIMEOUT", 10.0)
+        self.max_connections = _env_int("GROQ_MAX_CONNECTIONS", 20)
+        self.max_keepalive_connections = _env_int("GROQ_MAX_KEEPALIVE_CONNECTIONS", 10)
+        self.keepalive_expiry = _env_float("GROQ_KEEPALIVE_EXPIRY", 30.0)
+        self.max_concurrency = _env_int("GROQ_MAX_CONCURRENCY", self.max_connections)
+        self.http2 = _env_bool("GROQ_HTTP2", False) and _http2_available()
+
+        self.cache = cache
+        self.singleflight = SingleFlight()
+        self._client: Optional[httpx.AsyncClient] = None
+        # Semafor powstaje w startup() razem z klientem HTTP (w pętli zdarzeń
+        # aplikacji), a nie przy imporcie modułu - ponowny start (testy,
+        # przeładowanie) dostaje nowy, niezwiązany ze starą pętlą.
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Liczniki użycia puli
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.total_errors = 0
+        self.clients_created = 0
+        self.total_wait_time = 0.0
+
+        if not self.api_key:
+            print("WARNING: GROQ_API_KEY not found. AI features will not work.")
+
+    # --- CYKL ŻYCIA ---
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        self.clients_created += 1
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            },
+            limits=limits,
+            timeout=timeout,
+            http2=self.http2,
+        )
+
+    async def startup(self):
+        """Tworzy współdzielonego klienta HTTP i semafor wywołań. Wywoływane w lifespan aplikacji."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def shutdown(self):
+        """Zamyka klienta HTTP i wszystkie utrzymywane połączenia."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._semaphore = None
+        if self.cache is not None:
+            await self.cache.close()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Fallback dla użycia poza lifespan (np. skrypty, testy) - klient
+        # jest tworzony leniwie i dalej współdzielony.
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Jak client - fallback dla użycia poza lifespan.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    # --- WYWOŁANIA API ---
+
+    def _build_payload(self, messages: list, temperature: float, max_tokens: int, stream: bool = False) -> dict:
+        return {
+            "model": self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "top_p": 1,
+            "stream": stream,
+        }
+
+    async def _acquire(self) -> asyncio.Semaphore:
+        # Zwraca zajęty semafor - zwalniamy ten sam, nawet jeśli w międzyczasie
+        # klient został zrestartowany.
+        semaphore = self.semaphore
+        self.waiting += 1
+        wait_start = time.perf_counter()
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+            waited = time.perf_counter() - wait_start
+            self.total_wait_time += waited
+            GROQ_QUEUE_WAIT.observe(waited)
+        self.in_flight += 1
+        self.total_requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return semaphore
+
+    def _release(self, semaphore: asyncio.Semaphore):
+        self.in_flight -= 1
+        semaphore.release()
+
+    def _record_error(self, mode: str, reason: str):
+        self.total_errors += 1
+        GROQ_ERRORS.labels(mode, reason).inc()
+
+    @staticmethod
+    def _error_detail(response: httpx.Response) -> str:
+        error_detail = f"Groq API error: {response.status_code}"
+        try:
+            error_json = response.json()
+            error_detail += f" - {error_json.get('error', {}).get('message', 'Unknown error')}"
+        except Exception:
+            pass
+        return error_detail
+
+    def cache_key(self, messages: list, temperature: float, max_tokens: int) -> str:
+        return make_cache_key(messages, temperature, max_tokens, self.model)
+
+    async def generate_completion(self, messages: list, temperature: float = 0.7, max_tokens: int = 1000, use_cache: bool = True):
+        """
+        Generuje odpowiedź z Groq API używając modelu Llama 3.
+        Przy use_cache=True identyczny prompt jest obsługiwany z cache, a
+        identyczne równoległe wywołania współdzielą jedno zapytanie do Groq.
+        use_cache=False oznacza świeżą generację - bez cache i bez łączenia.
+        """
+        if not self.api_key:
+            raise HTTPException(status_code=500, detail="AI service not configured")
+
+        if not use_cache:
+            return await self._request_completion(messages, temperature, max_tokens)
+
+        key = self.cache_key(messages, temperature, max_tokens)
+        if self.cache is not None:
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        async def fetch():
+            content = await self._request_completion(messages, temperature, max_tokens)
+            if self.cache is not None:
+                await self.cache.set(key, content)
+            return content
+
+        return await self.singleflight.do(key, fetch)
+
+    async def _request_completion(self, messages: list, temperature: float, max_tokens: int) -> str:
+        semaphore = await self._acquire()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self.client.post(
+                "/chat/completions",
+                json=self._build_payload(messages, temperature, max_tokens),
+            )
+
+            if response.status_code != 200:
+                raise HTTPException(status_code=500, detail=self._error_detail(response))
+
+            result = response.json()
+            content = result["choices"][0]["message"]["content"]
+            outcome = "ok"
+            return content
+
+        except HTTPException:
+            self._record_error("completion", "status")
+            raise
+        except httpx.TimeoutException:
+            self._record_error("completion", "timeout")
+            raise HTTPException(status_code=504, detail="AI service timeout")
+        except Exception as e:
+            self._record_error("completion", "exception")
+            raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
+        finally:
+            self._release(semaphore)
+            GROQ_LATENCY.labels("completion", outcome).observe(time.perf_counter() - start)
+
+    async def stream_completion(self, messages: list, temperature: float = 0.7, max_tokens: int = 1000, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Strumieniuje odpowiedź z Groq API (stream=True) i zwraca kolejne
+        fragmenty tekstu w miarę ich nadchodzenia z upstreamu. Trafienie
+        w cache zwraca całą odpowiedź jako jeden fragment; kompletna
+        odpowiedź ze strumienia jest zapisywana w cache.
+        """
+        if not self.api_key:
+            raise HTTPException(status_code=500, detail="AI service not configured")
+
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = self.cache_key(messages, temperature, max_tokens)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        async for content in self._stream_request(messages, temperature, max_tokens):
+            parts.append(content)
+            yield content
+        if cache_key is not None:
+            await self.cache.set(cache_key, "".join(parts))
+
+    async def _stream_request(self, messages: list, temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        semaphore = await self._acquire()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self.client.stream(
+                "POST",
+                "/chat/completions",
+                json=self._build_payload(messages, temperature, max_tokens, stream=True),
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise HTTPException(status_code=500, detail=self._error_detail(response))
+
+                # Format OpenAI-compatible: linie "data: {...}" zakończone "data: [DONE]"
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    choices = chunk.get("choices") or [{}]
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+            outcome = "ok"
+
+        except HTTPException:
+            self._record_error("stream", "status")
+            raise
+        except httpx.TimeoutException:
+            self._record_error("stream", "timeout")
+            raise HTTPException(status_code=504, detail="AI service timeout")
+        except Exception as e:
+            self._record_error("stream", "exception")
+            raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
+        finally:
+            self._release(semaphore)
+            # Dla strumienia: czas do ostatniego fragmentu (lub przerwania)
+            GROQ_LATENCY.labels("stream", outcome).observe(time.perf_counter() - start)
+
+    # --- STATYSTYKI ---
+
+    def pool_stats(self) -> dict:
+        """Zwraca liczniki użycia puli połączeń i semafora."""
+        return {
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "peak_in_flight": self.peak_in_flight,
+            "total_requests": self.total_requests,
+            "total_errors": self.total_errors,
+            "avg_wait_ms": round(1000 * self.total_wait_time / self.total_requests, 3) if self.total_requests else 0.0,
+            "clients_created": self.clients_created,
+            "client_open": self._client is not None and not self._client.is_closed,
+        }
+
+    def coalescing_stats(self) -> dict:
+        """Zwraca liczniki łączenia identycznych, równoległych wywołań."""
+        return self.singleflight.stats()
+
+    async def cache_stats(self) -> dict:
+        """Zwraca liczniki cache (trafienia, chybienia, wyrzucenia)."""
+        if self.cache is None:
+            return {"backend": "none"}
+        return await self.cache.stats()
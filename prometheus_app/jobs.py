@@ -0,0 +1,196 @@
+# prometheus_app/jobs.py
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rejestr handlerów zadań: rodzaj zadania -> async handler(payload, progress).
+# Handlery rejestruje prometheus_app.main, dzięki czemu worker Celery
+# wykonuje dokładnie ten sam kod co endpointy synchroniczne.
+JobHandler = Callable[[dict, Callable[[int, int], Awaitable[None]]], Awaitable[Any]]
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def register_job(kind: str):
+    def decorator(handler: JobHandler) -> JobHandler:
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# --- MAGAZYN STANU ZADAŃ ---
+
+class MemoryJobStore:
+    """Stan zadań w pamięci procesu (dev, testy, pojedynczy worker)."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._jobs: Dict[str, tuple[float, dict]] = {}
+
+    def _purge(self):
+        now = time.monotonic()
+        for job_id in [job_id for job_id, (expires_at, _) in self._jobs.items() if expires_at <= now]:
+            del self._jobs[job_id]
+
+    async def save(self, job: dict):
+        self._purge()
+        self._jobs[job["id"]] = (time.monotonic() + self.ttl, job)
+
+    async def load(self, job_id: str) -> Optional[dict]:
+        self._purge()
+        entry = self._jobs.get(job_id)
+        return dict(entry[1]) if entry else None
+
+    async def close(self):
+        pass
+
+
+class RedisJobStore:
+    """Stan zadań w Redis - współdzielony przez API i workery Celery."""
+
+    def __init__(self, url: str, ttl: float):
+        import redis.asyncio as redis_asyncio
+
+        self.ttl = ttl
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"prometheus:job:{job_id}"
+
+    async def save(self, job: dict):
+        await self._redis.set(self._key(job["id"]), json.dumps(job, ensure_ascii=False), ex=int(self.ttl))
+
+    async def load(self, job_id: str) -> Optional[dict]:
+        raw = await self._redis.get(self._key(job_id))
+        return json.loads(raw) if raw else None
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+# --- DYSPOZYTORZY ---
+
+class LocalDispatcher:
+    """
+    Wykonuje zadania jako zadania asyncio w procesie API (stand-in dla
+    brokera). Semafor ogranicza liczbę równolegle wykonywanych zadań.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._semaphore = asyncio.Semaphore(workers)
+        self._tasks: set = set()
+
+    async def dispatch(self, queue: "JobQueue", job_id: str):
+        async def run():
+            async with self._semaphore:
+                await queue.execute(job_id)
+
+        task = asyncio.ensure_future(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+
+
+class CeleryDispatcher:
+    """Przekazuje zadania do workera Celery (prometheus_app.worker) przez brokera."""
+
+    async def dispatch(self, queue: "JobQueue", job_id: str):
+        from .worker import celery_app
+
+        # send_task jest blokujące (publikacja do brokera) - poza pętlą zdarzeń.
+        await asyncio.to_thread(celery_app.send_task, "prometheus_app.worker.run_job", args=[job_id])
+
+    async def close(self):
+        pass
+
+
+# --- KOLEJKA ---
+
+class JobQueue:
+    """Tryb submit-and-poll: submit() zwraca od razu ID zadania, a stan i wynik są dostępne przez get()."""
+
+    def __init__(self, store, dispatcher, ttl: float):
+        self.store = store
+        self.dispatcher = dispatcher
+        self.ttl = ttl
+
+    async def submit(self, kind: str, payload: dict) -> dict:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = {
+            "id": secrets.token_hex(16),
+            "kind": kind,
+            "status": "queued",
+            "progress": {"done": 0, "total": 1},
+            "payload": payload,
+            "result": None,
+            "error": None,
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+        await self.store.save(job)
+        await self.dispatcher.dispatch(self, job["id"])
+        return job
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        return await self.store.load(job_id)
+
+    async def execute(self, job_id: str):
+        """Wykonuje zadanie (w procesie API albo w workerze Celery) i zapisuje wynik."""
+        job = await self.store.load(job_id)
+        if job is None:
+            logger.warning(f"Job {job_id} expired or not found before execution")
+            return
+        job.update(status="running", updated_at=_now())
+        await self.store.save(job)
+
+        async def progress(done: int, total: int):
+            job.update(progress={"done": done, "total": total}, updated_at=_now())
+            await self.store.save(job)
+
+        try:
+            result = await JOB_HANDLERS[job["kind"]](job["payload"], progress)
+            job.update(status="succeeded", result=result)
+            job["progress"]["done"] = job["progress"]["total"]
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job['kind']}) failed: {e}")
+            job.update(status="failed", error=str(getattr(e, "detail", None) or e))
+        job["updated_at"] = _now()
+        await self.store.save(job)
+
+    async def close(self):
+        await self.dispatcher.close()
+        await self.store.close()
+
+
+def build_job_queue() -> JobQueue:
+    """
+    Tworzy kolejkę zadań na podstawie zmiennych środowiskowych:
+    PROMETHEUS_JOB_BACKEND (memory | celery), PROMETHEUS_JOB_TTL (retencja
+    wyników w sekundach), PROMETHEUS_JOB_WORKERS (dla trybu memory) oraz
+    REDIS_URL (magazyn stanu w trybie celery).
+    """
+    backend = os.getenv("PROMETHEUS_JOB_BACKEND", "memory").strip().lower()
+    ttl = float(os.getenv("PROMETHEUS_JOB_TTL", 86400))
+
+    if backend == "celery":
+        store = RedisJobStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"), ttl=ttl)
+        return JobQueue(store, CeleryDispatcher(), ttl=ttl)
+
+    workers = int(os.getenv("PROMETHEUS_JOB_WORKERS", 4))
+    return JobQueue(MemoryJobStore(ttl=ttl), LocalDispatcher(workers), ttl=ttl)
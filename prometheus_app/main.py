@@ -1,18 +1,43 @@
 # prometheus_app/main.py
-import httpx
 import os
 import asyncio
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import json
 from datetime import datetime
+from prometheus_client import Gauge
+
+from common.metrics import MetricsMiddleware, metrics_response
+from .cache import build_cache
+from .groq_client import GroqClient
+from .jobs import build_job_queue, register_job
+from .ratelimit import RateLimitHeadersMiddleware, enforce_rate_limit, limits, rate_limited, rate_limiter
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Tworzy jednego, długo żyjącego klienta HTTP dla Groq przy starcie
+    i zamyka jego pulę połączeń przy wyłączaniu serwisu.
+    """
+    await groq.startup()
+    yield
+    await jobs.close()
+    await groq.shutdown()
+    if rate_limiter is not None:
+        await rate_limiter.close()
 
 app = FastAPI(
     title="Prometheus AI Service",
     description="AI-powered content generation for HardbanRecords Lab",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
+app.add_middleware(MetricsMiddleware)
+# Nagłówki RateLimit-* dla endpointów AI (limity: prometheus_app/ratelimit.py)
+app.add_middleware(RateLimitHeadersMiddleware)
 
 # --- PYDANTIC SCHEMAS ---
 
@@ -45,6 +70,43 @@ class DescriptionResponse(BaseModel):
     hashtags: list[str]
     generated_by: str
 
+class BatchDescriptionRequest(BaseModel):
+    items: List[DescriptionRequest]
+    concurrency: Optional[int] = None  # domyślnie PROMETHEUS_BATCH_CONCURRENCY
+
+class BatchDescriptionItem(BaseModel):
+    index: int
+    ok: bool
+    result: Optional[DescriptionResponse] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+
+class BatchDescriptionResponse(BaseModel):
+    results: List[BatchDescriptionItem]
+    total: int
+    succeeded: int
+    failed: int
+    generation_time: str
+
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+class JobProgress(BaseModel):
+    done: int
+    total: int
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str  # queued, running, succeeded, failed
+    progress: JobProgress
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
 class AnalyzeRequest(BaseModel):
     text: str
     analysis_type: str = "sentiment"  # sentiment, genre, themes
@@ -55,71 +117,20 @@ class AnalysisResponse(BaseModel):
     confidence: float
     suggestions: list[str]
 
-# --- GROQ AI CLIENT ---
+# Initialize Groq client (współdzielony klient HTTP tworzony w lifespan)
+groq = GroqClient(cache=build_cache())
 
-class GroqClient:
-    def __init__(self):
-        self.api_key = os.getenv("GROQ_API_KEY")
-        self.base_url = "https://api.groq.com/openai/v1"
-        
-        if not self.api_key:
-            print("WARNING: GROQ_API_KEY not found. AI features will not work.")
-    
-    async def generate_completion(self, messages: list, temperature: float = 0.7, max_tokens: int = 1000):
-        """
-        Generuje odpowiedź z Groq API używając modelu Llama 3.
-        """
-        if not self.api_key:
-            raise HTTPException(status_code=500, detail="AI service not configured")
-        
-        try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": "llama3-8b-8192",  # Szybki model Llama 3
-                        "messages": messages,
-                        "temperature": temperature,
-                        "max_tokens": max_tokens,
-                        "top_p": 1,
-                        "stream": False
-                    }
-                )
-                
-                if response.status_code != 200:
-                    error_detail = f"Groq API error: {response.status_code}"
-                    try:
-                        error_json = response.json()
-                        error_detail += f" - {error_json.get('error', {}).get('message', 'Unknown error')}"
-                    except:
-                        pass
-                    raise HTTPException(status_code=500, detail=error_detail)
-                
-                result = response.json()
-                return result["choices"][0]["message"]["content"]
-                
-        except httpx.TimeoutException:
-            raise HTTPException(status_code=504, detail="AI service timeout")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"AI generation failed: {str(e)}")
+# Kolejka zadań AI (submit-and-poll): w procesie API albo przez Celery
+jobs = build_job_queue()
 
-# Initialize Groq client
-groq = GroqClient()
+# Stan klienta Groq odczytywany przy scrape'ie /metrics (bez kosztu na żądanie)
+Gauge("groq_in_flight_requests", "Groq calls currently in progress").set_function(lambda: groq.in_flight)
+Gauge("groq_waiting_requests", "Groq calls waiting for a concurrency slot").set_function(lambda: groq.waiting)
 
 # --- ENDPOINTS ---
 
-@app.post("/generate/lyrics", response_model=LyricsResponse)
-async def generate_lyrics(request: LyricsRequest):
-    """
-    Generuje tekst piosenki używając AI na podstawie gatunku, tematu i nastroju.
-    """
-    start_time = datetime.now()
-    
-    # Przygotuj prompt dla AI
+def build_lyrics_messages(request: LyricsRequest) -> list:
+    """Buduje prompt (system + user) dla generowania tekstu piosenki."""
     length_instruction = {
         "short": "Napisz krótki tekst (1 zwrotka + refren)",
         "standard": "Napisz pełny tekst (2-3 zwrotki + refren + bridge)",
@@ -145,15 +156,13 @@ ZASADY:
 Oznacz wyraźnie części piosenki (np. [Zwrotka 1], [Refren], [Zwrotka 2], [Bridge]).
 """
 
-    messages = [
+    return [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt}
     ]
-    
-    # Generuj z AI
-    lyrics = await groq.generate_completion(messages, temperature=0.8, max_tokens=1500)
-    
-    # Policz słowa
+
+def build_lyrics_response(request: LyricsRequest, lyrics: str, start_time: datetime) -> LyricsResponse:
+    """Składa odpowiedź z wygenerowanego tekstu (liczba słów, czas generowania)."""
     word_count = len(lyrics.split())
     generation_time = (datetime.now() - start_time).total_seconds()
     
@@ -166,11 +175,25 @@ Oznacz wyraźnie części piosenki (np. [Zwrotka 1], [Refren], [Zwrotka 2], [Bri
         word_count=word_count
     )
 
-@app.post("/generate/description", response_model=DescriptionResponse)
-async def generate_description(request: DescriptionRequest):
+@app.post("/generate/lyrics", response_model=LyricsResponse, dependencies=[Depends(rate_limited("lyrics"))])
+async def generate_lyrics(request: LyricsRequest, cache: bool = True):
     """
-    Generuje opisy marketingowe dla utworu muzycznego.
+    Generuje tekst piosenki używając AI na podstawie gatunku, tematu i nastroju.
+    Parametr ?cache=false wymusza nową, niecache'owaną generację.
     """
+    return await write_lyrics(request, use_cache=cache)
+
+async def write_lyrics(request: LyricsRequest, use_cache: bool = True) -> LyricsResponse:
+    """Generuje tekst piosenki (wspólne dla endpointu i kolejki zadań)."""
+    start_time = datetime.now()
+    
+    # Generuj z AI
+    lyrics = await groq.generate_completion(build_lyrics_messages(request), temperature=0.8, max_tokens=1500, use_cache=use_cache)
+    
+    return build_lyrics_response(request, lyrics, start_time)
+
+def build_description_messages(request: DescriptionRequest) -> list:
+    """Buduje prompt (system + user) dla generowania opisów marketingowych."""
     mood_text = f" o nastroju {request.mood}" if request.mood else ""
     
     system_prompt = f"""Jesteś ekspertem od marketingu muzycznego. Tworzysz angażujące opisy utworów muzycznych dla różnych platform.
@@ -198,13 +221,13 @@ Zwróć odpowiedź w formacie JSON:
   "hashtags": ["#tag1", "#tag2", ...]
 }}"""
 
-    messages = [
+    return [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt}
     ]
-    
-    response_text = await groq.generate_completion(messages, temperature=0.7, max_tokens=800)
-    
+
+def parse_description_response(request: DescriptionRequest, response_text: str) -> DescriptionResponse:
+    """Parsuje odpowiedź AI (JSON, opcjonalnie w bloku ```json```) do DescriptionResponse."""
     # Próbuj sparsować JSON z odpowiedzi AI
     try:
         # Wyciągnij JSON z odpowiedzi (może być w ```json``` bloku)
@@ -235,11 +258,204 @@ Zwróć odpowiedź w formacie JSON:
             generated_by="groq-llama3-8b"
         )
 
-@app.post("/analyze/text", response_model=AnalysisResponse)
-async def analyze_text(request: AnalyzeRequest):
+async def describe(request: DescriptionRequest, use_cache: bool = True) -> DescriptionResponse:
+    """Generuje i parsuje opisy dla jednego utworu (wspólne dla pojedynczego i batcha)."""
+    response_text = await groq.generate_completion(build_description_messages(request), temperature=0.7, max_tokens=800, use_cache=use_cache)
+    return parse_description_response(request, response_text)
+
+@app.post("/generate/description", response_model=DescriptionResponse, dependencies=[Depends(rate_limited("description"))])
+async def generate_description(request: DescriptionRequest, cache: bool = True):
+    """
+    Generuje opisy marketingowe dla utworu muzycznego.
+    Parametr ?cache=false wymusza nową, niecache'owaną generację.
+    """
+    return await describe(request, use_cache=cache)
+
+# --- BATCH ---
+
+BATCH_MAX_ITEMS = int(os.getenv("PROMETHEUS_BATCH_MAX_ITEMS", 500))
+BATCH_CONCURRENCY = int(os.getenv("PROMETHEUS_BATCH_CONCURRENCY", 8))
+
+async def describe_batch_item(index: int, item: DescriptionRequest, semaphore: asyncio.Semaphore, use_cache: bool) -> BatchDescriptionItem:
+    """Generuje opis dla jednej pozycji batcha; błąd jest raportowany per pozycja."""
+    async with semaphore:
+        try:
+            result = await describe(item, use_cache=use_cache)
+            return BatchDescriptionItem(index=index, ok=True, result=result)
+        except HTTPException as e:
+            return BatchDescriptionItem(index=index, ok=False, error=str(e.detail), status_code=e.status_code)
+        except Exception as e:
+            return BatchDescriptionItem(index=index, ok=False, error=str(e), status_code=500)
+
+async def check_batch(request: BatchDescriptionRequest, http_request: Request):
+    """
+    Walidacja batcha przed pobraniem tokenów z limitu: odrzucone żądanie
+    (brak konfiguracji AI, za duży batch) nie zużywa limitu klienta.
+    """
+    if not groq.api_key:
+        raise HTTPException(status_code=500, detail="AI service not configured")
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {BATCH_MAX_ITEMS} items)")
+    # Każda pozycja to osobne wywołanie Groq - tyle tokenów pobiera batch.
+    await enforce_rate_limit(http_request, "description", cost=len(request.items))
+
+def batch_concurrency(request: BatchDescriptionRequest) -> int:
+    # Limit nie może przekroczyć semafora klienta Groq - nadmiar i tak by czekał.
+    concurrency = request.concurrency or BATCH_CONCURRENCY
+    return max(1, min(concurrency, groq.max_concurrency, len(request.items) or 1))
+
+async def stream_batch(request: BatchDescriptionRequest, use_cache: bool):
+    """
+    Zwraca wyniki jako NDJSON w kolejności ukończenia (każda linia z 'index'
+    pozycji wejściowej), a na końcu linię podsumowania.
+    """
+    start_time = datetime.now()
+    semaphore = asyncio.Semaphore(batch_concurrency(request))
+    tasks = [
+        asyncio.ensure_future(describe_batch_item(index, item, semaphore, use_cache))
+        for index, item in enumerate(request.items)
+    ]
+    succeeded = 0
+    try:
+        for finished in asyncio.as_completed(tasks):
+            item = await finished
+            succeeded += item.ok
+            yield item.model_dump_json() + "\n"
+    finally:
+        # Klient zerwał połączenie - nie generujemy dalej niepotrzebnie.
+        for task in tasks:
+            task.cancel()
+    generation_time = (datetime.now() - start_time).total_seconds()
+    summary = {
+        "summary": True,
+        "total": len(tasks),
+        "succeeded": succeeded,
+        "failed": len(tasks) - succeeded,
+        "generation_time": f"{generation_time:.2f}s"
+    }
+    yield json.dumps(summary) + "\n"
+
+@app.post("/generate/description/batch", response_model=BatchDescriptionResponse)
+async def generate_description_batch(request: BatchDescriptionRequest, http_request: Request, cache: bool = True, stream: bool = False):
+    """
+    Generuje opisy marketingowe dla wielu utworów naraz (np. cały katalog).
+    Pozycje są przetwarzane równolegle z ograniczoną współbieżnością; wyniki
+    wracają w kolejności wejściowej, z błędami raportowanymi per pozycja.
+    Parametr ?stream=true zwraca NDJSON w kolejności ukończenia: każda linia
+    to BatchDescriptionItem z polem 'index' (pozycja w 'items' żądania), po
+    którym klient przypisuje wynik do wejścia; ostatnia linia to
+    podsumowanie {"summary": true, "total", "succeeded", "failed",
+    "generation_time"} bez pola 'index'.
+    """
+    await check_batch(request, http_request)
+    
+    if stream:
+        return StreamingResponse(stream_batch(request, cache), media_type="application/x-ndjson")
+    
+    return await run_batch(request, use_cache=cache)
+
+async def run_batch(request: BatchDescriptionRequest, use_cache: bool = True, progress=None) -> BatchDescriptionResponse:
+    """
+    Przetwarza cały batch i zwraca wyniki w kolejności wejściowej.
+    Opcjonalny callback progress(done, total) jest wywoływany po każdej pozycji.
+    """
+    start_time = datetime.now()
+    semaphore = asyncio.Semaphore(batch_concurrency(request))
+    tasks = [
+        asyncio.ensure_future(describe_batch_item(index, item, semaphore, use_cache))
+        for index, item in enumerate(request.items)
+    ]
+    done = 0
+    for finished in asyncio.as_completed(tasks):
+        await finished
+        done += 1
+        if progress is not None:
+            await progress(done, len(tasks))
+    results = [task.result() for task in tasks]
+    succeeded = sum(1 for item in results if item.ok)
+    generation_time = (datetime.now() - start_time).total_seconds()
+    
+    return BatchDescriptionResponse(
+        results=results,
+        total=len(results),
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        generation_time=f"{generation_time:.2f}s"
+    )
+
+# --- STREAMING (SSE) ---
+
+def sse_event(event: str, data: dict) -> str:
+    """Formatuje pojedyncze zdarzenie Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # wyłącza buforowanie odpowiedzi na proxy (nginx/Render)
+}
+
+async def stream_tokens(messages: list, temperature: float, max_tokens: int, on_complete, use_cache: bool = True):
+    """
+    Przekazuje tokeny z Groq jako zdarzenia 'token', a na końcu wysyła
+    zdarzenie 'done' z podsumowaniem zbudowanym przez on_complete(full_text).
+    Błędy po rozpoczęciu strumienia są zgłaszane jako zdarzenie 'error'.
+    """
+    parts = []
+    try:
+        async for content in groq.stream_completion(messages, temperature=temperature, max_tokens=max_tokens, use_cache=use_cache):
+            parts.append(content)
+            yield sse_event("token", {"content": content})
+    except HTTPException as e:
+        yield sse_event("error", {"status_code": e.status_code, "detail": e.detail})
+        return
+    yield sse_event("done", on_complete("".join(parts)).model_dump())
+
+@app.post("/generate/lyrics/stream", dependencies=[Depends(rate_limited("lyrics"))])
+async def generate_lyrics_stream(request: LyricsRequest, cache: bool = True):
+    """
+    Strumieniowa wersja /generate/lyrics - tokeny są wysyłane jako SSE
+    w miarę generowania, a ostatnie zdarzenie 'done' zawiera pola LyricsResponse.
+    """
+    if not groq.api_key:
+        raise HTTPException(status_code=500, detail="AI service not configured")
+    
+    start_time = datetime.now()
+    events = stream_tokens(
+        build_lyrics_messages(request),
+        temperature=0.8,
+        max_tokens=1500,
+        on_complete=lambda lyrics: build_lyrics_response(request, lyrics, start_time),
+        use_cache=cache
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/generate/description/stream", dependencies=[Depends(rate_limited("description"))])
+async def generate_description_stream(request: DescriptionRequest, cache: bool = True):
+    """
+    Strumieniowa wersja /generate/description - tokeny są wysyłane jako SSE,
+    a ostatnie zdarzenie 'done' zawiera sparsowany DescriptionResponse.
+    """
+    if not groq.api_key:
+        raise HTTPException(status_code=500, detail="AI service not configured")
+    
+    events = stream_tokens(
+        build_description_messages(request),
+        temperature=0.7,
+        max_tokens=800,
+        on_complete=lambda text: parse_description_response(request, text),
+        use_cache=cache
+    )
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.post("/analyze/text", response_model=AnalysisResponse, dependencies=[Depends(rate_limited("analysis"))])
+async def analyze_text(request: AnalyzeRequest, cache: bool = True):
     """
     Analizuje tekst pod kątem sentymentu, gatunku, lub tematyki.
     """
+    return await analyze(request, use_cache=cache)
+
+async def analyze(request: AnalyzeRequest, use_cache: bool = True) -> AnalysisResponse:
+    """Wykonuje analizę tekstu (wspólne dla endpointu i kolejki zadań)."""
     analysis_prompts = {
         "sentiment": "Przeanalizuj sentiment tego tekstu. Określ czy jest pozytywny, negatywny, czy neutralny. Podaj procent pewności i główne powody.",
         "genre": "Określ gatunek muzyczny na podstawie tego tekstu piosenki. Wskaż główny gatunek i 2-3 potencjalne podgatunki.",
@@ -260,7 +476,7 @@ Zwróć odpowiedź w formacie JSON z polami: analysis, confidence (0.0-1.0), sug
         {"role": "user", "content": user_prompt}
     ]
     
-    response_text = await groq.generate_completion(messages, temperature=0.3, max_tokens=600)
+    response_text = await groq.generate_completion(messages, temperature=0.3, max_tokens=600, use_cache=use_cache)
     
     # Próbuj wyciągnąć strukturalne dane z odpowiedzi
     try:
@@ -289,6 +505,85 @@ Zwróć odpowiedź w formacie JSON z polami: analysis, confidence (0.0-1.0), sug
             suggestions=["Analiza dostępna w formacie tekstowym"]
         )
 
+# --- KOLEJKA ZADAŃ (SUBMIT-AND-POLL) ---
+
+@register_job("lyrics")
+async def lyrics_job(payload: dict, progress) -> dict:
+    response = await write_lyrics(LyricsRequest(**payload["request"]), use_cache=payload["cache"])
+    return response.model_dump()
+
+@register_job("description")
+async def description_job(payload: dict, progress) -> dict:
+    response = await describe(DescriptionRequest(**payload["request"]), use_cache=payload["cache"])
+    return response.model_dump()
+
+@register_job("description_batch")
+async def description_batch_job(payload: dict, progress) -> dict:
+    response = await run_batch(BatchDescriptionRequest(**payload["request"]), use_cache=payload["cache"], progress=progress)
+    return response.model_dump()
+
+@register_job("analysis")
+async def analysis_job(payload: dict, progress) -> dict:
+    response = await analyze(AnalyzeRequest(**payload["request"]), use_cache=payload["cache"])
+    return response.model_dump()
+
+async def submit_job(kind: str, request: BaseModel, cache: bool) -> JobSubmitted:
+    if not groq.api_key:
+        raise HTTPException(status_code=500, detail="AI service not configured")
+    job = await jobs.submit(kind, {"request": request.model_dump(), "cache": cache})
+    return JobSubmitted(job_id=job["id"], status=job["status"], status_url=f"/jobs/{job['id']}")
+
+@app.post("/jobs/lyrics", response_model=JobSubmitted, status_code=202, dependencies=[Depends(rate_limited("lyrics"))])
+async def submit_lyrics_job(request: LyricsRequest, cache: bool = True):
+    """
+    Zleca generowanie tekstu piosenki w tle i od razu zwraca ID zadania.
+    Wynik jest dostępny pod GET /jobs/{job_id}.
+    """
+    return await submit_job("lyrics", request, cache)
+
+@app.post("/jobs/description", response_model=JobSubmitted, status_code=202, dependencies=[Depends(rate_limited("description"))])
+async def submit_description_job(request: DescriptionRequest, cache: bool = True):
+    """
+    Zleca generowanie opisów marketingowych w tle.
+    """
+    return await submit_job("description", request, cache)
+
+@app.post("/jobs/description/batch", response_model=JobSubmitted, status_code=202)
+async def submit_description_batch_job(request: BatchDescriptionRequest, http_request: Request, cache: bool = True):
+    """
+    Zleca generowanie opisów dla całego batcha w tle; postęp (done/total)
+    jest aktualizowany po każdej pozycji.
+    """
+    await check_batch(request, http_request)
+    return await submit_job("description_batch", request, cache)
+
+@app.post("/jobs/analyze", response_model=JobSubmitted, status_code=202, dependencies=[Depends(rate_limited("analysis"))])
+async def submit_analysis_job(request: AnalyzeRequest, cache: bool = True):
+    """
+    Zleca analizę tekstu w tle.
+    """
+    return await submit_job("analysis", request, cache)
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """
+    Zwraca status, postęp i wynik zadania. Wyniki są przechowywane
+    przez PROMETHEUS_JOB_TTL sekund od ostatniej aktualizacji.
+    """
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+async def rate_limit_stats() -> dict:
+    if rate_limiter is None:
+        return {"backend": "none"}
+    configured = {
+        name: None if limit is None else {"per_second": round(limit.rate, 4), "burst": limit.burst}
+        for name, limit in limits.items()
+    }
+    return {**await rate_limiter.stats(), "limits": configured}
+
 @app.get("/ai/status")
 async def ai_status():
     """
@@ -298,8 +593,12 @@ async def ai_status():
         "service": "prometheus-ai",
         "status": "running",
         "ai_provider": "groq",
-        "model": "llama3-8b-8192",
+        "model": groq.model,
         "api_key_configured": bool(groq.api_key),
+        "pool": groq.pool_stats(),
+        "cache": await groq.cache_stats(),
+        "coalescing": groq.coalescing_stats(),
+        "rate_limits": await rate_limit_stats(),
         "features": [
             "lyrics_generation",
             "description_generation", 
@@ -311,7 +610,7 @@ async def ai_status():
     if groq.api_key:
         try:
             test_messages = [{"role": "user", "content": "Odpowiedz 'OK' jeśli działasz."}]
-            test_response = await groq.generate_completion(test_messages, max_tokens=10)
+            test_response = await groq.generate_completion(test_messages, max_tokens=10, use_cache=False)
             status["ai_test"] = "passed"
             status["ai_response"] = test_response.strip()
         except Exception as e:
@@ -322,6 +621,35 @@ async def ai_status():
     
     return status
 
+@app.get("/ai/pool")
+async def ai_pool():
+    """
+    Zwraca liczniki użycia puli połączeń do Groq (do doboru limitów).
+    """
+    return groq.pool_stats()
+
+@app.get("/ai/cache")
+async def ai_cache():
+    """
+    Zwraca liczniki cache odpowiedzi AI (trafienia, chybienia, wyrzucenia).
+    """
+    return await groq.cache_stats()
+
+@app.get("/ai/coalescing")
+async def ai_coalescing():
+    """
+    Zwraca liczniki łączenia identycznych, równoległych zapytań do AI.
+    """
+    return groq.coalescing_stats()
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Metryki w formacie Prometheus: opóźnienia per trasa, opóźnienia
+    i błędy wywołań Groq, oczekiwanie na slot współbieżności.
+    """
+    return metrics_response()
+
 @app.get("/")
 def root():
     """
@@ -333,9 +661,17 @@ def root():
         "description": "AI-powered content generation for HardbanRecords Lab",
         "endpoints": {
             "lyrics": "/generate/lyrics",
+            "lyrics_stream": "/generate/lyrics/stream",
             "descriptions": "/generate/description",
+            "descriptions_stream": "/generate/description/stream",
+            "descriptions_batch": "/generate/description/batch",
             "analysis": "/analyze/text",
+            "jobs": "/jobs/{job_id}",
             "status": "/ai/status",
+            "pool": "/ai/pool",
+            "cache": "/ai/cache",
+            "coalescing": "/ai/coalescing",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
\ No newline at end of file
@@ -0,0 +1,373 @@
+# prometheus_app/ratelimit.py
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from jose import JWTError, jwt
+from prometheus_client import Counter
+
+from common.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Limity zapytań do AI (token bucket): każdy użytkownik ma osobny kubełek
+# per endpoint, a wszystkie wywołania dzielą kubełek globalny chroniący
+# wspólny limit Groq. Żądanie przechodzi tylko wtedy, gdy oba kubełki mają
+# wystarczająco tokenów - odmowa nie zużywa żadnego z nich.
+
+RATE_LIMITED = Counter("ai_rate_limited_total", "AI requests rejected by rate limiting", ["limit", "scope"])
+
+# Domyślne limity: "<liczba>/<okres>[:<burst>]", okres: s | min | h.
+# Nadpisywane przez PROMETHEUS_RATE_LIMIT_<NAZWA>; "off" wyłącza limit.
+DEFAULT_LIMITS = {
+    "lyrics": "10/min",
+    "description": "30/min",
+    "analysis": "30/min",
+    "global": "300/min",
+}
+
+PERIODS = {"s": 1.0, "sec": 1.0, "min": 60.0, "h": 3600.0}
+
+GLOBAL_BUCKET = "prometheus:ratelimit:global"
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float  # tokeny na sekundę
+    burst: int   # pojemność kubełka
+
+
+def parse_limit(spec: str) -> Optional[Limit]:
+    """'20/min' -> Limit(rate=20/60, burst=20); '20/min:5' -> burst 5; 'off' -> None."""
+    spec = spec.strip().lower()
+    if spec in ("", "0", "off", "none"):
+        return None
+    spec, _, burst = spec.partition(":")
+    count, _, period = spec.partition("/")
+    count = float(count)
+    return Limit(rate=count / PERIODS[period or "s"], burst=int(burst) if burst else max(1, math.ceil(count)))
+
+
+def load_limits() -> Dict[str, Optional[Limit]]:
+    return {
+        name: parse_limit(os.getenv(f"PROMETHEUS_RATE_LIMIT_{name.upper()}", default))
+        for name, default in DEFAULT_LIMITS.items()
+    }
+
+
+@dataclass
+class Decision:
+    allowed: bool
+    limit: int                # burst kubełka użytkownika
+    remaining: int            # tokeny pozostałe w kubełku użytkownika
+    reset: float              # sekundy do pełnego kubełka użytkownika
+    retry_after: float = 0.0  # sekundy do możliwego ponowienia (przy odmowie)
+    scope: str = "user"       # kubełek, który odmówił (user | global)
+
+    def headers(self) -> Dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def _decision(allowed: bool, buckets: list, tokens: list, cost: float) -> Decision:
+    """Decyzja z punktu widzenia pierwszego kubełka (użytkownika)."""
+    _, limit = buckets[0]
+    waits = [
+        ((cost - available) / bucket_limit.rate, index)
+        for index, ((_, bucket_limit), available) in enumerate(zip(buckets, tokens))
+        if available < cost
+    ]
+    retry_after, blocking = max(waits) if waits else (0.0, 0)
+    return Decision(
+        allowed=allowed,
+        limit=limit.burst,
+        remaining=max(0, math.floor(tokens[0])),
+        reset=(limit.burst - tokens[0]) / limit.rate,
+        retry_after=retry_after,
+        scope="global" if buckets[blocking][0] == GLOBAL_BUCKET else "user",
+    )
+
+
+class MemoryRateLimiter:
+    """
+    Kubełki w pamięci procesu (jeden worker). Sprawdzenie to kilka operacji
+    arytmetycznych na słowniku - bez blokad, bo wywoływane jest wyłącznie
+    z pętli zdarzeń. Najdawniej używane kubełki są wyrzucane powyżej max_keys.
+    """
+
+    backend = "memory"
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    async def acquire(self, buckets: List[Tuple[str, Limit]], cost: int = 1) -> Decision:
+        now = time.monotonic()
+        tokens = []
+        for key, limit in buckets:
+            state = self._buckets.get(key)
+            if state is None:
+                tokens.append(float(limit.burst))
+            else:
+                available, updated = state
+                tokens.append(min(limit.burst, available + (now - updated) * limit.rate))
+
+        allowed = all(available >= cost for available in tokens)
+        if allowed:
+            tokens = [available - cost for available in tokens]
+            for (key, _), available in zip(buckets, tokens):
+                self._buckets[key] = (available, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        return _decision(allowed, buckets, tokens, cost)
+
+    async def close(self):
+        pass
+
+    async def stats(self) -> dict:
+        return {"backend": self.backend, "keys": len(self._buckets), "allowed": self.allowed, "rejected": self.rejected}
+
+
+# Wszystkie kubełki żądania są sprawdzane i pobierane atomowo w jednym
+# skrypcie. Czas pochodzi z Redis (TIME), więc zegary workerów nie muszą
+# być zsynchronizowane. Redis obcina liczby zmiennoprzecinkowe w odpowiedzi,
+# dlatego tokeny wracają w tysięcznych częściach.
+TOKEN_BUCKET_LUA = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local tokens = {}
+local allowed = 1
+for i = 1, #KEYS do
+    local rate = tonumber(ARGV[2 * i])
+    local burst = tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'updated')
+    local available = tonumber(state[1])
+    if available == nil then
+        available = burst
+    else
+        available = math.min(burst, available + (now - tonumber(state[2])) * rate)
+    end
+    tokens[i] = available
+    if available < cost then
+        allowed = 0
+    end
+end
+local result = {allowed}
+for i = 1, #KEYS do
+    if allowed == 1 then
+        local rate = tonumber(ARGV[2 * i])
+        local burst = tonumber(ARGV[2 * i + 1])
+        tokens[i] = tokens[i] - cost
+        redis.call('HSET', KEYS[i], 'tokens', tostring(tokens[i]), 'updated', tostring(now))
+        redis.call('PEXPIRE', KEYS[i], math.ceil(burst / rate * 1000) + 1000)
+    end
+    result[i + 1] = math.floor(tokens[i] * 1000)
+end
+return result
+"""
+
+
+class RedisRateLimiter:
+    """
+    Kubełki w Redis, wspólne dla wielu workerów i instancji. Jedno
+    sprawdzenie to jedno EVALSHA. Błędy Redis przepuszczają żądanie
+    (fail open) - limiter nigdy nie blokuje generowania z własnej winy.
+    """
+
+    backend = "redis"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis_asyncio
+
+        self.url = url
+        self._redis = redis_asyncio.from_url(url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_LUA)
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    async def acquire(self, buckets: List[Tuple[str, Limit]], cost: int = 1) -> Decision:
+        args = [cost]
+        for _, limit in buckets:
+            args += [limit.rate, limit.burst]
+        try:
+            result = await self._script(keys=[key for key, _ in buckets], args=args)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis rate limit check failed, allowing request: {e}")
+            _, limit = buckets[0]
+            return Decision(allowed=True, limit=limit.burst, remaining=limit.burst, reset=0.0)
+        allowed = bool(result[0])
+        self.allowed += allowed
+        self.rejected += not allowed
+        return _decision(allowed, buckets, [value / 1000 for value in result[1:]], cost)
+
+    async def close(self):
+        await self._redis.aclose()
+
+    async def stats(self) -> dict:
+        return {"backend": self.backend, "allowed": self.allowed, "rejected": self.rejected, "errors": self.errors}
+
+
+def build_rate_limiter():
+    """
+    Tworzy limiter na podstawie zmiennych środowiskowych:
+    PROMETHEUS_RATE_LIMIT_BACKEND (memory | redis | none), REDIS_URL dla
+    backendu redis, PROMETHEUS_RATE_LIMIT_MAX_KEYS dla backendu memory.
+    """
+    backend = os.getenv("PROMETHEUS_RATE_LIMIT_BACKEND", "memory").strip().lower()
+    if backend == "none":
+        return None
+    if backend == "redis":
+        try:
+            return RedisRateLimiter(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+        except ImportError:
+            logger.warning("Package 'redis' not installed, falling back to in-memory rate limiting.")
+    return MemoryRateLimiter(max_keys=int(os.getenv("PROMETHEUS_RATE_LIMIT_MAX_KEYS", 100_000)))
+
+
+# --- TOŻSAMOŚĆ KLIENTA ---
+# Użytkownik jest rozpoznawany po tokenie JWT wystawionym przez API
+# (ten sam SECRET_KEY); bez ważnego tokena - po adresie IP klienta.
+# Zweryfikowane tokeny są pamiętane, więc HMAC liczymy raz na token.
+#
+# Za proxy Render scope["client"] to adres proxy - bez X-Forwarded-For
+# wszyscy anonimowi klienci dzieliliby jeden kubełek. Adres klienta to wpis
+# dopisany przez nasze proxy: PROXY_HOPS-ty od końca nagłówka (wcześniejsze
+# wpisy ustawia sam klient i można je podrobić). Bez proxy przed serwisem:
+# PROMETHEUS_RATE_LIMIT_TRUST_FORWARDED=false.
+
+SECRET_KEY = os.getenv("SECRET_KEY")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+TRUST_FORWARDED = os.getenv("PROMETHEUS_RATE_LIMIT_TRUST_FORWARDED", "true").strip().lower() in ("1", "true", "yes", "on")
+PROXY_HOPS = max(1, int(os.getenv("PROMETHEUS_RATE_LIMIT_PROXY_HOPS", 1)))
+
+identity_cache = TTLCache(ttl=300.0, max_entries=int(os.getenv("PROMETHEUS_RATE_LIMIT_MAX_KEYS", 100_000)))
+
+
+def _token_subject(token: str) -> str:
+    subject = identity_cache.get(token)
+    if subject is None:
+        expires_at = None
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            subject = str(payload.get("sub") or "")
+            exp = payload.get("exp")
+            if exp is not None:
+                # Po wygaśnięciu tokena klient wraca do kubełka anonimowego
+                # (IP) - wpis nie może żyć dłużej niż sam token.
+                expires_at = time.monotonic() + (exp - time.time())
+        except JWTError:
+            subject = ""  # nieważne tokeny też trafiają do cache - bez ponownego dekodowania
+        identity_cache.set(token, subject, expires_at=expires_at)
+    return subject
+
+
+def client_identity(request: Request) -> str:
+    authorization = request.headers.get("authorization", "")
+    if SECRET_KEY and authorization[:7].lower() == "bearer ":
+        subject = _token_subject(authorization[7:])
+        if subject:
+            return f"user:{subject}"
+    if TRUST_FORWARDED:
+        address = forwarded_client(request)
+        if address:
+            return f"ip:{address}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def forwarded_client(request: Request) -> Optional[str]:
+    """Adres klienta z X-Forwarded-For wpisany przez PROXY_HOPS zaufanych proxy."""
+    entries = [
+        entry.strip()
+        for header in request.headers.getlist("x-forwarded-for")
+        for entry in header.split(",")
+        if entry.strip()
+    ]
+    if not entries:
+        return None
+    return entries[max(0, len(entries) - PROXY_HOPS)]
+
+
+# --- INTEGRACJA Z FASTAPI ---
+
+limits = load_limits()
+rate_limiter = build_rate_limiter()
+
+
+async def enforce_rate_limit(request: Request, name: str, cost: int = 1):
+    """
+    Pobiera 'cost' tokenów z kubełka użytkownika dla limitu 'name' i z kubełka
+    globalnego. Przy odmowie zgłasza 429 z Retry-After; przy zgodzie zapisuje
+    decyzję w request.state - nagłówki RateLimit-* dodaje RateLimitHeadersMiddleware.
+    """
+    if rate_limiter is None:
+        return
+    buckets = []
+    if limits.get(name) is not None:
+        buckets.append((f"prometheus:ratelimit:{name}:{client_identity(request)}", limits[name]))
+    if limits.get("global") is not None:
+        buckets.append((GLOBAL_BUCKET, limits["global"]))
+    if not buckets:
+        return
+    if any(cost > limit.burst for _, limit in buckets):
+        # Ponowienie nic nie da - żądanie jest większe niż pojemność kubełka
+        raise HTTPException(status_code=413, detail=f"Request cost ({cost}) exceeds the '{name}' rate limit burst")
+
+    decision = await rate_limiter.acquire(buckets, cost)
+    if not decision.allowed:
+        RATE_LIMITED.labels(name, decision.scope).inc()
+        raise HTTPException(status_code=429, detail="Rate limit exceeded, please retry later", headers=decision.headers())
+    request.state.rate_limit = decision
+
+
+def rate_limited(name: str, cost: int = 1):
+    """Zależność FastAPI: dependencies=[Depends(rate_limited("lyrics"))]."""
+    async def dependency(request: Request):
+        await enforce_rate_limit(request, name, cost)
+    return dependency
+
+
+class RateLimitHeadersMiddleware:
+    """
+    Middleware ASGI dodające nagłówki RateLimit-* do odpowiedzi, dla których
+    limit został sprawdzony - również strumieniowych (SSE, NDJSON), do
+    których zależność FastAPI nie może już dopisać nagłówków.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # request.state zapisuje do scope["state"] - ten sam słownik
+        state = scope.setdefault("state", {})
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and "rate_limit" in state:
+                headers = list(message.get("headers", []))
+                headers += [(name.lower().encode(), value.encode()) for name, value in state["rate_limit"].headers().items()]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,41 @@
+# prometheus_app/worker.py
+#
+# Worker Celery dla zadań AI (tryb PROMETHEUS_JOB_BACKEND=celery).
+# Uruchomienie: celery -A prometheus_app.worker worker --loglevel=info
+import asyncio
+import os
+
+from celery import Celery
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+celery_app = Celery(
+    "prometheus",
+    broker=os.getenv("CELERY_BROKER_URL", REDIS_URL),
+)
+celery_app.conf.update(
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,  # długie generacje - nie rezerwujemy zadań na zapas
+    task_ignore_result=True,  # wynik trafia do magazynu zadań, nie do backendu Celery
+)
+
+# Jedna pętla zdarzeń na proces workera - współdzielony klient HTTP Groq
+# i połączenia Redis pozostają przypięte do tej samej pętli między zadaniami.
+_loop = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+@celery_app.task(name="prometheus_app.worker.run_job")
+def run_job(job_id: str):
+    # Import tutaj, aby rejestracja handlerów i konfiguracja klienta Groq
+    # odbyły się w procesie workera, a nie przy imporcie przez API.
+    from .main import jobs
+
+    _get_loop().run_until_complete(jobs.execute(job_id))
@@ -0,0 +1,48 @@
+# tests/conftest.py
+#
+# Testy działają na pliku SQLite w katalogu tymczasowym i lokalnym magazynie
+# plików, a Groq API jest zastępowane przez httpx.MockTransport - zmienne środowiskowe muszą być ustawione przed importem modułów
+# aplikacji (common.database tworzy silniki przy imporcie).
+import os
+import sys
+import tempfile
+
+ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="hardban-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("GROQ_API_KEY", "test-groq-key")
+os.environ["STORAGE_BACKEND"] = "local"
+os.environ["LOCAL_STORAGE_ROOT"] = os.path.join(_tmp, "media")
+
+import pytest
+
+from common.database import Base, engine
+import common.models  # noqa: F401
+import music_app.models  # noqa: F401
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def s3_storage(monkeypatch):
+    """S3Handler na zasobniku moto (mock_aws) - bez połączeń z AWS."""
+    moto = pytest.importorskip("moto")
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_S3_BUCKET_NAME", "hardban-test")
+    monkeypatch.setenv("AWS_REGION", "us-east-1")
+    monkeypatch.delenv("AWS_S3_ENDPOINT_URL", raising=False)
+    with moto.mock_aws():
+        from file_storage.s3_handler import S3Handler
+        handler = S3Handler()
+        handler.s3_client.create_bucket(Bucket=handler.bucket_name)
+        yield handler
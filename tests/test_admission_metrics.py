@@ -0,0 +1,40 @@
+# tests/test_admission_metrics.py
+#
+# Żądania odrzucone przez kontrolę przyjęć (503) muszą być widoczne
+# w histogramie http_request_duration_seconds - MetricsMiddleware leży
+# na zewnątrz AdmissionControlMiddleware.
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from common.admission import AdmissionControlMiddleware
+from main import create_app
+
+
+def shed_count() -> float:
+    labels = {"method": "GET", "route": "__unmatched__", "status": "503"}
+    return REGISTRY.get_sample_value("http_request_duration_seconds_count", labels) or 0.0
+
+
+def admission_middleware(app) -> AdmissionControlMiddleware:
+    layer = app.middleware_stack
+    while not isinstance(layer, AdmissionControlMiddleware):
+        layer = layer.app
+    return layer
+
+
+def test_shed_request_is_recorded_in_latency_metrics():
+    app = create_app()
+    client = TestClient(app)
+    assert client.get("/health").status_code == 200  # buduje stos middleware
+
+    admission = admission_middleware(app)
+    admission.in_flight["reads"] = admission.limits["reads"]
+    before = shed_count()
+    try:
+        response = client.get("/music/releases/")
+    finally:
+        admission.in_flight["reads"] = 0
+
+    assert response.status_code == 503
+    assert admission.rejected["reads"] == 1
+    assert shed_count() == before + 1
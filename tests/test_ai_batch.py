@@ -0,0 +1,63 @@
+# tests/test_ai_batch.py
+#
+# Batch opisów (/generate/description/batch): linie NDJSON niosą 'index'
+# pozycji wejściowej (także błędy), a żądanie odrzucone przed generacją
+# nie pobiera tokenów z limitu.
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from prometheus_app import main
+from prometheus_app.ratelimit import rate_limiter
+
+ITEMS = [{"title": f"Track {number}", "artist": "Artist", "genre": "techno"} for number in range(4)]
+
+
+def groq_handler(request: httpx.Request) -> httpx.Response:
+    prompt = json.loads(request.content)["messages"][1]["content"]
+    if "Track 2" in prompt:
+        return httpx.Response(503, json={"error": {"message": "overloaded"}})
+    content = json.dumps({"short_description": prompt.split('"')[1], "hashtags": ["#techno"]})
+    return httpx.Response(200, json={"choices": [{"message": {"content": content}}]})
+
+
+async def post_batch(path: str = "/generate/description/batch", **params) -> httpx.Response:
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(path, params=params, json={"items": ITEMS})
+
+
+def test_stream_batch_lines_carry_input_index():
+    async def run():
+        main.groq._client = httpx.AsyncClient(base_url=main.groq.base_url, transport=httpx.MockTransport(groq_handler))
+        try:
+            return await post_batch(stream="true", cache="false")
+        finally:
+            await main.groq.shutdown()
+
+    response = asyncio.run(run())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    *items, summary = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(item["index"] for item in items) == [0, 1, 2, 3]
+    for item in items:
+        if item["index"] == 2:
+            assert item["ok"] is False and item["status_code"] == 500
+        else:
+            assert item["result"]["short_description"] == f"Track {item['index']}"
+    assert summary == {**summary, "summary": True, "total": 4, "succeeded": 3, "failed": 1}
+    assert "index" not in summary
+
+
+@pytest.mark.parametrize("path", ["/generate/description/batch", "/jobs/description/batch"])
+def test_batch_without_ai_key_is_not_charged(monkeypatch, path):
+    monkeypatch.setattr(main.groq, "api_key", None)
+    allowed_before = rate_limiter.allowed
+
+    response = asyncio.run(post_batch(path))
+
+    assert response.status_code == 500
+    assert rate_limiter.allowed == allowed_before
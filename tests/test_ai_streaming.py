@@ -0,0 +1,68 @@
+# tests/test_ai_streaming.py
+#
+# Strumieniowanie SSE (/generate/lyrics/stream): tokeny z upstreamu muszą
+# trafiać do klienta od razu, a nie po zakończeniu generacji. Upstream Groq
+# to httpx.MockTransport, który wstrzymuje strumień po pierwszym fragmencie,
+# dopóki test nie zobaczy odpowiadającego mu zdarzenia 'token'.
+import asyncio
+import json
+
+import httpx
+
+from prometheus_app import main
+
+TOKENS = ["Nocne ", "miasto ", "śpi"]
+
+
+def sse_chunk(content: str) -> bytes:
+    payload = {"choices": [{"delta": {"content": content}}]}
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+def parse_event(raw: str) -> tuple:
+    lines = dict(line.split(": ", 1) for line in raw.strip().split("\n"))
+    return lines["event"], json.loads(lines["data"])
+
+
+def test_lyrics_stream_forwards_tokens_incrementally():
+    async def run():
+        first_token_seen = asyncio.Event()
+        requests = []
+
+        async def upstream_body():
+            yield sse_chunk(TOKENS[0])
+            # Reszta strumienia dopiero po dotarciu pierwszego tokenu do klienta
+            await asyncio.wait_for(first_token_seen.wait(), timeout=5)
+            for token in TOKENS[1:]:
+                yield sse_chunk(token)
+            yield b"data: [DONE]\n\n"
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=upstream_body())
+
+        main.groq._client = httpx.AsyncClient(base_url=main.groq.base_url, transport=httpx.MockTransport(handler))
+        try:
+            request = main.LyricsRequest(genre="synthwave", theme="miasto nocą")
+            response = await main.generate_lyrics_stream(request, cache=False)
+            assert response.media_type == "text/event-stream"
+
+            events = []
+            async for chunk in response.body_iterator:
+                event, data = parse_event(chunk)
+                events.append((event, data))
+                if event == "token":
+                    first_token_seen.set()
+            return requests, events
+        finally:
+            await main.groq.shutdown()
+
+    requests, events = asyncio.run(run())
+
+    assert requests[0]["stream"] is True
+    assert [data["content"] for event, data in events if event == "token"] == TOKENS
+    event, summary = events[-1]
+    assert event == "done"
+    assert summary["lyrics"] == "".join(TOKENS)
+    assert summary["word_count"] == 3
+    assert summary["generation_time"].endswith("s")
@@ -0,0 +1,71 @@
+# tests/test_assets.py
+#
+# Deduplikacja po treści (file_storage.assets): skrót SHA-256 jest liczony
+# w tym samym przebiegu co upload - plik jest czytany dokładnie raz, także
+# przy multipart do S3 - a duplikat jest usuwany z magazynu.
+import hashlib
+import io
+
+import pytest
+from sqlalchemy import select
+
+from common.database import SessionLocal
+from common.models import StoredAsset
+from file_storage.assets import AssetStore
+from file_storage.local_storage import LocalStorage
+from file_storage.base import MB
+
+
+class CountingFile(io.BytesIO):
+    """Plik liczący przeczytane bajty."""
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def stored_asset(digest: str) -> StoredAsset:
+    with SessionLocal() as db:
+        return db.execute(select(StoredAsset).where(StoredAsset.sha256 == digest)).scalar_one()
+
+
+@pytest.fixture(params=["local", "s3"])
+def handler(request, tmp_path, monkeypatch):
+    if request.param == "local":
+        return LocalStorage(str(tmp_path), base_url="/media")
+    # Próg i części 5 MB (minimum S3) - 11 MB to trzy części multipart
+    monkeypatch.setenv("S3_MULTIPART_THRESHOLD_MB", "5")
+    monkeypatch.setenv("S3_MULTIPART_CHUNKSIZE_MB", "5")
+    return request.getfixturevalue("s3_storage")
+
+
+def stored_keys(handler, prefix: str) -> list:
+    if isinstance(handler, LocalStorage):
+        return sorted(str(path.relative_to(handler.root)) for path in (handler.root / prefix).glob("*"))
+    listing = handler.s3_client.list_objects_v2(Bucket=handler.bucket_name, Prefix=prefix)
+    return sorted(item["Key"] for item in listing.get("Contents", []))
+
+
+def test_upload_hashes_in_one_pass_and_drops_duplicates(handler):
+    data = hashlib.sha256(handler.name.encode()).digest() * (11 * MB // 32)
+    digest = hashlib.sha256(data).hexdigest()
+    store = AssetStore(handler)
+
+    first = CountingFile(data)
+    uploaded = store.upload(first, "audio", "track.wav")
+    assert uploaded.existing is False
+    assert first.bytes_read == len(data)
+    key = handler.key_from_url(uploaded.url)
+    assert handler.head_object(key)["size"] == len(data)
+    assert stored_asset(digest).s3_key == key
+
+    second = CountingFile(data)
+    duplicate = store.upload(second, "audio", "copy.wav")
+    assert duplicate == (uploaded.url, True)
+    assert second.bytes_read == len(data)
+    assert stored_keys(handler, "audio/") == [key]
+    assert stored_asset(digest).ref_count == 2
+    assert store.stats()["hits"] == 1 and store.stats()["bytes_saved"] == len(data)
@@ -0,0 +1,78 @@
+# tests/test_auth_cache.py
+#
+# Cache uwierzytelniania (auth_app.deps): drugie żądanie z tym samym tokenem
+# nie dekoduje JWT ani nie pyta bazy, a zmiana użytkownika przez ORM
+# (także zmiana adresu e-mail) od razu unieważnia jego wpis.
+import asyncio
+import itertools
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from auth_app import deps
+from auth_app.crud import create_access_token
+from common.database import AsyncSessionLocal, SessionLocal
+from common.models import User
+
+numbers = itertools.count()
+
+
+def current_user(token: str, db=None) -> User:
+    async def run():
+        if db is not None:
+            return await deps.get_current_user(db=db, token=token)
+        async with AsyncSessionLocal() as session:
+            return await deps.get_current_user(db=session, token=token)
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def user():
+    deps.token_cache.clear()
+    deps.user_cache.clear()
+    with SessionLocal() as db:
+        user = User(email=f"cache{next(numbers)}@example.com", hashed_password="x", role="MUSIC_CREATOR")
+        db.add(user)
+        db.commit()
+        return user.email
+
+
+def update_user(current_email: str, **values):
+    with SessionLocal() as db:
+        user = db.execute(select(User).where(User.email == current_email)).scalar_one()
+        for name, value in values.items():
+            setattr(user, name, value)
+        db.commit()
+
+
+def test_second_lookup_is_served_from_cache(user, monkeypatch):
+    token = create_access_token({"sub": user})
+    assert current_user(token).email == user
+
+    # Trafienie w cache: bez dekodowania JWT i bez sesji bazy
+    monkeypatch.setattr(deps.jwt, "decode", lambda *args, **kwargs: pytest.fail("token decoded again"))
+    cached = current_user(token, db=object())
+    assert cached.email == user
+    assert deps.auth_cache_stats()["tokens"]["hits"] == 1
+    assert deps.auth_cache_stats()["users"]["hits"] == 1
+
+
+def test_orm_update_invalidates_cached_user(user):
+    token = create_access_token({"sub": user})
+    assert current_user(token).role == "MUSIC_CREATOR"
+
+    update_user(user, role="ADMIN")
+    assert deps.user_cache.get(user) is None
+    assert current_user(token).role == "ADMIN"
+
+
+def test_email_change_invalidates_old_key(user):
+    token = create_access_token({"sub": user})
+    current_user(token)
+
+    update_user(user, email=f"renamed-{user}")
+    assert deps.user_cache.get(user) is None
+    with pytest.raises(HTTPException) as error:
+        current_user(token)
+    assert error.value.status_code == 401
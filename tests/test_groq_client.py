@@ -0,0 +1,36 @@
+# tests/test_groq_client.py
+#
+# Cykl życia GroqClient: klient HTTP i semafor wywołań powstają w startup()
+# w pętli zdarzeń aplikacji, więc kolejne uruchomienia (testy, przeładowanie
+# aplikacji) nie trafiają na semafor związany ze starą pętlą.
+import asyncio
+
+import httpx
+
+from prometheus_app.groq_client import GroqClient
+
+
+def completion(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+
+def test_semaphore_follows_startup_and_shutdown(monkeypatch):
+    monkeypatch.setenv("GROQ_MAX_CONCURRENCY", "1")
+    groq = GroqClient()
+    assert groq._semaphore is None  # import modułu nie tworzy prymitywów asyncio
+
+    async def run_app():
+        await groq.startup()
+        groq._client = httpx.AsyncClient(base_url=groq.base_url, transport=httpx.MockTransport(completion))
+        try:
+            # Dwa równoległe wywołania przy limicie 1 - drugie czeka na semaforze
+            messages = [{"role": "user", "content": "hi"}]
+            return await asyncio.gather(*(groq.generate_completion(messages, use_cache=False) for _ in range(2)))
+        finally:
+            await groq.shutdown()
+
+    # Dwie kolejne pętle zdarzeń, jak przy ponownym starcie aplikacji
+    assert asyncio.run(run_app()) == ["ok", "ok"]
+    assert asyncio.run(run_app()) == ["ok", "ok"]
+    assert groq._semaphore is None
+    assert groq.pool_stats()["peak_in_flight"] == 1
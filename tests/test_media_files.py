@@ -0,0 +1,67 @@
+# tests/test_media_files.py
+#
+# Lokalny magazyn (STORAGE_BACKEND=local): /media serwuje publicznie okładki
+# i przebiegi, ale oryginały audio są dostępne wyłącznie dla właściciela
+# przez GET /music/releases/{id}/audio.
+from fastapi.testclient import TestClient
+
+from auth_app.crud import create_access_token
+from common.database import SessionLocal
+from common.models import User
+from file_storage.storage import storage
+from main import app
+from music_app import models
+
+AUDIO = b"RIFF" + bytes(range(256)) * 4
+
+
+def store(key: str, data: bytes) -> str:
+    path = storage.local_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return storage.public_url(key)
+
+
+def create_release(email: str, audio_url: str) -> int:
+    with SessionLocal() as db:
+        owner = User(email=email, hashed_password="x")
+        db.add(owner)
+        db.flush()
+        release = models.MusicRelease(
+            title="Track", artist="Artist", owner_id=owner.id,
+            cover_image_url=storage.public_url("covers/cover.png"), audio_file_url=audio_url,
+        )
+        db.add(release)
+        db.commit()
+        return release.id
+
+
+def auth(email: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+def test_media_mount_does_not_expose_audio():
+    client = TestClient(app)
+    cover_url = store("covers/cover.png", b"\x89PNG")
+    audio_url = store("audio/track.wav", AUDIO)
+    waveform_url = store("audio/track.waveform.dat", b"waveform")
+
+    assert client.get(cover_url).content == b"\x89PNG"
+    assert client.get(waveform_url).content == b"waveform"
+    assert client.get(audio_url).status_code == 404
+    assert client.get(f"{storage.base_url}/covers/../audio/track.wav").status_code == 404
+
+
+def test_local_audio_is_served_only_to_the_owner():
+    client = TestClient(app)
+    audio_url = store("audio/owned.wav", AUDIO)
+    release_id = create_release("owner@media.example", audio_url)
+    create_release("other@media.example", store("audio/other.wav", AUDIO))
+
+    response = client.get(f"/music/releases/{release_id}/audio", headers={**auth("owner@media.example"), "Range": "bytes=0-3"})
+    assert response.status_code == 206
+    assert response.content == b"RIFF"
+
+    other = client.get(f"/music/releases/{release_id}/audio", headers=auth("other@media.example"))
+    assert other.status_code == 404
+    assert client.get(f"/music/releases/{release_id}/audio").status_code == 401
@@ -0,0 +1,34 @@
+# tests/test_profiling.py
+#
+# RequestTimings jest współdzielony przez wątki jednego żądania (kontekst
+# kopiowany do puli wątków) - równoległe dopisywanie czasów nie może gubić
+# wywołań.
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from common.profiling import RequestTimings
+
+THREADS = 8
+CALLS = 20_000
+
+
+def test_concurrent_adds_are_not_lost():
+    # Częste przełączanie wątków zwiększa szansę przeplotu w "+="
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    timings = RequestTimings()
+
+    def work(_):
+        for _ in range(CALLS):
+            timings.add("storage", 0.001)
+            timings.add_query(0.001)
+
+    try:
+        with ThreadPoolExecutor(THREADS) as pool:
+            list(pool.map(work, range(THREADS)))
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert timings.spans["storage"][1] == THREADS * CALLS
+    assert timings.queries == THREADS * CALLS
+    assert 'storage;dur=' in timings.server_timing(1.0)
@@ -0,0 +1,146 @@
+# tests/test_ratelimit.py
+#
+# Limity AI (prometheus_app.ratelimit): token bucket w pamięci (sztuczny
+# zegar) i w Redis (skrypt Lua, fakeredis), tożsamość klienta z tokena JWT
+# oraz - za proxy Render - z wpisu X-Forwarded-For dopisanego przez proxy.
+import asyncio
+import time
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+from starlette.requests import Request
+
+from prometheus_app import ratelimit
+from prometheus_app.ratelimit import GLOBAL_BUCKET, Limit, MemoryRateLimiter
+
+PROXY = ("10.0.0.1", 443)
+
+
+def make_request(*forwarded: str, client=PROXY) -> Request:
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded]
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers, "client": client})
+
+
+def test_anonymous_clients_behind_proxy_get_separate_buckets():
+    assert ratelimit.TRUST_FORWARDED
+    first = ratelimit.client_identity(make_request("203.0.113.7"))
+    second = ratelimit.client_identity(make_request("198.51.100.4"))
+    assert first == "ip:203.0.113.7"
+    assert second == "ip:198.51.100.4"
+
+
+def test_spoofed_forwarded_entries_are_ignored():
+    # Klient podał własny nagłówek - proxy dopisało prawdziwy adres na końcu
+    request = make_request("1.2.3.4, 203.0.113.7")
+    assert ratelimit.client_identity(request) == "ip:203.0.113.7"
+    assert ratelimit.client_identity(make_request("1.2.3.4", "203.0.113.7")) == "ip:203.0.113.7"
+
+
+def test_proxy_hops_and_fallbacks(monkeypatch):
+    monkeypatch.setattr(ratelimit, "PROXY_HOPS", 2)
+    assert ratelimit.client_identity(make_request("1.2.3.4, 203.0.113.7, 10.1.1.1")) == "ip:203.0.113.7"
+    assert ratelimit.client_identity(make_request()) == "ip:10.0.0.1"
+
+    monkeypatch.setattr(ratelimit, "TRUST_FORWARDED", False)
+    assert ratelimit.client_identity(make_request("203.0.113.7")) == "ip:10.0.0.1"
+
+
+class FakeClock:
+    """Zastępuje moduł time w ratelimit - czas płynie tylko przez advance()."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return time.time()
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", fake)
+    return fake
+
+
+def acquire(limiter, buckets, cost: int = 1):
+    return asyncio.run(limiter.acquire(buckets, cost))
+
+
+def test_memory_bucket_drains_and_refills(clock):
+    limiter = MemoryRateLimiter()
+    buckets = [("user:1", Limit(rate=1.0, burst=3))]
+
+    assert [acquire(limiter, buckets).remaining for _ in range(3)] == [2, 1, 0]
+    denied = acquire(limiter, buckets)
+    assert not denied.allowed
+    assert denied.headers()["Retry-After"] == "1"
+
+    clock.advance(1.0)
+    assert acquire(limiter, buckets).allowed
+    assert not acquire(limiter, buckets).allowed
+
+    # Kubełek napełnia się najwyżej do burst
+    clock.advance(60.0)
+    assert acquire(limiter, buckets).remaining == 2
+
+
+def test_denial_by_global_bucket_does_not_consume_user_tokens(clock):
+    limiter = MemoryRateLimiter()
+    user = ("user:1", Limit(rate=1.0, burst=5))
+    global_bucket = (GLOBAL_BUCKET, Limit(rate=1.0, burst=1))
+
+    assert acquire(limiter, [user, global_bucket]).allowed
+    denied = acquire(limiter, [user, global_bucket])
+    assert (denied.allowed, denied.scope, denied.remaining) == (False, "global", 4)
+
+
+def test_cost_above_burst_is_rejected_with_413(monkeypatch):
+    monkeypatch.setattr(ratelimit, "limits", {"description": Limit(rate=1.0, burst=2), "global": None})
+    monkeypatch.setattr(ratelimit, "rate_limiter", MemoryRateLimiter())
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(ratelimit.enforce_rate_limit(make_request(), "description", cost=3))
+    assert error.value.status_code == 413
+
+
+def test_redis_bucket_drains_and_refills():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # EVAL w fakeredis
+
+    async def run():
+        limiter = ratelimit.RedisRateLimiter("redis://localhost:6379/0")
+        limiter._redis = fakeredis.FakeAsyncRedis()
+        limiter._script = limiter._redis.register_script(ratelimit.TOKEN_BUCKET_LUA)
+        buckets = [("prometheus:ratelimit:test:user:1", Limit(rate=20.0, burst=2))]
+        drained = [await limiter.acquire(buckets) for _ in range(3)]
+        # Skrypt liczy czas z TIME serwera - 20 tokenów/s to 50 ms na token
+        await asyncio.sleep(0.1)
+        refilled = await limiter.acquire(buckets)
+        await limiter.close()
+        return drained, refilled, limiter
+
+    drained, refilled, limiter = asyncio.run(run())
+    assert [decision.allowed for decision in drained] == [True, True, False]
+    assert drained[1].remaining == 0
+    assert 0 < drained[2].retry_after <= 0.05
+    assert refilled.allowed
+    assert limiter.errors == 0
+
+
+def test_token_identity_expires_with_the_token():
+    ratelimit.identity_cache.clear()
+    exp = int(time.time()) + 1
+    token = jwt.encode({"sub": "fan@example.com", "exp": exp}, ratelimit.SECRET_KEY, algorithm=ratelimit.ALGORITHM)
+    request = Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())], "client": ("203.0.113.7", 1)})
+
+    assert ratelimit.client_identity(request) == "user:fan@example.com"
+    # Wpis w cache żyje najwyżej do 'exp' - nie przez pełne TTL (300 s);
+    # jose porównuje 'exp' z pełnymi sekundami, więc czekamy na exp + 1
+    time.sleep(max(0.0, exp + 1 - time.time()) + 0.05)
+    assert ratelimit.client_identity(request) == "ip:203.0.113.7"
@@ -0,0 +1,113 @@
+# tests/test_release_finalize.py
+#
+# Finalizacja bezpośredniego uploadu (POST /music/releases/finalize):
+# obiekt złożony z części multipart musi mieścić się w limitach rozmiaru
+# i typu z kroku presign - inaczej jest usuwany, a żądanie odrzucane.
+# Zweryfikowane obiekty są liczone w stored_assets, więc usunięcie
+# wydawnictwa zwalnia je tak samo jak pliki wysłane przez API.
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from auth_app.crud import create_access_token
+from common.database import SessionLocal
+from common.models import StoredAsset, User
+from file_storage.assets import asset_store
+from main import app
+from music_app import crud, router, schemas
+
+OWNER_ID = 7
+
+
+def multipart_upload(s3_storage, key: str, data: bytes, content_type: str, owner_id: int = OWNER_ID) -> schemas.FinalizedAsset:
+    upload = s3_storage.create_presigned_multipart(key, owner_id, content_type, len(data), 60)
+    part = s3_storage.s3_client.upload_part(
+        Bucket=s3_storage.bucket_name, Key=key, UploadId=upload["upload_id"], PartNumber=1, Body=data,
+    )
+    return schemas.FinalizedAsset(key=key, upload_id=upload["upload_id"], parts=[{"part_number": 1, "etag": part["ETag"]}])
+
+
+@pytest.fixture
+def storage(s3_storage, monkeypatch):
+    monkeypatch.setattr(router, "storage", s3_storage)
+    monkeypatch.setattr(asset_store, "handler", s3_storage)
+    monkeypatch.setattr(crud, "storage", s3_storage)
+    return s3_storage
+
+
+def ref_counts(*keys: str) -> dict:
+    with SessionLocal() as db:
+        rows = db.execute(select(StoredAsset.s3_key, StoredAsset.ref_count).where(StoredAsset.s3_key.in_(keys))).all()
+    return dict(rows)
+
+
+def test_finalize_accepts_object_within_limits(storage):
+    asset = multipart_upload(storage, "audio/ok.wav", b"RIFF" * 4, "audio/wav")
+    url = router._verify_asset(asset, "audio", "audio/", 64, OWNER_ID)
+    assert url == storage.public_url("audio/ok.wav")
+
+
+def test_finalize_rejects_and_deletes_oversized_multipart(storage):
+    asset = multipart_upload(storage, "audio/big.wav", b"x" * 100, "audio/wav")
+    with pytest.raises(HTTPException) as error:
+        router._verify_asset(asset, "audio", "audio/", 64, OWNER_ID)
+    assert error.value.status_code == 413
+    assert storage.head_object("audio/big.wav") is None
+
+
+def test_finalize_rejects_and_deletes_wrong_content_type(storage):
+    asset = multipart_upload(storage, "audio/page.html", b"<html>", "text/html")
+    with pytest.raises(HTTPException) as error:
+        router._verify_asset(asset, "audio", "audio/", 64, OWNER_ID)
+    assert error.value.status_code == 400
+    assert storage.head_object("audio/page.html") is None
+
+
+def test_finalize_keeps_foreign_objects(storage):
+    asset = multipart_upload(storage, "audio/foreign.wav", b"x" * 100, "audio/wav", owner_id=OWNER_ID + 1)
+    with pytest.raises(HTTPException) as error:
+        router._verify_asset(asset, "audio", "audio/", 64, OWNER_ID)
+    assert error.value.status_code == 403
+    assert storage.head_object("audio/foreign.wav") is not None
+
+
+def test_finalized_assets_are_ref_counted_and_released_on_delete(storage, monkeypatch):
+    # Przetwarzanie w tle (wersje okładki, analiza audio) nie jest tu testowane
+    monkeypatch.setattr(router.cover_processor, "process", lambda *args: None)
+    monkeypatch.setattr(router.audio_analyzer, "process", lambda *args: None)
+    with SessionLocal() as db:
+        owner = User(email="finalize@example.com", hashed_password="x")
+        db.add(owner)
+        db.commit()
+        owner_id = owner.id
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'finalize@example.com'})}"}
+    cover = multipart_upload(storage, "covers/final.png", b"\x89PNG", "image/png", owner_id)
+    audio = multipart_upload(storage, "audio/final.wav", b"RIFF" * 4, "audio/wav", owner_id)
+    client = TestClient(app)
+
+    response = client.post("/music/releases/finalize", headers=headers, json={
+        "title": "Final", "artist": "Artist", "cover": cover.model_dump(), "audio": audio.model_dump(),
+    })
+    assert response.status_code == 201
+    assert ref_counts("covers/final.png", "audio/final.wav") == {"covers/final.png": 1, "audio/final.wav": 1}
+
+    assert client.delete(f"/music/releases/{response.json()['id']}", headers=headers).status_code == 204
+    assert ref_counts("covers/final.png", "audio/final.wav") == {"covers/final.png": 0, "audio/final.wav": 0}
+
+
+def test_failed_finalize_releases_the_verified_asset(storage):
+    with SessionLocal() as db:
+        owner = User(email="half@example.com", hashed_password="x")
+        db.add(owner)
+        db.commit()
+        owner_id = owner.id
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'half@example.com'})}"}
+    cover = multipart_upload(storage, "covers/half.png", b"\x89PNG", "image/png", owner_id)
+    missing = schemas.FinalizedAsset(key="audio/missing.wav")
+
+    response = TestClient(app).post("/music/releases/finalize", headers=headers, json={
+        "title": "Half", "artist": "Artist", "cover": cover.model_dump(), "audio": missing.model_dump(),
+    })
+    assert response.status_code == 400
+    assert ref_counts("covers/half.png") == {"covers/half.png": 0}
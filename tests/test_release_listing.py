@@ -0,0 +1,90 @@
+# tests/test_release_listing.py
+#
+# Lista wydawnictw nie może wykonywać zapytań per wiersz (N+1): podziały
+# tantiem są ładowane jednym selectinload niezależnie od liczby wydawnictw.
+# Zapytania liczą te same hooki before/after_cursor_execute co nagłówek
+# Server-Timing (common.profiling).
+import asyncio
+from contextlib import contextmanager
+
+from common import profiling
+from common.database import AsyncSessionLocal, SessionLocal, async_engine, engine
+from common.models import User
+from music_app import async_crud, crud, models, schemas
+
+@contextmanager
+def count_queries():
+    timings = profiling.RequestTimings()
+    token = profiling._current.set(timings)
+    try:
+        yield timings
+    finally:
+        profiling._current.reset(token)
+
+
+def create_owner(email: str, releases: int) -> int:
+    with SessionLocal() as db:
+        owner = User(email=email, hashed_password="x")
+        db.add(owner)
+        db.flush()
+        for number in range(releases):
+            release = models.MusicRelease(
+                title=f"Track {number}", artist="Artist",
+                cover_image_url=f"/media/covers/{number}.jpg",
+                audio_file_url=f"/media/audio/{number}.wav",
+                owner_id=owner.id,
+            )
+            release.royalty_splits = [
+                models.MusicReleaseRoyaltySplit(email="a@example.com", share_percentage=60),
+                models.MusicReleaseRoyaltySplit(email="b@example.com", share_percentage=40),
+            ]
+            db.add(release)
+        db.commit()
+        return owner.id
+
+
+def list_sync(owner_id: int) -> tuple:
+    with SessionLocal() as db, count_queries() as timings:
+        releases = crud.get_music_releases_by_owner(db, owner_id=owner_id)
+        # Serializacja odczytuje royalty_splits - leniwe ładowanie dodałoby zapytania
+        payload = schemas.dump_music_releases(releases)
+    return timings.queries, len(releases), payload
+
+
+async def list_async(owner_id: int) -> tuple:
+    with count_queries() as timings:
+        async with AsyncSessionLocal() as db:
+            releases = await async_crud.get_music_releases_by_owner(db, owner_id=owner_id)
+            payload = schemas.dump_music_releases(releases)
+    return timings.queries, len(releases), payload
+
+
+def test_listing_query_count_does_not_grow_with_releases():
+    profiling.install_query_hooks(engine)
+    one = create_owner("one@example.com", 1)
+    many = create_owner("many@example.com", 25)
+
+    single_queries, single_count, _ = list_sync(one)
+    many_queries, many_count, payload = list_sync(many)
+
+    assert (single_count, many_count) == (1, 25)
+    assert payload.count(b'"share_percentage"') == 50
+    # SELECT wydawnictw + jeden SELECT ... IN dla podziałów tantiem
+    assert single_queries == many_queries == 2
+
+
+def test_async_listing_query_count_does_not_grow_with_releases():
+    profiling.install_query_hooks(async_engine.sync_engine)
+    one = create_owner("async-one@example.com", 1)
+    many = create_owner("async-many@example.com", 25)
+
+    async def run():
+        results = [await list_async(one), await list_async(many)]
+        await async_engine.dispose()
+        return results
+
+    (single_queries, single_count, _), (many_queries, many_count, payload) = asyncio.run(run())
+
+    assert (single_count, many_count) == (1, 25)
+    assert payload.count(b'"share_percentage"') == 50
+    assert single_queries == many_queries == 2
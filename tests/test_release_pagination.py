@@ -0,0 +1,53 @@
+# tests/test_release_pagination.py
+#
+# Stronicowanie keyset GET /music/releases/: przejście po wszystkich stronach
+# (X-Next-Cursor) zwraca każde wydawnictwo dokładnie raz, od najnowszych,
+# także gdy wiele wydawnictw ma created_at z tej samej sekundy.
+from fastapi.testclient import TestClient
+
+from auth_app.crud import create_access_token
+from common.database import SessionLocal
+from common.models import User
+from main import app
+from music_app import models
+
+EMAIL = "pages@example.com"
+
+
+def create_releases(count: int) -> list:
+    with SessionLocal() as db:
+        owner = User(email=EMAIL, hashed_password="x")
+        db.add(owner)
+        db.flush()
+        releases = [
+            models.MusicRelease(
+                title=f"Track {number}", artist="Artist", owner_id=owner.id,
+                cover_image_url=f"/media/covers/{number}.jpg", audio_file_url=f"/media/audio/{number}.wav",
+            )
+            for number in range(count)
+        ]
+        for release in releases:
+            db.add(release)
+            db.flush()
+        db.commit()
+        return [release.id for release in releases]
+
+
+def test_pages_walk_every_release_once():
+    ids = create_releases(7)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': EMAIL})}"}
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/music/releases/", params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append([release["id"] for release in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        assert len(pages) <= 3, f"pagination does not advance: {pages}"
+
+    assert pages == [sorted(ids, reverse=True)[i:i + 3] for i in (0, 3, 6)]
+    assert "Link" not in response.headers
@@ -0,0 +1,76 @@
+# tests/test_royalty_splits.py
+#
+# PUT /music/releases/{id}/royalty-splits zastępuje cały zestaw podziałów
+# tantiem: nowy zestaw usuwa stare wiersze, a zestaw odrzucony przy
+# walidacji (suma > 100%, powtórzony e-mail) nie zmienia zapisanych podziałów.
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from auth_app.crud import create_access_token
+from common.database import SessionLocal
+from common.models import User
+from main import app
+from music_app import models
+
+EMAIL = "splits@example.com"
+
+
+@pytest.fixture(scope="module")
+def release_id() -> int:
+    with SessionLocal() as db:
+        owner = User(email=EMAIL, hashed_password="x")
+        db.add(owner)
+        db.flush()
+        release = models.MusicRelease(
+            title="Split Track", artist="Artist", owner_id=owner.id,
+            cover_image_url="/media/covers/split.jpg", audio_file_url="/media/audio/split.wav",
+        )
+        db.add(release)
+        db.commit()
+        return release.id
+
+
+@pytest.fixture
+def put_splits(release_id):
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': EMAIL})}"}
+    return lambda splits: client.put(f"/music/releases/{release_id}/royalty-splits", json=splits, headers=headers)
+
+
+def stored_splits(release_id: int) -> dict:
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(models.MusicReleaseRoyaltySplit.email, models.MusicReleaseRoyaltySplit.share_percentage)
+            .where(models.MusicReleaseRoyaltySplit.release_id == release_id)
+        ).all()
+    return {email: float(share) for email, share in rows}
+
+
+def test_replace_drops_previous_splits(put_splits, release_id):
+    first = put_splits([{"email": "a@example.com", "share_percentage": 60}, {"email": "b@example.com", "share_percentage": 40}])
+    assert first.status_code == 200
+
+    second = put_splits([{"email": "c@example.com", "share_percentage": 70}, {"email": "d@example.com", "share_percentage": 30}])
+    assert second.status_code == 200
+    assert sorted(split["email"] for split in second.json()) == ["c@example.com", "d@example.com"]
+    assert stored_splits(release_id) == {"c@example.com": 70.0, "d@example.com": 30.0}
+
+
+@pytest.mark.parametrize("splits", [
+    [{"email": "e@example.com", "share_percentage": 60}, {"email": "f@example.com", "share_percentage": 50}],
+    [{"email": "e@example.com", "share_percentage": 20}, {"email": "E@example.com", "share_percentage": 20}],
+], ids=["total-above-100", "duplicate-email"])
+def test_rejected_replace_keeps_previous_splits(put_splits, release_id, splits):
+    assert put_splits([{"email": "g@example.com", "share_percentage": 100}]).status_code == 200
+
+    response = put_splits(splits)
+    assert response.status_code == 400
+    assert stored_splits(release_id) == {"g@example.com": 100.0}
+
+
+def test_empty_set_removes_all_splits(put_splits, release_id):
+    assert put_splits([{"email": "h@example.com", "share_percentage": 50}]).status_code == 200
+    response = put_splits([])
+    assert (response.status_code, response.json()) == (200, [])
+    assert stored_splits(release_id) == {}
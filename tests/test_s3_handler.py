@@ -0,0 +1,90 @@
+# tests/test_s3_handler.py
+#
+# S3Handler na zasobniku moto: upload (pojedynczy PUT i multipart z
+# równoległymi częściami), presigned multipart, head_object oraz proxy
+# zakresów bajtów (iter_range) - także gdy S3 jest niedostępne.
+import io
+
+import pytest
+from fastapi import HTTPException
+
+from file_storage.base import MB
+from file_storage.streaming import range_response
+
+
+@pytest.fixture
+def s3(request, monkeypatch):
+    # Próg i części 5 MB (minimum S3) - 11 MB to trzy części multipart
+    monkeypatch.setenv("S3_MULTIPART_THRESHOLD_MB", "5")
+    monkeypatch.setenv("S3_MULTIPART_CHUNKSIZE_MB", "5")
+    return request.getfixturevalue("s3_storage")
+
+
+def etag(s3, key: str) -> str:
+    return s3.s3_client.head_object(Bucket=s3.bucket_name, Key=key)["ETag"].strip('"')
+
+
+def test_upload_file_small_object(s3):
+    data = b"\x89PNG" + bytes(1000)
+    url = s3.upload_file(io.BytesIO(data), "covers", "cover.png", s3_key="covers/a.png")
+
+    assert url == s3.public_url("covers/a.png")
+    assert s3.download_bytes("covers/a.png") == data
+    assert "-" not in etag(s3, "covers/a.png")  # jeden PUT
+    assert s3.upload_stats()["bytes_uploaded"] == len(data)
+
+
+def test_upload_file_multipart_object(s3):
+    data = bytes(range(256)) * (11 * MB // 256)
+    assert s3.upload_file(io.BytesIO(data), "audio", "track.wav", s3_key="audio/track.wav")
+
+    assert etag(s3, "audio/track.wav").endswith("-3")
+    head = s3.head_object("audio/track.wav")
+    assert (head["size"], head["content_type"]) == (len(data), "audio/x-wav")
+    assert s3.download_bytes("audio/track.wav") == data
+
+
+def test_presigned_multipart_complete(s3):
+    data = b"a" * (5 * MB) + b"b" * 100
+    upload = s3.create_presigned_multipart("audio/direct.wav", 7, "audio/wav", len(data), 60)
+    assert [part["part_number"] for part in upload["parts"]] == [1, 2]
+
+    parts = []
+    for number, offset in ((1, 0), (2, upload["part_size"])):
+        chunk = data[offset:offset + upload["part_size"]]
+        part = s3.s3_client.upload_part(
+            Bucket=s3.bucket_name, Key="audio/direct.wav", UploadId=upload["upload_id"], PartNumber=number, Body=chunk,
+        )
+        parts.append({"PartNumber": number, "ETag": part["ETag"]})
+
+    assert s3.complete_multipart("audio/direct.wav", upload["upload_id"], parts[::-1])
+    head = s3.head_object("audio/direct.wav")
+    assert head == {"size": len(data), "content_type": "audio/wav", "metadata": {"owner-id": "7"}}
+
+
+def test_head_object_missing_key(s3):
+    assert s3.head_object("audio/missing.wav") is None
+
+
+@pytest.mark.parametrize("start, end", [(0, 0), (10, 19), (1000, 4999)])
+def test_iter_range_returns_requested_bytes(s3, start, end):
+    data = bytes(range(256)) * 20
+    s3.upload_bytes(data, "audio/range.wav", "audio/wav")
+
+    chunks = list(s3.iter_range("audio/range.wav", start, end, chunk_size=512))
+    assert b"".join(chunks) == data[start:end + 1]
+    assert all(len(chunk) <= 512 for chunk in chunks)
+
+
+def test_iter_range_without_client_returns_none(monkeypatch):
+    monkeypatch.delenv("AWS_S3_BUCKET_NAME", raising=False)
+    from file_storage.s3_handler import S3Handler
+    assert S3Handler().iter_range("audio/range.wav", 0, 9) is None
+
+
+def test_range_response_fails_cleanly_when_object_vanishes(s3, monkeypatch):
+    # HEAD widzi obiekt, ale GET z Range już nie - 503 przed wysłaniem nagłówków, nie 500 w trakcie strumienia
+    monkeypatch.setattr(s3, "head_object", lambda key: {"size": 10, "content_type": "audio/wav", "metadata": {}})
+    with pytest.raises(HTTPException) as error:
+        range_response(s3, "audio/deleted.wav", "bytes=0-4")
+    assert error.value.status_code == 503